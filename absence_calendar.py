@@ -0,0 +1,239 @@
+import calendar
+import datetime
+import math
+import tkinter as tk
+
+# Darstellung: Zeilenhöhe, Breite der Namensspalte, Höhe der Kopfzeile, kleinste Tagesbreite
+ROW_HEIGHT = 22
+NAME_WIDTH = 220
+HEADER_HEIGHT = 40
+MIN_DAY_WIDTH = 6
+
+# Farben der Abwesenheiten: (Art, Status) -> Füllfarbe
+ABSENCE_COLORS = {
+    ("vacation", "Genehmigt"): "#3498db",
+    ("vacation", "Beantragt"): "#aed6f1",
+    ("sick", None): "#e74c3c"
+}
+ABSENCE_LABELS = {"vacation": "Urlaub", "sick": "Krank"}
+
+WEEKEND_COLOR = "#eef1f2"
+TODAY_COLOR = "#f39c12"
+GRID_COLOR = "#d5dbdb"
+ROW_COLORS = ("white", "#fafbfb")
+
+WEEKDAY_LETTERS = "MDMDFSS"
+
+# Gantt-Kalender der Abwesenheiten auf einem Canvas. Gezeichnet werden nur die sichtbaren Zeilen:
+# beim Blättern werden die verbleibenden Zeilen verschoben, herausgescrollte gelöscht und neu
+# sichtbare gezeichnet; neue Daten zeichnen nur Zeilen neu, deren Abwesenheiten sich geändert haben.
+class AbsenceCalendar(tk.Frame):
+    def __init__(self, parent, on_hover=None):
+        super().__init__(parent, bg="white")
+        self.on_hover = on_hover
+
+        self.scrollbar = tk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.first_day = None
+        self.last_day = None
+        self.day_width = MIN_DAY_WIDTH
+        self.employees = []
+        self.absences = {}
+        self.top = 0
+
+        # Gezeichnete Zeilen: Mitarbeiter-ID -> (Zeilenindex, Abwesenheiten, Canvas-Elemente)
+        self.drawn = {}
+        self.bar_text = {}
+
+        self.canvas.bind("<Configure>", lambda event: self.relayout())
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3, "units"))
+        self.canvas.bind("<Button-4>", lambda event: self.scroll(-3, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.scroll(3, "units"))
+        self.canvas.tag_bind("bar", "<Enter>", self.show_bar_info)
+        self.canvas.tag_bind("bar", "<Leave>", lambda event: self.on_hover and self.on_hover(""))
+
+    # Zeitraum festlegen (Datumswerte); Kopfzeile und Raster werden neu gezeichnet
+    def set_period(self, first_day, last_day):
+        if (first_day, last_day) == (self.first_day, self.last_day):
+            return
+        self.first_day = first_day
+        self.last_day = last_day
+        self.relayout()
+
+    # Mitarbeiter (id, Beschriftung) und Abwesenheiten (Zeilen mit kind, id, employee_id, start_date,
+    # end_date, status) übernehmen; nur sichtbare Zeilen mit geänderten Abwesenheiten neu zeichnen
+    def set_data(self, employees, absences):
+        grouped = {}
+        for row in absences:
+            try:
+                start = datetime.date.fromisoformat(row['start_date']).toordinal()
+                end = datetime.date.fromisoformat(row['end_date']).toordinal()
+            except (TypeError, ValueError):
+                continue
+            grouped.setdefault(row['employee_id'], []).append(
+                (row['kind'], row['id'], start, end, row['status'], row['start_date'], row['end_date'])
+            )
+        absences = {employee_id: tuple(sorted(rows, key=lambda row: row[2])) for employee_id, rows in grouped.items()}
+
+        if [employee[0] for employee in employees] != [employee[0] for employee in self.employees]:
+            # Andere Mitarbeiter oder Reihenfolge: sichtbaren Bereich komplett neu zeichnen
+            self.employees = list(employees)
+            self.absences = absences
+            self.clear_rows()
+        else:
+            previous = {employee[0]: tuple(employee) for employee in self.employees}
+            self.employees = list(employees)
+            current = {employee[0]: tuple(employee) for employee in self.employees}
+            changed = [employee_id for employee_id in self.drawn
+                       if absences.get(employee_id, ()) != self.absences.get(employee_id, ())
+                       or current[employee_id] != previous[employee_id]]
+            self.absences = absences
+            for employee_id in changed:
+                self.delete_row(employee_id)
+
+        self.top = max(0, min(self.top, len(self.employees) - self.visible_rows()))
+        self.sync_rows()
+
+    def visible_rows(self):
+        return max(1, math.ceil((self.canvas.winfo_height() - HEADER_HEIGHT) / ROW_HEIGHT))
+
+    def relayout(self):
+        if self.first_day is None:
+            return
+        days = (self.last_day - self.first_day).days + 1
+        self.day_width = max(MIN_DAY_WIDTH, (max(self.canvas.winfo_width(), NAME_WIDTH + 1) - NAME_WIDTH) / days)
+        self.canvas.delete("grid", "header")
+        self.clear_rows()
+        self.draw_grid()
+        self.draw_header()
+        self.sync_rows()
+
+    def day_x(self, ordinal):
+        return NAME_WIDTH + (ordinal - self.first_day.toordinal()) * self.day_width
+
+    def draw_grid(self):
+        height = max(self.canvas.winfo_height(), HEADER_HEIGHT + ROW_HEIGHT)
+        day = self.first_day
+        while day <= self.last_day:
+            x = self.day_x(day.toordinal())
+            if day.weekday() >= 5:
+                self.canvas.create_rectangle(x, HEADER_HEIGHT, x + self.day_width, height,
+                                             fill=WEEKEND_COLOR, width=0, tags="grid")
+            if day.day == 1:
+                self.canvas.create_line(x, HEADER_HEIGHT, x, height, fill=GRID_COLOR, tags="grid")
+            day += datetime.timedelta(days=1)
+
+        today = datetime.date.today()
+        if self.first_day <= today <= self.last_day:
+            x = self.day_x(today.toordinal()) + self.day_width / 2
+            self.canvas.create_line(x, HEADER_HEIGHT, x, height, fill=TODAY_COLOR, width=2, tags="grid")
+        self.canvas.tag_lower("grid")
+
+    # Monatsnamen und darunter Tage (breite Spalten) bzw. Kalenderwochen (schmale Spalten)
+    def draw_header(self):
+        self.canvas.create_rectangle(0, 0, self.canvas.winfo_width() or 2000, HEADER_HEIGHT,
+                                     fill="white", outline=GRID_COLOR, tags="header")
+        day = self.first_day
+        while day <= self.last_day:
+            x = self.day_x(day.toordinal())
+            if day.day == 1 or day == self.first_day:
+                self.canvas.create_text(x + 3, 10, text=f"{calendar.month_name[day.month]} {day.year}",
+                                        anchor=tk.W, font=("Arial", 9, "bold"), tags="header")
+            if self.day_width >= 16:
+                self.canvas.create_text(x + self.day_width / 2, 28, text=f"{WEEKDAY_LETTERS[day.weekday()]}\n{day.day}",
+                                        font=("Arial", 7), tags="header")
+            elif day.weekday() == 0 and self.day_width * 7 >= 28:
+                self.canvas.create_text(x + 2, 28, text=f"KW {day.isocalendar()[1]}", anchor=tk.W,
+                                        font=("Arial", 7), tags="header")
+            day += datetime.timedelta(days=1)
+
+    def row_y(self, index):
+        return HEADER_HEIGHT + (index - self.top) * ROW_HEIGHT
+
+    def draw_row(self, index):
+        employee_id, label = self.employees[index][:2]
+        absences = self.absences.get(employee_id, ())
+        y = self.row_y(index)
+        width = self.day_x(self.last_day.toordinal() + 1)
+
+        items = [
+            self.canvas.create_rectangle(0, y, NAME_WIDTH, y + ROW_HEIGHT, fill=ROW_COLORS[index % 2],
+                                         outline=GRID_COLOR, tags="row"),
+            self.canvas.create_line(NAME_WIDTH, y + ROW_HEIGHT, width, y + ROW_HEIGHT, fill=GRID_COLOR, tags="row"),
+            self.canvas.create_text(6, y + ROW_HEIGHT / 2, text=label, anchor=tk.W, font=("Arial", 9), tags="row")
+        ]
+
+        first = self.first_day.toordinal()
+        last = self.last_day.toordinal()
+        for kind, absence_id, start, end, status, start_date, end_date in absences:
+            if end < first or start > last:
+                continue
+            color = ABSENCE_COLORS.get((kind, status if kind == "vacation" else None), "#bdc3c7")
+            item = self.canvas.create_rectangle(
+                self.day_x(max(start, first)) + 1, y + 4, self.day_x(min(end, last) + 1) - 1, y + ROW_HEIGHT - 4,
+                fill=color, outline="", tags=("row", "bar")
+            )
+            items.append(item)
+            status_text = f" ({status})" if kind == "vacation" else ""
+            self.bar_text[item] = (f"{label}: {ABSENCE_LABELS.get(kind, kind)}{status_text} "
+                                   f"{start_date} bis {end_date}")
+
+        self.drawn[employee_id] = (index, absences, items)
+
+    def delete_row(self, employee_id):
+        index, absences, items = self.drawn.pop(employee_id)
+        self.canvas.delete(*items)
+        for item in items:
+            self.bar_text.pop(item, None)
+
+    def clear_rows(self):
+        self.canvas.delete("row")
+        self.drawn = {}
+        self.bar_text = {}
+
+    # Sichtbaren Bereich herstellen: nur fehlende Zeilen zeichnen, nicht mehr sichtbare löschen
+    def sync_rows(self):
+        if self.first_day is None:
+            return
+        first = self.top
+        last = min(len(self.employees), self.top + self.visible_rows())
+        visible = {self.employees[index][0]: index for index in range(first, last)}
+
+        for employee_id in list(self.drawn):
+            if visible.get(employee_id) != self.drawn[employee_id][0]:
+                self.delete_row(employee_id)
+        for employee_id, index in visible.items():
+            if employee_id not in self.drawn:
+                self.draw_row(index)
+
+        self.canvas.tag_raise("header")
+        total = len(self.employees) or 1
+        self.scrollbar.set(first / total, last / total)
+
+    def scroll_to(self, top):
+        top = max(0, min(top, len(self.employees) - self.visible_rows()))
+        if top == self.top:
+            return
+        # Verbleibende Zeilen in einem Schritt verschieben; Zeilenindizes bleiben gültig
+        self.canvas.move("row", 0, (self.top - top) * ROW_HEIGHT)
+        self.top = top
+        self.sync_rows()
+
+    def scroll(self, amount, what):
+        step = self.visible_rows() - 1 if what == "pages" else 1
+        self.scroll_to(self.top + int(amount) * max(step, 1))
+
+    # Schnittstelle der Scrollbar
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.employees)))
+        elif args[0] == "scroll":
+            self.scroll(args[1], args[2])
+
+    def show_bar_info(self, event):
+        items = self.canvas.find_withtag("current")
+        if items and self.on_hover:
+            self.on_hover(self.bar_text.get(items[0], ""))
@@ -0,0 +1,157 @@
+import datetime
+import os
+import time
+from core import (
+    ANONYMIZE_AFTER_YEARS, AUDITED_TABLES, get_connection, retry_on_busy, create_audit_triggers, load_config, logger
+)
+import archive
+
+# Mitarbeiter je Transaktion; zwischen den Blöcken kommen andere Schreiber (Oberfläche, API) zum Zug
+ANONYMIZE_BATCH_SIZE = 500
+ANONYMIZE_PAUSE_SECONDS = 0.05
+
+# Ersetzte Stammdaten: Platzhaltername, persönliche Angaben und Gehalt gelöscht. Personalnummer,
+# Abteilung, Position, Ein- und Austritt bleiben für Statistiken und Berichte erhalten.
+ANONYMIZED_FIELDS = (
+    "first_name = 'Anonymisiert', last_name = 'Mitarbeiter ' || id, birth_date = NULL, address = NULL, "
+    "phone = NULL, email = NULL, salary = NULL, profile_image = NULL, notes = NULL"
+)
+
+# Tabellen, deren Freitext (notes) personenbezogene Angaben enthalten kann; die Zeilen selbst bleiben
+NOTES_TABLES = ("vacation", "sick_leave", "expenses", "working_time")
+
+def _cutoff(today, years):
+    try:
+        return today.replace(year=today.year - years).isoformat()
+    except ValueError:
+        return today.replace(year=today.year - years, day=28).isoformat()
+
+def _placeholders(ids):
+    return ", ".join("?" for _ in ids)
+
+# Noch nicht anonymisierte, ausgeschiedene Mitarbeiter mit Austritt vor dem Stichtag (Teilindex)
+def _candidates(cursor, cutoff, limit=None):
+    sql = """
+        SELECT id FROM employees INDEXED BY idx_employees_anonymize
+        WHERE status != 'Aktiv' AND anonymized_at IS NULL AND exit_date < ?
+        ORDER BY exit_date
+    """
+    params = [cutoff]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cursor.execute(sql, params)
+    return [row[0] for row in cursor.fetchall()]
+
+# Audit-Trigger würden die gelöschten Werte als Änderung ins Audit-Log schreiben; sie werden in derselben
+# Transaktion entfernt und neu angelegt, andere Verbindungen sehen sie also nie fehlen
+def _drop_audit_triggers(cursor):
+    for table in AUDITED_TABLES:
+        for name in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_audit_{name}")
+
+# Einen Block anonymisieren: Stammdaten überschreiben, Dokumente, Gehaltsverlauf und Audit-Einträge löschen,
+# Freitexte leeren. Gibt die Mitarbeiter und die danach zu löschenden Dateien zurück.
+@retry_on_busy
+def _anonymize_batch(cutoff, batch_size, anonymized_at):
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        ids = _candidates(cursor, cutoff, batch_size)
+        if not ids:
+            conn.rollback()
+            return [], []
+        placeholders = _placeholders(ids)
+
+        cursor.execute(f"""
+            SELECT file_path FROM documents WHERE employee_id IN ({placeholders}) AND file_path IS NOT NULL
+            UNION ALL
+            SELECT profile_image FROM employees WHERE id IN ({placeholders}) AND profile_image IS NOT NULL
+        """, ids + ids)
+        files = [row[0] for row in cursor.fetchall() if row[0]]
+
+        _drop_audit_triggers(cursor)
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO anonymization_log (employee_id, exit_date, anonymized_at, anonymized_by, documents)
+            SELECT e.id, e.exit_date, ?, current_app_user(),
+                   (SELECT COUNT(*) FROM documents d WHERE d.employee_id = e.id)
+            FROM employees e WHERE e.id IN ({placeholders})
+        """, [anonymized_at] + ids)
+        cursor.execute(f"""
+            UPDATE employees
+            SET {ANONYMIZED_FIELDS}, anonymized_at = ?, updated_at = ?, version = version + 1
+            WHERE id IN ({placeholders})
+        """, [anonymized_at, anonymized_at] + ids)
+        cursor.execute(f"DELETE FROM documents WHERE employee_id IN ({placeholders})", ids)
+        cursor.execute(f"DELETE FROM salary_history WHERE employee_id IN ({placeholders})", ids)
+        for table in NOTES_TABLES:
+            cursor.execute(f"UPDATE {table} SET notes = NULL WHERE employee_id IN ({placeholders}) AND notes IS NOT NULL", ids)
+        # Der Änderungsverlauf enthält die alten Werte; an seine Stelle tritt der Eintrag in anonymization_log
+        cursor.execute(f"DELETE FROM audit_log WHERE employee_id IN ({placeholders})", ids)
+        create_audit_triggers(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return ids, files
+
+# Dateien erst nach dem Commit löschen (ein Rollback stellt sie nicht wieder her); fehlende zählen als gelöscht
+def _remove_files(files):
+    removed = failed = 0
+    for path in files:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            failed += 1
+            logger.error(f"Datei eines anonymisierten Mitarbeiters nicht gelöscht: {e}")
+    return removed, failed
+
+# Ausgeschiedene Mitarbeiter nach Ablauf der Aufbewahrungsfrist (anonymize_after_years) blockweise
+# anonymisieren. Jeder Block ist eine kurze Schreibtransaktion; ein abgebrochener Lauf setzt beim
+# nächsten Aufruf fort. progress(anzahl) wird nach jedem Block aufgerufen.
+def anonymize_inactive(today=None, dry_run=False, config=None, batch_size=ANONYMIZE_BATCH_SIZE, progress=None):
+    today = today or datetime.date.today()
+    config = config or load_config()
+    years = int(config.get("anonymize_after_years", ANONYMIZE_AFTER_YEARS))
+    if years < 1:
+        raise ValueError("Die Aufbewahrungsfrist für die Anonymisierung muss mindestens ein Jahr betragen")
+    cutoff = _cutoff(today, years)
+
+    if dry_run:
+        conn = get_connection()
+        count = len(_candidates(conn.cursor(), cutoff))
+        conn.close()
+        return {"employees": count, "files": 0, "failed_files": 0}
+
+    start = time.perf_counter()
+    anonymized_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    result = {"employees": 0, "files": 0, "failed_files": 0}
+    while True:
+        ids, files = _anonymize_batch(cutoff, batch_size, anonymized_at)
+        if not ids:
+            break
+        removed, failed = _remove_files(files)
+        result["employees"] += len(ids)
+        result["files"] += removed
+        result["failed_files"] += failed
+        if progress is not None:
+            progress(result["employees"])
+        time.sleep(ANONYMIZE_PAUSE_SECONDS)
+
+    if result["employees"]:
+        # Freitexte der in diesem Lauf anonymisierten Mitarbeiter auch in den Jahresarchiven leeren
+        archive.update_archives("""
+            UPDATE {schema}.{table} SET notes = NULL
+            WHERE notes IS NOT NULL
+              AND employee_id IN (SELECT employee_id FROM main.anonymization_log WHERE anonymized_at = ?)
+        """, (anonymized_at,))
+        logger.info(f"{result['employees']} ausgeschiedene Mitarbeiter anonymisiert (Austritt vor {cutoff}), "
+                    f"{result['files']} Dateien gelöscht, in {(time.perf_counter() - start) * 1000:.0f} ms",
+                    extra={"event": "anonymize.run"})
+    return result
@@ -0,0 +1,504 @@
+import asyncio
+import base64
+import binascii
+import datetime
+import hashlib
+import hmac
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from core import DATABASE_PATH, InstrumentedConnection, acting_user, load_config, logger
+import rbac
+import services
+
+# Lokale HTTP-Schnittstelle (nur Standardbibliothek) für andere interne Werkzeuge.
+# Lesezugriffe laufen parallel über schreibgeschützte WAL-Verbindungen,
+# Schreibzugriffe nacheinander über einen einzelnen Schreib-Thread. Alle Anfragen verlangen die
+# Zugangsdaten eines Benutzers (HTTP Basic) und laufen mit dessen Rechten und Abteilungen,
+# Schreibzugriffe zusätzlich unter dessen Namen im Audit-Log.
+
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+
+# Geprüfte Zugangsdaten werden so lange (Sekunden) ohne erneute bcrypt-Prüfung akzeptiert;
+# Rollen- und Passwortänderungen wirken spätestens danach
+API_AUTH_CACHE_SECONDS = 60
+API_AUTH_CACHE_SIZE = 256
+
+HTTP_STATUS = {
+    200: "OK",
+    201: "Created",
+    304: "Not Modified",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error"
+}
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# Schreibgeschützte Verbindungen, eine pro Lese-Thread
+class ReadConnectionPool:
+    def __init__(self, database_path=DATABASE_PATH):
+        self.database_path = database_path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{self.database_path}?mode=ro", uri=True, check_same_thread=False, factory=InstrumentedConnection
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def query(self, sql, params=()):
+        cursor = self.connection().execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+# Erkennt Änderungen anderer Verbindungen über PRAGMA data_version, ohne Daten zu lesen
+class DataVersionProbe:
+    def __init__(self, database_path=DATABASE_PATH):
+        self._conn = sqlite3.connect(
+            f"file:{database_path}?mode=ro", uri=True, check_same_thread=False, factory=InstrumentedConnection
+        )
+        self._lock = threading.Lock()
+        # Neustarts des Servers dürfen keine alten ETags bestätigen
+        self.instance = uuid.uuid4().hex[:8]
+
+    def current(self):
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+class ApiServer:
+    def __init__(self, host="127.0.0.1", port=8765, allow_writes=False, read_workers=8):
+        self.host = host
+        self.port = port
+        self.allow_writes = allow_writes
+        self.readers = ReadConnectionPool()
+        self.probe = DataVersionProbe()
+        self.read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="api-read")
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-write")
+        self.server = None
+        # Geprüfte Zugangsdaten: HMAC des Authorization-Headers mit zufälligem Schlüssel -> (Ablauf, Benutzer)
+        self._auth_key = os.urandom(32)
+        self._auth_cache = {}
+        self._auth_lock = threading.Lock()
+
+        self.routes = [
+            ("GET", ("api", "employees"), self.list_employees, True),
+            ("GET", ("api", "employees", None), self.get_employee, False),
+            ("GET", ("api", "vacation"), self.list_vacation, True),
+            ("GET", ("api", "sick-leave"), self.list_sick_leave, True),
+            ("GET", ("api", "dashboard"), self.dashboard, True),
+            ("POST", ("api", "vacation"), self.create_vacation, False),
+            ("POST", ("api", "vacation", None, "status"), self.change_vacation_status, False),
+            ("POST", ("api", "sick-leave"), self.create_sick_leave, False)
+        ]
+
+    # --- Serverbetrieb ---
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        logger.info(f"API-Server gestartet auf http://{self.host}:{self.port}")
+        return self.server
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        self.read_executor.shutdown(wait=False)
+        self.write_executor.shutdown(wait=True)
+        self.readers.close()
+        self.probe.close()
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+
+                method, target, headers, body = request
+                status, response_headers, payload = await self.dispatch(method, target, headers, body)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.write_response(writer, status, response_headers, payload, keep_alive, method == "HEAD")
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ApiError as e:
+            self.write_response(writer, e.status, {}, json.dumps({"error": e.message}).encode('utf-8'), False)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise
+        except asyncio.LimitOverrunError:
+            raise ApiError(413, "Header zu groß")
+
+        if len(head) > MAX_HEADER_SIZE:
+            raise ApiError(413, "Header zu groß")
+
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise ApiError(400, "Ungültige Anfragezeile")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise ApiError(400, "Ungültige Content-Length")
+        if length < 0:
+            raise ApiError(400, "Ungültige Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise ApiError(413, "Anfrage zu groß")
+        body = await reader.readexactly(length) if length else b""
+
+        return method.upper(), target, headers, body
+
+    def write_response(self, writer, status, headers, payload, keep_alive, head_only=False):
+        lines = [f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}"]
+        headers = dict(headers)
+        headers.setdefault("Content-Type", "application/json; charset=utf-8")
+        headers["Content-Length"] = str(len(payload))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        headers["Server"] = "MitarbeiterPro-API"
+
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        if not head_only and status != 304:
+            writer.write(payload)
+
+    # --- Routing ---
+
+    def match_route(self, method, parts):
+        allowed = False
+        for route_method, pattern, handler, cacheable in self.routes:
+            if len(pattern) != len(parts):
+                continue
+            if all(p is None or p == part for p, part in zip(pattern, parts)):
+                if route_method == method or (route_method == "GET" and method == "HEAD"):
+                    args = [part for p, part in zip(pattern, parts) if p is None]
+                    return handler, args, cacheable
+                allowed = True
+
+        if allowed:
+            raise ApiError(405, "Methode nicht erlaubt")
+        raise ApiError(404, "Ressource nicht gefunden")
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = tuple(part for part in url.path.split("/") if part)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            handler, args, cacheable = self.match_route(method, parts)
+
+            if method == "POST":
+                if not self.allow_writes:
+                    raise ApiError(403, "Schreibzugriffe sind deaktiviert")
+                data = json.loads(body.decode('utf-8') or "{}") if body else {}
+                if not isinstance(data, dict):
+                    raise ApiError(400, "Anfrage muss ein JSON-Objekt sein")
+                # Passwortprüfung im Lese-Pool, damit Schreibzugriffe nicht hinter bcrypt warten
+                user = await self.run_read(self.authorize, headers)
+                result = await self.run_write(self.run_as, user, handler, *args, data)
+                return 201, {}, self.encode(result)
+
+            user = await self.run_read(self.authorize, headers)
+            etag = None
+            if cacheable:
+                # ETag aus Datenbankversion, Benutzer und Anfrage: unveränderte Listen kosten keine Abfrage
+                request_hash = hashlib.sha1(f"{user['id']}|{target}".encode('utf-8')).hexdigest()[:12]
+                etag = f'"{self.probe.instance}-{self.probe.current()}-{request_hash}"'
+                if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+                    return 304, {"ETag": etag}, b""
+
+            result = await self.run_read(handler, *args, query, user)
+            response_headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+            return 200, response_headers, self.encode(result)
+        except ApiError as e:
+            response_headers = {"WWW-Authenticate": 'Basic realm="MitarbeiterPro-API"'} if e.status == 401 else {}
+            return e.status, response_headers, self.encode({"error": e.message})
+        except rbac.PermissionDeniedError as e:
+            return 403, {}, self.encode({"error": str(e)})
+        except (ValueError, KeyError) as e:
+            return 400, {}, self.encode({"error": str(e)})
+        except Exception as e:
+            logger.error(f"API-Fehler bei {method} {target}: {e}")
+            return 500, {}, self.encode({"error": "Interner Fehler"})
+
+    async def run_read(self, handler, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.read_executor, lambda: handler(*args))
+
+    async def run_write(self, handler, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.write_executor, lambda: handler(*args))
+
+    # Zugangsdaten aus dem Authorization-Header prüfen (bcrypt, Fehlversuche zählen zur Anmeldesperre);
+    # erfolgreiche Prüfungen gelten API_AUTH_CACHE_SECONDS lang
+    def authorize(self, headers):
+        scheme, _, credentials = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "basic" or not credentials:
+            raise ApiError(401, "Anmeldung erforderlich")
+
+        cache_key = hmac.new(self._auth_key, credentials.encode('latin-1'), hashlib.sha256).digest()
+        now = time.monotonic()
+        with self._auth_lock:
+            cached = self._auth_cache.get(cache_key)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+
+        try:
+            username, _, password = base64.b64decode(credentials, validate=True).decode('utf-8').partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            raise ApiError(401, "Ungültige Zugangsdaten")
+        try:
+            user = services.authenticate(username, password, session=False)
+        except services.LoginLockedError as e:
+            raise ApiError(429, str(e))
+        if user is None:
+            raise ApiError(401, "Ungültige Zugangsdaten")
+
+        with self._auth_lock:
+            if len(self._auth_cache) >= API_AUTH_CACHE_SIZE:
+                self._auth_cache = {key: value for key, value in self._auth_cache.items() if value[0] > now}
+                if len(self._auth_cache) >= API_AUTH_CACHE_SIZE:
+                    self._auth_cache.clear()
+            self._auth_cache[cache_key] = (now + API_AUTH_CACHE_SECONDS, user)
+        return user
+
+    def run_as(self, user, handler, *args):
+        with acting_user(user["username"]):
+            return handler(*args, user)
+
+    def encode(self, data):
+        return json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+
+    # --- Lesende Endpunkte (mit den Rechten und Abteilungen des angemeldeten Benutzers) ---
+
+    def _where(self, conditions, params, access):
+        scope, scope_params = rbac.department_scope(access)
+        params.extend(scope_params)
+        return "WHERE 1 = 1" + "".join(f" AND {condition}" for condition in conditions) + scope
+
+    def list_employees(self, query, user):
+        user["access"].require("employees.view")
+        conditions = []
+        params = []
+        if query.get("department"):
+            conditions.append("d.name = ?")
+            params.append(query["department"])
+        if query.get("status"):
+            conditions.append("e.status = ?")
+            params.append(query["status"])
+
+        where = self._where(conditions, params, user["access"])
+        return self.readers.query(f"""
+            SELECT e.id, e.employee_id, e.first_name, e.last_name, e.position, d.name AS department, e.hire_date,
+                   e.status, e.vacation_days_per_year, e.sick_days_used
+            FROM employees e
+            LEFT JOIN departments d ON d.id = e.department_id
+            {where}
+            ORDER BY e.last_name, e.first_name
+        """, params)
+
+    def get_employee(self, employee_id, query, user):
+        user["access"].require("employees.view")
+        params = [int(employee_id)]
+        where = self._where(["e.id = ?"], params, user["access"])
+        rows = self.readers.query(f"""
+            SELECT e.id, e.employee_id, e.first_name, e.last_name, e.email, e.phone, e.position, d.name AS department,
+                   e.hire_date, e.status, e.vacation_days_per_year, e.sick_days_used
+            FROM employees e
+            LEFT JOIN departments d ON d.id = e.department_id
+            {where}
+        """, params)
+        if not rows:
+            raise ApiError(404, "Mitarbeiter nicht gefunden")
+        return rows[0]
+
+    def _period_filter(self, query, alias, conditions, params):
+        # Zeitraum als Überschneidung mit [from, to], damit Indizes auf den Datumsspalten greifen
+        year = query.get("year")
+        if year:
+            month = query.get("month")
+            if month:
+                start = datetime.date(int(year), int(month), 1)
+                end = (start + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+            else:
+                start = datetime.date(int(year), 1, 1)
+                end = datetime.date(int(year), 12, 31)
+            query = dict(query, **{"from": start.isoformat(), "to": end.isoformat()})
+
+        if query.get("from"):
+            conditions.append(f"{alias}.end_date >= ?")
+            params.append(query["from"])
+        if query.get("to"):
+            conditions.append(f"{alias}.start_date <= ?")
+            params.append(query["to"])
+        if query.get("employee_id"):
+            conditions.append(f"{alias}.employee_id = ?")
+            params.append(int(query["employee_id"]))
+
+    def list_vacation(self, query, user):
+        user["access"].require("vacation.view")
+        conditions = []
+        params = []
+        self._period_filter(query, "v", conditions, params)
+        if query.get("status"):
+            conditions.append("v.status = ?")
+            params.append(query["status"])
+
+        where = self._where(conditions, params, user["access"])
+        return self.readers.query(f"""
+            SELECT v.id, v.employee_id, e.first_name, e.last_name, d.name AS department,
+                   v.start_date, v.end_date, v.days, v.status, v.approved_by, v.approved_date, v.version
+            FROM vacation v
+            JOIN employees e ON v.employee_id = e.id
+            LEFT JOIN departments d ON d.id = e.department_id
+            {where}
+            ORDER BY v.start_date
+        """, params)
+
+    def list_sick_leave(self, query, user):
+        user["access"].require("sick_leave.view")
+        conditions = []
+        params = []
+        self._period_filter(query, "s", conditions, params)
+
+        where = self._where(conditions, params, user["access"])
+        return self.readers.query(f"""
+            SELECT s.id, s.employee_id, e.first_name, e.last_name, d.name AS department,
+                   s.start_date, s.end_date, s.days, s.medical_certificate
+            FROM sick_leave s
+            JOIN employees e ON s.employee_id = e.id
+            LEFT JOIN departments d ON d.id = e.department_id
+            {where}
+            ORDER BY s.start_date
+        """, params)
+
+    # Krankheitszahlen nur mit sick_leave.view (sonst null)
+    def dashboard(self, query, user):
+        year = int(query["year"]) if query.get("year") else None
+        return services.build_summary_report(year, user["access"])
+
+    # --- Schreibende Endpunkte (laufen ausschließlich im Schreib-Thread) ---
+
+    # Mitarbeiter und Zeitraum eines neuen Urlaubs bzw. einer Krankmeldung prüfen
+    def _absence_input(self, data):
+        try:
+            employee_id = int(data["employee_id"])
+            start = datetime.date.fromisoformat(str(data["start_date"]))
+            end = datetime.date.fromisoformat(str(data["end_date"]))
+        except KeyError as e:
+            raise ApiError(400, f"Feld {e.args[0]} fehlt")
+        except (TypeError, ValueError):
+            raise ApiError(400, "Ungültige Mitarbeiter-ID oder ungültiges Datum (JJJJ-MM-TT)")
+        if start > end:
+            raise ApiError(400, "Startdatum liegt nach dem Enddatum")
+        if services.get_employee(employee_id) is None:
+            raise ApiError(404, "Mitarbeiter nicht gefunden")
+        return employee_id, start.isoformat(), end.isoformat()
+
+    def create_vacation(self, data, user):
+        employee_id, start_date, end_date = self._absence_input(data)
+        vacation_id = services.create_vacation_request(
+            employee_id, start_date, end_date, data.get("notes"), user["access"]
+        )
+        return {"id": vacation_id}
+
+    # Genehmigender ist der angemeldete Benutzer; die Version verhindert Entscheidungen über veraltete Stände
+    def change_vacation_status(self, vacation_id, data, user):
+        if data.get("status") not in ("Genehmigt", "Abgelehnt", "Beantragt"):
+            raise ApiError(400, "Ungültiger Status")
+        if data.get("version") is None:
+            raise ApiError(400, "Version des Urlaubsantrags fehlt")
+        try:
+            services.set_vacation_status(int(vacation_id), data["status"], user["id"], int(data["version"]), user["access"])
+        except services.ConcurrentModificationError as e:
+            raise ApiError(409, str(e))
+        return {"id": int(vacation_id), "status": data["status"]}
+
+    def create_sick_leave(self, data, user):
+        employee_id, start_date, end_date = self._absence_input(data)
+        sick_leave_id = services.create_sick_leave(
+            employee_id, start_date, end_date,
+            data.get("medical_certificate", False), data.get("notes"), user["access"]
+        )
+        return {"id": sick_leave_id}
+
+# API-Server mit den Einstellungen aus der Konfiguration erzeugen
+def create_server_from_config(config=None):
+    config = config or load_config()
+    return ApiServer(
+        host=config.get("api_host", "127.0.0.1"),
+        port=config.get("api_port", 8765),
+        allow_writes=config.get("api_allow_writes", False)
+    )
+
+# Server in einem Hintergrund-Thread mit eigener Event-Loop starten (für die Tk-Anwendung)
+def start_in_thread(config=None):
+    server = create_server_from_config(config)
+
+    def run():
+        try:
+            asyncio.run(server.serve_forever())
+        except Exception as e:
+            logger.error(f"API-Server beendet: {e}")
+
+    thread = threading.Thread(target=run, name="api-server", daemon=True)
+    thread.start()
+    return server, thread
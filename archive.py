@@ -0,0 +1,376 @@
+import contextlib
+import datetime
+import json
+import os
+import time
+from core import APPDATA_DIR, get_connection, retry_on_busy, load_config, logger
+import reports
+
+# Verzeichnis der Jahresarchive (archive_JJJJ.db)
+ARCHIVE_PATH = os.path.join(APPDATA_DIR, 'archive')
+
+# Archivierte Tabellen und die Datumsspalte, nach deren Jahr eine Zeile archiviert wird
+ARCHIVED_TABLES = {
+    "vacation": "end_date",
+    "sick_leave": "end_date",
+    "working_time": "date"
+}
+
+# Archiviert werden nur abgeschlossene Urlaubsjahre, die mindestens so lange zurückliegen (die
+# Krankheitsauswertung und der Übertrag brauchen das Vorjahr in der Haupttabelle)
+ARCHIVE_MIN_AGE_YEARS = 2
+
+# Aufbewahrung nach Ablauf des Jahres in Jahren, danach werden die Zeilen gelöscht (Konfiguration:
+# retention_years_<Tabelle>); Arbeitszeitnachweise mindestens 2 Jahre (§ 16 Abs. 2 ArbZG),
+# Urlaub und Krankmeldungen bis zum Ende der regelmäßigen Verjährung (3 Jahre, § 195 BGB)
+RETENTION_YEARS = {
+    "vacation": 3,
+    "sick_leave": 3,
+    "working_time": 2
+}
+
+# SQLite hängt höchstens 10 Datenbanken gleichzeitig an; eine bleibt für Aufrufer frei
+ARCHIVE_ATTACH_LIMIT = 9
+
+def archive_file(year):
+    return os.path.join(ARCHIVE_PATH, f"archive_{year}.db")
+
+def _schema(year):
+    return f"archive_{int(year)}"
+
+def _attach(conn, year):
+    conn.execute(f"ATTACH DATABASE ? AS {_schema(year)}", (archive_file(year),))
+
+def _detach(conn, year):
+    conn.execute(f"DETACH DATABASE {_schema(year)}")
+
+def _year_range(year):
+    return f"{year}-01-01", f"{year}-12-31"
+
+# Jahre mit Archivdatei, deren Zeilen noch (teilweise) vorhanden sind
+def archived_years(cursor, first_year=None, last_year=None):
+    cursor.execute("""
+        SELECT year FROM archives
+        WHERE status = 'archived' AND year BETWEEN ? AND ?
+        ORDER BY year
+    """, (first_year or 0, last_year or 9999))
+    return [row[0] for row in cursor.fetchall()]
+
+def _columns(cursor, schema, table):
+    cursor.execute(f"PRAGMA {schema}.table_info({table})")
+    return [(row[1], row[2], row[5]) for row in cursor.fetchall()]
+
+# Archivtabelle mit den Spalten der Haupttabelle anlegen bzw. um später hinzugekommene Spalten ergänzen
+# (ohne Fremdschlüssel, die Mitarbeiter liegen in der Hauptdatenbank)
+def _ensure_archive_table(cursor, schema, table):
+    columns = _columns(cursor, "main", table)
+    existing = {name for name, _, _ in _columns(cursor, schema, table)}
+    if not existing:
+        definitions = ", ".join(f"{name} {kind} PRIMARY KEY" if pk else f"{name} {kind}" for name, kind, pk in columns)
+        cursor.execute(f"CREATE TABLE {schema}.{table} ({definitions})")
+        cursor.execute(f"CREATE INDEX {schema}.idx_{table}_employee ON {table} (employee_id)")
+        cursor.execute(f"CREATE INDEX {schema}.idx_{table}_{ARCHIVED_TABLES[table]} ON {table} ({ARCHIVED_TABLES[table]})")
+    else:
+        for name, kind, _ in columns:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {name} {kind}")
+    return [name for name, _, _ in columns]
+
+# Trigger einer Tabelle entfernen und ihre Definition zurückgeben: Verschieben und Löschen durch
+# Archivierung ist keine fachliche Änderung (kein Audit-Eintrag, Berichtsfakten bleiben)
+def _drop_triggers(cursor, table):
+    cursor.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))
+    triggers = cursor.fetchall()
+    for name, _ in triggers:
+        cursor.execute(f"DROP TRIGGER main.{name}")
+    return [sql for _, sql in triggers]
+
+def _restore_triggers(cursor, triggers):
+    for sql in triggers:
+        cursor.execute(sql)
+
+def _require_archivable(cursor, year, today):
+    if year > today.year - ARCHIVE_MIN_AGE_YEARS:
+        raise ValueError(f"Das Jahr {year} kann frühestens {year + ARCHIVE_MIN_AGE_YEARS} archiviert werden")
+    cursor.execute("SELECT 1 FROM year_close_runs WHERE year = ?", (year,))
+    if cursor.fetchone() is None:
+        raise ValueError(f"Das Urlaubsjahr {year} ist noch nicht abgeschlossen")
+    cursor.execute("SELECT 1 FROM archives WHERE year = ? AND status = 'archived'", (year,))
+    if cursor.fetchone() is not None:
+        raise ValueError(f"Das Jahr {year} ist bereits archiviert")
+
+# Zeilen eines Jahres in die Archivdatei kopieren und aus der Haupttabelle löschen. Zwei Schritte, weil
+# Transaktionen über mehrere Datenbanken im WAL-Modus nicht gemeinsam atomar sind: erst kopieren
+# (wiederholbar), dann erneut kopieren und löschen; ein Abbruch dazwischen verliert keine Zeilen.
+@retry_on_busy
+def archive_year(year, today=None):
+    today = today or datetime.date.today()
+    start = time.perf_counter()
+    os.makedirs(ARCHIVE_PATH, exist_ok=True)
+    schema = _schema(year)
+    first, last = _year_range(year)
+    # ATTACH legt die Datei an; scheitert schon das Kopieren, wird eine neue Datei wieder entfernt
+    created = not os.path.exists(archive_file(year))
+    copied = False
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    _attach(conn, year)
+    try:
+        for step in ("copy", "move"):
+            cursor.execute("BEGIN IMMEDIATE")
+            if step == "copy":
+                _require_archivable(cursor, year, today)
+                cursor.execute("""
+                    INSERT INTO archives (year, path, status) VALUES (?, ?, 'copying')
+                    ON CONFLICT (year) DO UPDATE SET path = excluded.path,
+                        status = CASE WHEN status = 'purged' THEN 'copying' ELSE status END
+                """, (year, archive_file(year)))
+
+            counts = {}
+            for table, column in ARCHIVED_TABLES.items():
+                columns = ", ".join(_ensure_archive_table(cursor, schema, table))
+                cursor.execute(f"""
+                    INSERT OR REPLACE INTO {schema}.{table} ({columns})
+                    SELECT {columns} FROM main.{table} WHERE {column} BETWEEN ? AND ?
+                """, (first, last))
+                counts[table] = cursor.rowcount
+
+                if step == "move":
+                    if table in reports.ARCHIVED_LEAVE_TABLES:
+                        reports.record_archived_leave(cursor, table, year)
+                    triggers = _drop_triggers(cursor, table)
+                    cursor.execute(f"""
+                        DELETE FROM main.{table}
+                        WHERE {column} BETWEEN ? AND ? AND id IN (SELECT id FROM {schema}.{table})
+                    """, (first, last))
+                    _restore_triggers(cursor, triggers)
+
+            if step == "move":
+                cursor.execute("""
+                    UPDATE archives
+                    SET status = 'archived', row_counts = ?, archived_at = ?, archived_by = current_app_user()
+                    WHERE year = ?
+                """, (json.dumps(counts), datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), year))
+            conn.commit()
+            copied = True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _detach(conn, year)
+        conn.close()
+        if created and not copied and os.path.exists(archive_file(year)):
+            os.remove(archive_file(year))
+
+    logger.info(f"Jahr {year} archiviert in {(time.perf_counter() - start) * 1000:.0f} ms: "
+                + ", ".join(f"{table} {count}" for table, count in counts.items()),
+                extra={"event": "archive.year", "year": year})
+    return counts
+
+# Archiviertes Jahr in die Haupttabellen zurückholen und die Archivdatei entfernen
+@retry_on_busy
+def restore_year(year):
+    schema = _schema(year)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT status, purged_tables FROM archives WHERE year = ?", (year,))
+    run = cursor.fetchone()
+    if run is None or run[0] != 'archived' or not os.path.exists(archive_file(year)):
+        conn.close()
+        raise ValueError(f"Für {year} gibt es kein Archiv")
+    purged = json.loads(run[1] or "[]")
+
+    _attach(conn, year)
+    counts = {}
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for table in ARCHIVED_TABLES:
+            if table in purged:
+                continue
+            columns = ", ".join(name for name, _, _ in _columns(cursor, "main", table)
+                                if name in {name for name, _, _ in _columns(cursor, schema, table)})
+            triggers = _drop_triggers(cursor, table)
+            cursor.execute(f"INSERT OR REPLACE INTO main.{table} ({columns}) SELECT {columns} FROM {schema}.{table}")
+            counts[table] = cursor.rowcount
+            _restore_triggers(cursor, triggers)
+            if table in reports.ARCHIVED_LEAVE_TABLES:
+                reports.forget_archived_leave(cursor, table, year)
+        cursor.execute("DELETE FROM archives WHERE year = ?", (year,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _detach(conn, year)
+        conn.close()
+
+    os.remove(archive_file(year))
+    logger.info(f"Archiv {year} zurückgeholt: " + ", ".join(f"{table} {count}" for table, count in counts.items()),
+                extra={"event": "archive.restore", "year": year})
+    return counts
+
+def _retention_years(config):
+    return {table: int(config.get(f"retention_years_{table}", years)) for table, years in RETENTION_YEARS.items()}
+
+# Löschfristen durchsetzen: Zeilen, deren Jahr seit der Aufbewahrungsdauer abgelaufen ist, endgültig
+# löschen, in der Hauptdatenbank wie in den Archiven (mit secure_delete, damit die Inhalte nicht in
+# freien Seiten verbleiben). Ein Archiv ohne verbleibende Tabellen wird als Datei entfernt.
+@retry_on_busy
+def purge_expired(today=None, dry_run=False, config=None):
+    today = today or datetime.date.today()
+    retention = _retention_years(config or load_config())
+    deleted = {table: 0 for table in ARCHIVED_TABLES}
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("PRAGMA main.secure_delete = ON")
+        # Archive, in denen mindestens eine Tabelle abgelaufen ist
+        cursor.execute("SELECT year, purged_tables FROM archives WHERE status = 'archived' ORDER BY year")
+        for year, purged_tables in cursor.fetchall():
+            purged = set(json.loads(purged_tables or "[]"))
+            expired = [table for table in ARCHIVED_TABLES
+                       if table not in purged and year <= today.year - retention[table] - 1]
+            if not expired:
+                continue
+            schema = _schema(year)
+            _attach(conn, year)
+            try:
+                cursor.execute(f"PRAGMA {schema}.secure_delete = ON")
+                cursor.execute("BEGIN IMMEDIATE")
+                for table in expired:
+                    cursor.execute(f"SELECT COUNT(*) FROM {schema}.{table}")
+                    deleted[table] += cursor.fetchone()[0]
+                    if not dry_run:
+                        cursor.execute(f"DELETE FROM {schema}.{table}")
+                purged.update(expired)
+                remove = purged >= set(ARCHIVED_TABLES)
+                cursor.execute("UPDATE archives SET purged_tables = ?, status = ? WHERE year = ?",
+                               (json.dumps(sorted(purged)), "purged" if remove else "archived", year))
+                if dry_run:
+                    conn.rollback()
+                else:
+                    conn.commit()
+                    # Freigegebene Seiten zurückgeben, solange das Archiv noch Tabellen enthält
+                    if not remove:
+                        cursor.execute(f"VACUUM {schema}")
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                _detach(conn, year)
+            if remove and not dry_run:
+                os.remove(archive_file(year))
+                logger.info(f"Archiv {year} nach Ablauf der Aufbewahrung entfernt")
+
+        # Nicht archivierte, abgelaufene Zeilen in der Hauptdatenbank (Anteil an den Berichten bleibt)
+        cursor.execute("BEGIN IMMEDIATE")
+        for table, column in ARCHIVED_TABLES.items():
+            last_year = today.year - retention[table] - 1
+            cursor.execute(f"SELECT DISTINCT substr({column}, 1, 4) FROM main.{table} WHERE {column} < ?",
+                           (f"{last_year + 1}-01-01",))
+            years = [int(row[0]) for row in cursor.fetchall() if row[0] and row[0].isdigit()]
+            if not years:
+                continue
+            if not dry_run and table in reports.ARCHIVED_LEAVE_TABLES:
+                for year in years:
+                    reports.record_archived_leave(cursor, table, year)
+            triggers = _drop_triggers(cursor, table)
+            cursor.execute(f"DELETE FROM main.{table} WHERE {column} < ?", (f"{last_year + 1}-01-01",))
+            deleted[table] += cursor.rowcount
+            _restore_triggers(cursor, triggers)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if not dry_run:
+        logger.info("Abgelaufene Daten gelöscht: " + ", ".join(f"{table} {count}" for table, count in deleted.items()))
+    return deleted
+
+# Tabelle samt archivierter Jahre für eine lesende Abfrage: ohne berührte Archive der Tabellenname,
+# sonst eine temporäre Sicht über Haupttabelle und angehängte Archive (Zeiträume über den Jahreswechsel
+# liegen im Archiv ihres Endjahres, daher wird auch das Folgejahr einbezogen)
+@contextlib.contextmanager
+def history(conn, table, first_year, last_year):
+    cursor = conn.cursor()
+    years = archived_years(cursor, first_year, last_year + 1)
+    if not years:
+        yield table
+        return
+    if len(years) > ARCHIVE_ATTACH_LIMIT:
+        raise ValueError(f"Zeitraum umfasst mehr als {ARCHIVE_ATTACH_LIMIT} archivierte Jahre")
+
+    view = f"{table}_history"
+    # Bereits angehängte Archive (verschachtelte Sichten mehrerer Tabellen) werden mitbenutzt
+    cursor.execute("PRAGMA database_list")
+    present = {row[1] for row in cursor.fetchall()}
+    attached = []
+    try:
+        for year in years:
+            if _schema(year) in present:
+                continue
+            _attach(conn, year)
+            attached.append(year)
+        main_columns = [name for name, _, _ in _columns(cursor, "main", table)]
+        selects = [f"SELECT {', '.join(main_columns)} FROM main.{table}"]
+        for year in years:
+            archive_columns = {name for name, _, _ in _columns(cursor, _schema(year), table)}
+            if not archive_columns:
+                continue
+            columns = ", ".join(name if name in archive_columns else f"NULL AS {name}" for name in main_columns)
+            selects.append(f"SELECT {columns} FROM {_schema(year)}.{table}")
+        cursor.execute(f"CREATE TEMP VIEW {view} AS {' UNION ALL '.join(selects)}")
+        yield f"temp.{view}"
+    finally:
+        cursor.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        for year in attached:
+            _detach(conn, year)
+
+# Änderung in allen vorhandenen Jahresarchiven ausführen, je Archiv eine Transaktion; in sql werden
+# {schema} und {table} für jede archivierte Tabelle ersetzt. Gibt die Anzahl geänderter Zeilen zurück.
+@retry_on_busy
+def update_archives(sql, params=()):
+    conn = get_connection()
+    cursor = conn.cursor()
+    changed = 0
+    try:
+        for year in archived_years(cursor):
+            schema = _schema(year)
+            _attach(conn, year)
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                for table in ARCHIVED_TABLES:
+                    cursor.execute(sql.format(schema=schema, table=table), params)
+                    changed += cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                _detach(conn, year)
+    finally:
+        conn.close()
+    return changed
+
+def list_archives():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT year, status, row_counts, archived_at, archived_by, purged_tables
+        FROM archives ORDER BY year
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+    return [
+        {"year": year, "status": status, "row_counts": json.loads(row_counts or "{}"), "archived_at": archived_at,
+         "archived_by": archived_by, "purged_tables": json.loads(purged_tables or "[]"),
+         "size": os.path.getsize(archive_file(year)) if os.path.exists(archive_file(year)) else 0}
+        for year, status, row_counts, archived_at, archived_by, purged_tables in rows
+    ]
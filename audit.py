@@ -0,0 +1,97 @@
+import datetime
+import json
+import sqlite3
+from core import get_connection, logger
+
+# Lesbare Bezeichnungen für die Anzeige des Änderungsverlaufs
+TABLE_LABELS = {
+    "employees": "Stammdaten",
+    "vacation": "Urlaub",
+    "sick_leave": "Krankmeldung",
+    "salary_history": "Gehalt"
+}
+
+OPERATION_LABELS = {
+    "I": "Angelegt",
+    "U": "Geändert",
+    "D": "Gelöscht"
+}
+
+# Änderungsverlauf eines Mitarbeiters über alle protokollierten Tabellen (Index employee_id, id)
+def get_employee_history(employee_id, limit=500, before_id=None):
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+
+    sql = """
+        SELECT id, changed_at, changed_by, table_name, row_id, operation, changes
+        FROM audit_log
+        WHERE employee_id = ?
+    """
+    params = [employee_id]
+    if before_id is not None:
+        sql += " AND id < ?"
+        params.append(before_id)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# JSON-Diff in eine kurze Textdarstellung umwandeln
+def describe_changes(operation, changes):
+    if not changes:
+        return ""
+
+    data = json.loads(changes)
+    if operation == "U":
+        return "; ".join(
+            f"{column}: {'-' if old is None else old} → {'-' if new is None else new}"
+            for column, (old, new) in data.items()
+        )
+    return "; ".join(f"{column}: {value}" for column, value in data.items())
+
+# Monate im Audit-Log mit Anzahl und ID-Bereich
+def list_partitions():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT partition_month, COUNT(*), MIN(id), MAX(id)
+        FROM audit_log
+        GROUP BY partition_month
+        ORDER BY partition_month
+    """)
+    partitions = cursor.fetchall()
+    conn.close()
+    return partitions
+
+# Ganze Monate vor der Aufbewahrungsfrist entfernen
+def prune_audit_log(keep_months):
+    today = datetime.date.today()
+    month_index = today.year * 12 + today.month - 1 - keep_months
+    cutoff = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Erste ID der ältesten behaltenen Partition: alles davor ist ein zusammenhängender Bereich
+        cursor.execute("SELECT MIN(id) FROM audit_log WHERE partition_month >= ?", (cutoff,))
+        first_kept_id = cursor.fetchone()[0]
+
+        if first_kept_id is None:
+            cursor.execute("DELETE FROM audit_log WHERE partition_month < ?", (cutoff,))
+        else:
+            cursor.execute("DELETE FROM audit_log WHERE id < ?", (first_kept_id,))
+        deleted = cursor.rowcount
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Audit-Log bereinigt: {deleted} Einträge vor {cutoff} entfernt")
+    return deleted
@@ -0,0 +1,182 @@
+import datetime
+import json
+import os
+import threading
+import time
+from core import APPDATA_DIR, DATABASE_PATH, backup_database, backup_file_path, is_busy_error, write_json_atomic, load_config, logger
+import encryption
+
+# Zustand des Backup-Planers (letzter Lauf, Ergebnis, nächster Versuch); wird atomar ersetzt
+BACKUP_STATE_PATH = os.path.join(APPDATA_DIR, 'backup_state.json')
+
+# Abstand zwischen erfolgreichen Backups je Einstellung backup_frequency
+BACKUP_INTERVALS = {
+    "daily": datetime.timedelta(days=1),
+    "weekly": datetime.timedelta(days=7),
+    "monthly": datetime.timedelta(days=30)
+}
+
+# Der Planer prüft spätestens in diesem Abstand (Sekunden), ob ein Backup fällig ist (Ruhezustand,
+# geänderte Einstellungen, Backups anderer Prozesse)
+BACKUP_CHECK_INTERVAL_SECONDS = 5 * 60
+
+# Nach einem Fehlschlag (gesperrte Datenbank o. Ä.) erneut nach 30 s, 1 min, 2 min ... höchstens 30 min
+BACKUP_RETRY_BASE_SECONDS = 30
+BACKUP_RETRY_MAX_SECONDS = 30 * 60
+
+# Wartezeit, bevor der Überwacher eine abgestürzte Planerschleife neu startet
+BACKUP_RESTART_DELAY_SECONDS = 60
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_state_lock = threading.Lock()
+
+def _parse_time(value):
+    try:
+        return datetime.datetime.strptime(value, _TIME_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+def _default_state():
+    return {
+        "last_run": None, "last_success": None, "status": None, "error": None, "duration_ms": None,
+        "size": None, "path": None, "failures": 0, "retry_at": None
+    }
+
+# Gespeicherten Zustand laden; beim ersten Start wird last_backup aus der früheren Konfiguration übernommen.
+# Eine unlesbare Datei führt zu einem sofortigen Backup statt zu einem Fehler.
+def load_state():
+    state = _default_state()
+    try:
+        with open(BACKUP_STATE_PATH, 'r', encoding='utf-8') as f:
+            state.update(json.load(f))
+    except FileNotFoundError:
+        state["last_success"] = load_config().get("last_backup")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Backup-Status nicht lesbar, wird neu angelegt: {e}")
+    return state
+
+def save_state(state):
+    write_json_atomic(BACKUP_STATE_PATH, state)
+
+def _retry_delay(failures):
+    return min(BACKUP_RETRY_BASE_SECONDS * 2 ** max(failures - 1, 0), BACKUP_RETRY_MAX_SECONDS)
+
+# Nächster geplanter Lauf: nach Fehlschlägen der Wiederholungszeitpunkt, sonst letzter Erfolg plus Intervall
+def next_run(state, frequency):
+    retry_at = _parse_time(state.get("retry_at"))
+    if retry_at is not None:
+        return retry_at
+    last_success = _parse_time(state.get("last_success"))
+    if last_success is None:
+        return datetime.datetime.now()
+    return last_success + BACKUP_INTERVALS.get(frequency, BACKUP_INTERVALS["daily"])
+
+# Backup erstellen, bei encrypt_backups verschlüsselt; gibt Pfad und Größe zurück. Die Backup-API schreibt
+# nur in Datenbankdateien, die Klartextkopie liegt daher vorübergehend in einer temporären Datei
+# und wird nach dem Verschlüsseln (oder einem Fehler) sofort gelöscht.
+def create_backup_file(encrypt=None):
+    if encrypt is None:
+        encrypt = load_config().get("encrypt_backups", False)
+    if not encrypt:
+        return backup_database()
+    recipient = encryption.public_key()
+    path = encryption.encrypt_generated(backup_database, backup_file_path() + encryption.ENCRYPTED_SUFFIX, recipient)
+    return path, os.path.getsize(path)
+
+# Ein Backup erstellen und das Ergebnis (Dauer, Größe bzw. Fehler und nächster Versuch) im Zustand festhalten
+def run_backup():
+    with _state_lock:
+        state = load_state()
+        started = datetime.datetime.now()
+        start = time.perf_counter()
+        state["last_run"] = started.strftime(_TIME_FORMAT)
+        try:
+            if not os.path.exists(DATABASE_PATH):
+                raise FileNotFoundError(DATABASE_PATH)
+            path, size = create_backup_file()
+        except Exception as e:
+            state["failures"] = state.get("failures", 0) + 1
+            state["status"] = "busy" if is_busy_error(e) else "error"
+            state["error"] = str(e)
+            retry_at = started + datetime.timedelta(seconds=_retry_delay(state["failures"]))
+            state["retry_at"] = retry_at.strftime(_TIME_FORMAT)
+            logger.error(f"Backup fehlgeschlagen ({state['failures']}. Versuch), nächster Versuch {state['retry_at']}: {e}",
+                         extra={"event": "backup.failed"})
+        else:
+            state.update({
+                "last_success": state["last_run"], "status": "ok", "error": None, "path": path, "size": size,
+                "failures": 0, "retry_at": None
+            })
+            logger.info(f"Backup erstellt: {path} ({size / 1024 / 1024:.1f} MB)", extra={"event": "backup.ok"})
+        state["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        save_state(state)
+    return state
+
+# Zustand für die Anzeige: letzter Lauf, Ergebnis, Dauer, Größe und nächster geplanter Lauf
+def get_status(frequency=None):
+    frequency = frequency or load_config().get("backup_frequency", "daily")
+    state = load_state()
+    state["next_run"] = next_run(state, frequency).strftime(_TIME_FORMAT)
+    return state
+
+# Backups im Hintergrund: ein Überwacher startet die Planerschleife nach einem unerwarteten Fehler neu;
+# die Schleife liest den Zustand vor jeder Prüfung neu, damit Backups anderer Prozesse zählen
+class BackupScheduler:
+    def __init__(self, frequency="daily"):
+        self.frequency = frequency
+        self.thread = None
+        self.running = False
+        self.stopped = threading.Event()
+        self.wakeup = threading.Event()
+        self.requested = False
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.supervise, name="backup-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+    # Sofort sichern (z. B. Schaltfläche in den Einstellungen) bzw. nach geänderter Häufigkeit neu planen
+    def request_backup(self):
+        self.requested = True
+        self.wakeup.set()
+
+    def set_frequency(self, frequency):
+        self.frequency = frequency
+        self.wakeup.set()
+
+    def supervise(self):
+        while not self.stopped.is_set():
+            try:
+                self.loop()
+            except Exception as e:
+                logger.error(f"Backup-Planer abgebrochen, Neustart in {BACKUP_RESTART_DELAY_SECONDS} s: {e}")
+                self.running = False
+                self.stopped.wait(BACKUP_RESTART_DELAY_SECONDS)
+
+    def loop(self):
+        while not self.stopped.is_set():
+            self.wakeup.clear()
+            due = next_run(load_state(), self.frequency)
+            if self.requested or due <= datetime.datetime.now():
+                self.requested = False
+                self.running = True
+                try:
+                    run_backup()
+                finally:
+                    self.running = False
+                continue
+            wait = (due - datetime.datetime.now()).total_seconds()
+            self.wakeup.wait(min(max(wait, 0), BACKUP_CHECK_INTERVAL_SECONDS))
+
+    def status(self):
+        state = get_status(self.frequency)
+        state["running"] = self.running
+        state["alive"] = self.thread is not None and self.thread.is_alive()
+        return state
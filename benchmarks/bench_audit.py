@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Benchmark in einem temporären Datenverzeichnis ausführen, nie gegen die echte Datenbank
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="mitarbeiterpro_bench_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+import services
+
+# Misst den Mehraufwand der Audit-Trigger auf dem normalen Schreibpfad (ein Commit pro Vorgang)
+
+def reset_database(with_audit):
+    core.close_pooled_connections()
+    if os.path.exists(core.DATABASE_PATH):
+        os.remove(core.DATABASE_PATH)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(core.DATABASE_PATH + suffix):
+            os.remove(core.DATABASE_PATH + suffix)
+
+    core.setup_directories()
+    core.setup_database()
+
+    if not with_audit:
+        conn = core.get_connection()
+        triggers = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_audit_%'"
+        )]
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.commit()
+        conn.close()
+
+def run_workload(count):
+    timings = {}
+
+    # Wie in der laufenden Anwendung (ChangeWatcher) bleibt eine Verbindung offen; sonst löst jedes
+    # Schließen der letzten Verbindung einen WAL-Checkpoint aus und verfälscht die Messung
+    keeper = core.get_connection()
+
+    start = time.perf_counter()
+    employee_ids = [
+        services.create_employee({
+            "employee_id": f"B{i:06d}",
+            "first_name": "Max",
+            "last_name": f"Muster{i}",
+            "department": "IT",
+            "position": "Entwickler",
+            "hire_date": "2020-01-01",
+            "salary": 50000 + i
+        })
+        for i in range(count)
+    ]
+    timings["employee_insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for employee_id in employee_ids:
+        services.set_employee_status(employee_id, "Inaktiv")
+    timings["employee_update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vacation_ids = [
+        services.create_vacation_request(employee_id, "2026-07-01", "2026-07-10")
+        for employee_id in employee_ids
+    ]
+    timings["vacation_insert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for vacation_id in vacation_ids:
+        services.set_vacation_status(vacation_id, "Genehmigt", 1)
+    timings["vacation_update"] = time.perf_counter() - start
+
+    keeper.close()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Mehraufwand der Audit-Trigger messen")
+    parser.add_argument("--count", type=int, default=2000, help="Datensätze pro Vorgang")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen (bester Wert zählt)")
+    parser.add_argument("--output", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    results = {}
+    for with_audit in (False, True):
+        best = None
+        for _ in range(args.repeat):
+            reset_database(with_audit)
+            timings = run_workload(args.count)
+            best = timings if best is None else {key: min(best[key], timings[key]) for key in timings}
+        results["audit" if with_audit else "baseline"] = best
+
+    report = {"count": args.count, "operations": {}}
+    print(f"{'Vorgang':<18}{'ohne Audit':>14}{'mit Audit':>14}{'Mehraufwand':>14}")
+    for operation, baseline in results["baseline"].items():
+        audited = results["audit"][operation]
+        overhead = (audited / baseline - 1) * 100
+        report["operations"][operation] = {
+            "baseline_us": baseline / args.count * 1e6,
+            "audit_us": audited / args.count * 1e6,
+            "overhead_percent": overhead
+        }
+        print(f"{operation:<18}{baseline / args.count * 1e6:>11.1f} µs{audited / args.count * 1e6:>11.1f} µs{overhead:>13.1f}%")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+if __name__ == "__main__":
+    main()
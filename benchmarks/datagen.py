@@ -0,0 +1,233 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+
+# Erzeugt reproduzierbare Testdaten (fester Seed) für Lasttests und Benchmarks.
+# Die Funktionen arbeiten auf einer übergebenen Verbindung; core wird erst in main()
+# importiert, nachdem das Datenverzeichnis (APPDATA) gesetzt ist.
+
+FIRST_NAMES = [
+    "Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hannah", "Jonas", "Julia",
+    "Lukas", "Lena", "Maximilian", "Marie", "Noah", "Paul", "Sophie", "Tim", "Laura", "Elias"
+]
+LAST_NAMES = [
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann",
+    "Koch", "Richter", "Klein", "Wolf", "Schröder", "Neumann", "Schwarz", "Braun", "Zimmermann", "Hartmann"
+]
+POSITIONS = ["Sachbearbeiter", "Entwickler", "Teamleiter", "Berater", "Assistenz", "Analyst", "Referent"]
+EXPENSE_CATEGORIES = ["Reise", "Verpflegung", "Material", "Weiterbildung", "Sonstiges"]
+VACATION_STATUS = ["Genehmigt"] * 8 + ["Beantragt", "Abgelehnt"]
+
+# Standardverhältnis der Tabellengrößen zur Größe "size"
+DEFAULT_RATIOS = {
+    "employees": 0.1,
+    "vacation": 1.0,
+    "sick_leave": 1.0,
+    "working_time": 1.0,
+    "salary_history": 1.0,
+    "expenses": 1.0
+}
+
+BATCH_SIZE = 10000
+
+def table_sizes(size, overrides=None):
+    sizes = {table: max(1, int(size * ratio)) for table, ratio in DEFAULT_RATIOS.items()}
+    sizes["employees"] = max(50, sizes["employees"])
+    for table, value in (overrides or {}).items():
+        if value is not None:
+            sizes[table] = value
+    return sizes
+
+def _date(rng, start, end):
+    return start + datetime.timedelta(days=rng.randint(0, (end - start).days))
+
+def _insert_batches(cursor, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+def _employees(rng, count, departments, today):
+    for i in range(count):
+        birth_date = _date(rng, datetime.date(1960, 1, 1), datetime.date(2003, 12, 31))
+        hire_date = _date(rng, datetime.date(2005, 1, 1), today)
+        yield (
+            f"P{i + 1:07d}",
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            birth_date.isoformat(),
+            f"Musterstraße {rng.randint(1, 200)}, {rng.randint(10000, 99999)} Musterstadt",
+            f"+49 {rng.randint(100, 999)} {rng.randint(100000, 999999)}",
+            f"mitarbeiter{i + 1}@example.com",
+            rng.choice(POSITIONS),
+            rng.choice(departments),
+            hire_date.isoformat(),
+            round(rng.uniform(30000, 95000), 2),
+            "Aktiv" if rng.random() < 0.9 else "Inaktiv",
+            rng.choice([28, 30, 30, 30, 32]),
+            f"{hire_date.isoformat()} 08:00:00",
+            f"{hire_date.isoformat()} 08:00:00"
+        )
+
+def _intervals(rng, count, employee_count, start, end, min_days, max_days):
+    for _ in range(count):
+        first = _date(rng, start, end)
+        last = first + datetime.timedelta(days=rng.randint(min_days, max_days) - 1)
+        yield rng.randint(1, employee_count), first, last
+
+def _vacation(rng, count, employee_count, start, end):
+    for employee_id, first, last in _intervals(rng, count, employee_count, start, end, 1, 15):
+        status = rng.choice(VACATION_STATUS)
+        created = first - datetime.timedelta(days=rng.randint(7, 60))
+        yield (
+            employee_id, first.isoformat(), last.isoformat(), (last - first).days + 1, status,
+            1 if status != "Beantragt" else None,
+            f"{created.isoformat()} 10:00:00" if status != "Beantragt" else None,
+            f"{created.isoformat()} 09:00:00"
+        )
+
+def _sick_leave(rng, count, employee_count, start, end):
+    for employee_id, first, last in _intervals(rng, count, employee_count, start, end, 1, 10):
+        days = (last - first).days + 1
+        yield (
+            employee_id, first.isoformat(), last.isoformat(), days,
+            1 if days > 3 or rng.random() < 0.3 else 0,
+            f"{first.isoformat()} 08:30:00"
+        )
+
+def _working_time(rng, count, employee_count, start, end):
+    for _ in range(count):
+        day = _date(rng, start, end)
+        start_hour = rng.randint(6, 10)
+        hours = rng.choice([6, 7, 8, 8, 8, 9, 10])
+        break_minutes = 30 if hours >= 6 else 0
+        yield (
+            rng.randint(1, employee_count), day.isoformat(),
+            f"{start_hour:02d}:00", f"{start_hour + hours:02d}:{break_minutes:02d}",
+            break_minutes, float(hours), f"{day.isoformat()} 18:00:00"
+        )
+
+def _salary_history(rng, count, employee_count, start, end):
+    for _ in range(count):
+        effective = _date(rng, start, end).replace(day=1)
+        yield (
+            rng.randint(1, employee_count), round(rng.uniform(30000, 100000), 2),
+            effective.isoformat(), f"{effective.isoformat()} 09:00:00"
+        )
+
+def _expenses(rng, count, employee_count, start, end):
+    for _ in range(count):
+        day = _date(rng, start, end)
+        status = rng.choice(["Eingereicht", "Genehmigt", "Genehmigt", "Abgelehnt"])
+        yield (
+            rng.randint(1, employee_count), round(rng.uniform(5, 800), 2), rng.choice(EXPENSE_CATEGORIES),
+            day.isoformat(), status, f"{day.isoformat()} 12:00:00"
+        )
+
+# Tabellen mit Testdaten füllen; Trigger (Änderungs- und Audit-Log) werden währenddessen entfernt
+# und anschließend von setup_database neu angelegt
+def generate(conn, sizes, seed=42, years=5, today=None):
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    history_start = datetime.date(today.year - years + 1, 1, 1)
+    history_end = datetime.date(today.year, 12, 31)
+
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA synchronous = OFF")
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%'")
+    for (trigger,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER {trigger}")
+
+    cursor.execute("SELECT id FROM departments ORDER BY name")
+    departments = [row[0] for row in cursor.fetchall()] or [None]
+
+    for table in ("vacation", "sick_leave", "working_time", "salary_history", "expenses", "employees"):
+        cursor.execute(f"DELETE FROM {table}")
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('employees', 'vacation', 'sick_leave', 'working_time', 'salary_history', 'expenses')")
+    # Berichtsfakten verwerfen; sie werden beim nächsten reports.refresh_facts vollständig neu berechnet
+    cursor.execute("DELETE FROM report_facts")
+    cursor.execute("DELETE FROM report_dirty")
+    # Abgeleitete Ergebnisse je Mitarbeiter gehören zu den alten Datensätzen
+    for table in ("sick_leave_summary", "sick_leave_dirty", "analytics_runs", "vacation_balances", "year_close_runs"):
+        cursor.execute(f"DELETE FROM {table}")
+
+    employee_count = sizes["employees"]
+    _insert_batches(cursor, """
+        INSERT INTO employees (employee_id, first_name, last_name, birth_date, address, phone, email, position,
+                               department_id, hire_date, salary, status, vacation_days_per_year, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, _employees(rng, employee_count, departments, today))
+
+    _insert_batches(cursor, """
+        INSERT INTO vacation (employee_id, start_date, end_date, days, status, approved_by, approved_date, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, _vacation(rng, sizes["vacation"], employee_count, history_start, history_end))
+
+    _insert_batches(cursor, """
+        INSERT INTO sick_leave (employee_id, start_date, end_date, days, medical_certificate, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, _sick_leave(rng, sizes["sick_leave"], employee_count, history_start, today))
+
+    _insert_batches(cursor, """
+        INSERT INTO working_time (employee_id, date, start_time, end_time, break_duration, total_hours, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, _working_time(rng, sizes["working_time"], employee_count, history_start, today))
+
+    _insert_batches(cursor, """
+        INSERT INTO salary_history (employee_id, amount, effective_date, created_at)
+        VALUES (?, ?, ?, ?)
+    """, _salary_history(rng, sizes["salary_history"], employee_count, history_start, today))
+
+    _insert_batches(cursor, """
+        INSERT INTO expenses (employee_id, amount, category, date, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, _expenses(rng, sizes["expenses"], employee_count, history_start, today))
+
+    conn.commit()
+    cursor.execute("PRAGMA synchronous = FULL")
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+def add_arguments(parser):
+    parser.add_argument("--size", type=int, default=10000, help="Zeilen pro Bewegungstabelle (1000 bis 1000000)")
+    parser.add_argument("--seed", type=int, default=42, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--years", type=int, default=5, help="Anzahl Jahre Historie")
+    for table in DEFAULT_RATIOS:
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, dest=table, help=f"Zeilen in {table}")
+
+def sizes_from_args(args):
+    return table_sizes(args.size, {table: getattr(args, table) for table in DEFAULT_RATIOS})
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetische Testdaten erzeugen")
+    parser.add_argument("--data-dir", help="Datenverzeichnis (Standard: neues temporäres Verzeichnis)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    os.environ["APPDATA"] = args.data_dir or tempfile.mkdtemp(prefix="mitarbeiterpro_data_")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import core
+
+    core.setup_directories()
+    core.setup_database()
+
+    sizes = sizes_from_args(args)
+    conn = core.get_connection()
+    generate(conn, sizes, args.seed, args.years)
+    conn.close()
+    core.setup_database()
+
+    print(f"Testdaten erzeugt in {core.DATABASE_PATH}")
+    for table, count in sizes.items():
+        print(f"  {table}: {count}")
+
+if __name__ == "__main__":
+    main()
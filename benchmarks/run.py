@@ -0,0 +1,260 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmark-Suite ohne Tk: misst die Datenpfade der Ansichten, Exporte und Backups auf
+# synthetischen Daten und schreibt JSON-Ergebnisse, die mit früheren Läufen verglichen werden können.
+#
+#   python benchmarks/run.py --size 100000 --output ergebnis.json
+#   python benchmarks/run.py --size 100000 --baseline ergebnis.json
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return {
+        "min_ms": timings[0] * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "repeat": repeat,
+        "rows": len(result) if isinstance(result, (list, tuple)) else result
+    }
+
+def build_benchmarks(core, services, reports, sick_analytics, year_close, ics_export, backup, encryption, export_dir):
+    today = datetime.date.today()
+    rows_cache = {}
+    it_department = services.get_department_ids().get("IT")
+
+    def dashboard():
+        services.get_employee_count()
+        services.get_current_vacation_count()
+        services.get_current_sick_count()
+        services.get_birthdays_this_month()
+        services.get_employees_by_department()
+        services.get_vacation_by_month()
+        services.get_sick_leave_by_month()
+        return services.get_upcoming_events()
+
+    def load_employees():
+        # Wie EmployeeManagementSystem.load_employees ohne Treeview: Abfrage plus Zeilenaufbereitung
+        rows = services.list_employees()
+        rows_cache["employees"] = rows
+        return [
+            (row['id'], row['employee_id'], f"{row['last_name']}, {row['first_name']}", row['department'],
+             row['position'], core.format_date(row['hire_date']), row['status'])
+            for row in rows
+        ]
+
+    def filter_employees():
+        rows = rows_cache.get("employees") or services.list_employees()
+        return services.filter_employee_rows(rows, "mül", it_department, "Aktiv")
+
+    def load_vacation_data():
+        return services.list_vacation(today.year, today.month)
+
+    def load_sick_leave_data():
+        return services.list_sick_leave(today.year, today.month)
+
+    def export_csv():
+        return services.export_employees(os.path.join(export_dir, "benchmark.csv"))
+
+    def export_pdf():
+        return services.export_employees(os.path.join(export_dir, "benchmark.pdf"))
+
+    def create_backup():
+        if not core.create_backup():
+            raise RuntimeError("Backup fehlgeschlagen")
+        # Backups nicht ansammeln lassen
+        for name in os.listdir(core.BACKUP_PATH):
+            os.remove(os.path.join(core.BACKUP_PATH, name))
+        return 1
+
+    def create_encrypted_backup():
+        # Gleiches Backup mit Verschlüsselung (Schlüssel beim ersten Lauf im Datenverzeichnis angelegt)
+        if not encryption.has_key():
+            encryption.create_key("benchmark", "benchmark")
+        backup.create_backup_file(encrypt=True)
+        for name in os.listdir(core.BACKUP_PATH):
+            os.remove(os.path.join(core.BACKUP_PATH, name))
+        return 1
+
+    return {
+        "dashboard.employee_count": services.get_employee_count,
+        "dashboard.current_vacation_count": services.get_current_vacation_count,
+        "dashboard.current_sick_count": services.get_current_sick_count,
+        "dashboard.birthdays_this_month": services.get_birthdays_this_month,
+        "dashboard.employees_by_department": services.get_employees_by_department,
+        "dashboard.vacation_by_month": services.get_vacation_by_month,
+        "dashboard.sick_leave_by_month": services.get_sick_leave_by_month,
+        "dashboard.upcoming_events": services.get_upcoming_events,
+        "dashboard.total": dashboard,
+        "load_employees": load_employees,
+        "filter_employees": filter_employees,
+        "load_vacation_data": load_vacation_data,
+        "load_sick_leave_data": load_sick_leave_data,
+        "export.csv": export_csv,
+        "export.pdf": export_pdf,
+        "create_backup": create_backup,
+        "create_backup.encrypted": create_encrypted_backup,
+        "reports.refresh": lambda: reports.refresh_facts(full=True),
+        "reports.year_over_year": lambda: reports.get_year_over_year(today.year, "sick_days"),
+        "reports.trend": lambda: reports.get_yearly_trend(today.year, "sick_rate"),
+        "reports.departments": lambda: reports.get_department_facts(today.year),
+        "sick_leave.analysis": lambda: sick_analytics.run_analysis(full=True),
+        "sick_leave.summary": sick_analytics.get_summary,
+        "absence_calendar.quarter": lambda: (
+            services.get_calendar_employees(today.replace(day=1).isoformat(), (today + datetime.timedelta(days=92)).isoformat()),
+            services.get_absences(today.replace(day=1).isoformat(), (today + datetime.timedelta(days=92)).isoformat())
+        ),
+        "vacation.year_close": lambda: year_close.close_year(
+            today.year - 1, force=True, formats=("csv",), output_dir=export_dir
+        )["employees"],
+        "ics.full": lambda: ics_export.write_calendar(os.path.join(export_dir, "benchmark.ics"))
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def prepare_data(core, datagen, args, sizes):
+    # Vorhandene Daten wiederverwenden, wenn Größe und Seed übereinstimmen
+    marker_path = os.path.join(core.APPDATA_DIR, "benchmark_data.json")
+    marker = {"sizes": sizes, "seed": args.seed, "years": args.years}
+
+    core.setup_directories()
+    core.setup_database()
+
+    if os.path.exists(marker_path):
+        with open(marker_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == marker:
+                return False
+
+    conn = core.get_connection()
+    datagen.generate(conn, sizes, args.seed, args.years)
+    conn.close()
+    core.setup_database()
+
+    with open(marker_path, 'w', encoding='utf-8') as f:
+        json.dump(marker, f)
+    return True
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'Benchmark':<38}{'vorher':>12}{'jetzt':>12}{'Änderung':>11}")
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or "median_ms" not in previous:
+            print(f"{name:<38}{'-':>12}{current['median_ms']:>10.2f}ms{'neu':>11}")
+            continue
+
+        change = current["median_ms"] / previous["median_ms"] - 1 if previous["median_ms"] else 0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  <-- Regression"
+        print(f"{name:<38}{previous['median_ms']:>10.2f}ms{current['median_ms']:>10.2f}ms{change * 100:>10.1f}%{marker}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Suite für MitarbeiterPro")
+    parser.add_argument("--data-dir", help="Datenverzeichnis; wird bei gleicher Größe/Seed wiederverwendet")
+    parser.add_argument("--repeat", type=int, default=5, help="Messungen pro Benchmark")
+    parser.add_argument("--only", action="append", help="Nur Benchmarks mit diesem Präfix ausführen")
+    parser.add_argument("--output", help="Ergebnis als JSON speichern")
+    parser.add_argument("--baseline", help="Mit früherem JSON-Ergebnis vergleichen")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Erlaubte Verlangsamung (Anteil, Standard 0.15)")
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import datagen
+    datagen.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Datenverzeichnis muss vor dem Import von core feststehen
+    os.environ["APPDATA"] = args.data_dir or tempfile.mkdtemp(prefix="mitarbeiterpro_bench_")
+    sys.path.insert(0, ROOT_DIR)
+    import core
+    import services
+    import reports
+    import sick_analytics
+    import year_close
+    import ics_export
+    import backup
+    import encryption
+
+    sizes = datagen.sizes_from_args(args)
+    start = time.perf_counter()
+    generated = prepare_data(core, datagen, args, sizes)
+    if generated:
+        print(f"Testdaten erzeugt in {time.perf_counter() - start:.1f} s ({core.DATABASE_PATH})")
+
+    benchmarks = build_benchmarks(core, services, reports, sick_analytics, year_close, ics_export, backup, encryption,
+                                  core.EXPORT_PATH)
+    results = {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "database_bytes": os.path.getsize(core.DATABASE_PATH)
+        },
+        "results": {}
+    }
+
+    for name, func in benchmarks.items():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        try:
+            results["results"][name] = measure(func, args.repeat)
+        except Exception as e:
+            results["results"][name] = {"error": str(e)}
+            print(f"{name:<38}Fehler: {e}")
+            continue
+
+        result = results["results"][name]
+        print(f"{name:<38}{result['median_ms']:>10.2f} ms (min {result['min_ms']:.2f}, p95 {result['p95_ms']:.2f})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        results["results"] = {name: value for name, value in results["results"].items() if "error" not in value}
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} Regression(en) über {args.threshold * 100:.0f} %")
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import datetime
+import getpass
+import json
+import os
+import sys
+from core import (
+    EXPORT_PATH, SLOW_QUERY_MS, query_stats, load_config, set_current_user, setup_logging, setup_directories,
+    setup_database
+)
+import services
+import backup
+import api
+import audit
+import rbac
+import org
+import reports
+import sick_analytics
+import year_close
+import ics_export
+import reminders
+import archive
+import anonymize
+import encryption
+
+# Kommandozeile für Batch-Jobs ohne Tk, z. B. "python -m cli backup"
+
+def cmd_export(args):
+    output = args.output
+    if not output:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(EXPORT_PATH, f"mitarbeiter_{timestamp}.{args.format}")
+
+    count = services.export_employees(output)
+    print(f"{count} Mitarbeiter exportiert nach {services.export_target(output)}")
+    return 0
+
+def cmd_backup(args):
+    if args.status:
+        state = backup.get_status()
+        print(f"Letzter Lauf:     {state['last_run'] or '-'} ({state['status'] or '-'})")
+        print(f"Letztes Backup:   {state['last_success'] or '-'}")
+        if state['size'] is not None:
+            print(f"  Datei:          {state['path']} ({state['size'] / 1024 / 1024:.1f} MB, {state['duration_ms']:.0f} ms)")
+        if state['error']:
+            print(f"  Fehler:         {state['error']}")
+        print(f"Nächster Lauf:    {state['next_run']}")
+        return 0
+
+    state = backup.run_backup()
+    if state['status'] != "ok":
+        print(f"Backup fehlgeschlagen: {state['error']}", file=sys.stderr)
+        return 1
+
+    print(f"Backup erstellt: {state['path']} ({state['size'] / 1024 / 1024:.1f} MB)")
+    return 0
+
+def cmd_import(args):
+    created, updated = services.import_employees(args.input)
+    print(f"{created} Mitarbeiter angelegt, {updated} aktualisiert")
+    return 0
+
+def cmd_report(args):
+    report = services.build_summary_report(args.year)
+
+    if args.json:
+        print(json.dumps(report, indent=4, ensure_ascii=False))
+        return 0
+
+    print(f"Bericht {report['year']} (erstellt am {report['created_at']})")
+    print(f"  Aktive Mitarbeiter:      {report['active_employees']}")
+    print(f"  Aktuell im Urlaub:       {report['current_vacation']}")
+    print(f"  Krank gemeldet:          {report['current_sick']}")
+    print(f"  Geburtstage im Monat:    {report['birthdays_this_month']}")
+    print("  Mitarbeiter nach Abteilung:")
+    for department, count in report['employees_by_department'].items():
+        print(f"    {department}: {count}")
+    print(f"  Urlaubstage pro Monat:   {report['vacation_days_by_month']}")
+    print(f"  Krankheitstage pro Monat: {report['sick_days_by_month']}")
+    return 0
+
+def cmd_serve(args):
+    config = load_config()
+    server = api.ApiServer(
+        host=args.host or config.get("api_host", "127.0.0.1"),
+        port=args.port or config.get("api_port", 8765),
+        allow_writes=args.allow_writes or config.get("api_allow_writes", False)
+    )
+
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+def cmd_audit_prune(args):
+    keep_months = args.keep_months or load_config().get("audit_retention_months", 24)
+    deleted = audit.prune_audit_log(keep_months)
+    print(f"{deleted} Audit-Einträge älter als {keep_months} Monate entfernt")
+    return 0
+
+def cmd_user_role(args):
+    rbac.set_user_role(args.username, args.role)
+    print(f"Rolle von {args.username}: {args.role}")
+    return 0
+
+def cmd_user_departments(args):
+    rbac.set_user_departments(args.username, args.departments)
+    print(f"Abteilungen von {args.username}: {', '.join(args.departments) or '-'}")
+    return 0
+
+def cmd_org_parent(args):
+    org.set_department_parent(args.department, args.parent)
+    print(f"{args.department} untergeordnet: {args.parent or '-'}")
+    return 0
+
+def cmd_org_manager(args):
+    org.set_employee_manager(args.employee, args.manager)
+    print(f"Vorgesetzter von {args.employee}: {args.manager or '-'}")
+    return 0
+
+def cmd_org_rebuild(args):
+    org.rebuild_hierarchies()
+    print("Hierarchien neu aufgebaut")
+    return 0
+
+def cmd_report_refresh(args):
+    # Für geplante Aufgaben (z. B. nächtlich), damit die Berichtsansicht nichts nachrechnen muss
+    if reports.refresh_facts(args.full):
+        print("Berichtsfakten aktualisiert")
+    else:
+        print("Berichtsfakten bereits aktuell")
+    return 0
+
+def cmd_sick_analysis(args):
+    count = sick_analytics.run_analysis(args.full)
+    if count is None:
+        print("Auswertung der Krankmeldungen bereits aktuell")
+    else:
+        print(f"Krankmeldungen von {count} Mitarbeitern ausgewertet")
+    return 0
+
+def cmd_year_close(args):
+    year = args.year or datetime.date.today().year - 1
+    run = year_close.close_year(year, args.force, args.format or ("csv", "pdf"))
+    print(f"Urlaubsjahr {year} abgeschlossen am {run['closed_at']}: {run['employees']} Mitarbeiter")
+    print(f"  Übertragen:          {run['carried_out']:g} Tage")
+    print(f"  Verfallen (Stichtag): {run['expired']:g} Tage")
+    print(f"  Über Obergrenze:     {run['forfeited']:g} Tage")
+    for path in json.loads(run['summary_files'] or "[]"):
+        print(f"  Zusammenfassung: {path}")
+    return 0
+
+def cmd_ics_export(args):
+    department_id = None
+    if args.department:
+        department_id = services.get_department_ids().get(args.department)
+        if department_id is None:
+            raise ValueError(f"Unbekannte Abteilung: {args.department}")
+    employee_id = None
+    if args.employee:
+        employee_id = services.get_employee_id_by_number(args.employee)
+        if employee_id is None:
+            raise ValueError(f"Unbekannte Personalnummer: {args.employee}")
+
+    result = ics_export.export_feed(args.name, department_id, employee_id, args.full, args.output_dir or ics_export.ICS_FEED_PATH)
+    if result is None:
+        print(f"Kalender-Feed {args.name} bereits aktuell")
+    elif result["path"] is None:
+        print(f"Kalender-Feed {args.name}: keine geänderten Termine")
+    else:
+        kind = "vollständig" if result["full"] else "Änderungen"
+        print(f"Kalender-Feed {args.name} ({kind}): {result['events']} Termine, {result['cancelled']} abgesagt -> {result['path']}")
+    return 0
+
+def cmd_reminders(args):
+    config = load_config()
+    outbox = reminders.get_outbox(args.outbox, config)
+    if args.once:
+        pending = reminders.send_pending_reminders(outbox, config=config)
+        events = reminders.send_event_reminders(outbox, config=config)
+        print(f"Erinnerungen versandt: {pending} offene Urlaubsanträge, {events} Geburtstage und Jubiläen")
+        return 0
+
+    # Ohne Oberfläche dauerhaft laufen lassen (z. B. als Dienst auf dem Server)
+    scheduler = reminders.build_scheduler(outbox=outbox, config=config)
+    print("Erinnerungen laufen, Beenden mit Strg+C")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+def cmd_archive(args):
+    counts = archive.archive_year(args.year)
+    print(f"Jahr {args.year} archiviert nach {archive.archive_file(args.year)}: "
+          + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    return 0
+
+def cmd_archive_restore(args):
+    counts = archive.restore_year(args.year)
+    print(f"Archiv {args.year} zurückgeholt: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    return 0
+
+def cmd_archive_purge(args):
+    deleted = archive.purge_expired(dry_run=args.dry_run)
+    prefix = "Würde löschen" if args.dry_run else "Gelöscht"
+    print(f"{prefix}: " + ", ".join(f"{table} {count}" for table, count in deleted.items()))
+    return 0
+
+def cmd_archive_list(args):
+    archives = archive.list_archives()
+    if not archives:
+        print("Keine Archive vorhanden")
+    for entry in archives:
+        counts = ", ".join(f"{table} {count}" for table, count in entry["row_counts"].items())
+        purged = f", gelöscht: {', '.join(entry['purged_tables'])}" if entry["purged_tables"] else ""
+        print(f"{entry['year']}: {entry['status']} ({counts}{purged}), {entry['size'] / 1024 / 1024:.1f} MB, "
+              f"{entry['archived_at'] or '-'} von {entry['archived_by'] or '-'}")
+    return 0
+
+def cmd_anonymize(args):
+    if args.dry_run:
+        result = anonymize.anonymize_inactive(dry_run=True)
+        print(f"Zu anonymisieren: {result['employees']} ausgeschiedene Mitarbeiter")
+        return 0
+    result = anonymize.anonymize_inactive(batch_size=args.batch_size,
+                                          progress=lambda count: print(f"  {count} anonymisiert", file=sys.stderr))
+    print(f"{result['employees']} ausgeschiedene Mitarbeiter anonymisiert, {result['files']} Dateien gelöscht")
+    if result["failed_files"]:
+        print(f"{result['failed_files']} Dateien konnten nicht gelöscht werden (siehe Protokoll)")
+        return 1
+    return 0
+
+def cmd_decrypt(args):
+    # Entschlüsseln erfordert das Passwort eines Administrators (privater Schlüssel)
+    password = getpass.getpass("Administratorpasswort: ")
+    if not encryption.unlock(password):
+        print("Falsches Passwort", file=sys.stderr)
+        return 1
+    output = args.output
+    if not output:
+        output = args.file[:-len(encryption.ENCRYPTED_SUFFIX)] if args.file.endswith(encryption.ENCRYPTED_SUFFIX) else args.file + ".dec"
+    encryption.decrypt_file(args.file, output)
+    print(f"Entschlüsselt nach {output}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="MitarbeiterPro Batch-Befehle")
+    parser.add_argument("--query-stats", metavar="DATEI", help="Abfragestatistik nach dem Befehl als JSON speichern")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Mitarbeiterdaten exportieren")
+    export_parser.add_argument("--output", "-o", help="Zieldatei (Standard: Exportverzeichnis)")
+    export_parser.add_argument("--format", "-f", choices=["csv", "pdf"], default="csv")
+    export_parser.set_defaults(func=cmd_export)
+
+    backup_parser = subparsers.add_parser("backup", help="Datenbank-Backup erstellen")
+    backup_parser.add_argument("--status", action="store_true", help="Nur Zustand des Backup-Planers anzeigen")
+    backup_parser.set_defaults(func=cmd_backup)
+
+    import_parser = subparsers.add_parser("import", help="Mitarbeiter aus CSV importieren")
+    import_parser.add_argument("input", help="CSV-Datei")
+    import_parser.set_defaults(func=cmd_import)
+
+    report_parser = subparsers.add_parser("report", help="Kennzahlenbericht ausgeben")
+    report_parser.add_argument("--year", type=int, help="Berichtsjahr (Standard: aktuelles Jahr)")
+    report_parser.add_argument("--json", action="store_true", help="Ausgabe als JSON")
+    report_parser.set_defaults(func=cmd_report)
+
+    report_refresh_parser = subparsers.add_parser("report-refresh", help="Monatliche Berichtsfakten fortschreiben")
+    report_refresh_parser.add_argument("--full", action="store_true", help="Alle Monate neu berechnen")
+    report_refresh_parser.set_defaults(func=cmd_report_refresh)
+
+    sick_parser = subparsers.add_parser("sick-analysis", help="Krankmeldungen auswerten (Bradford-Faktor, Muster, Atteste)")
+    sick_parser.add_argument("--full", action="store_true", help="Alle Mitarbeiter neu auswerten")
+    sick_parser.set_defaults(func=cmd_sick_analysis)
+
+    year_close_parser = subparsers.add_parser("year-close", help="Urlaubsjahr abschließen (Übertrag und Verfall)")
+    year_close_parser.add_argument("year", nargs="?", type=int, help="Abzuschließendes Jahr (Standard: Vorjahr)")
+    year_close_parser.add_argument("--force", action="store_true", help="Bereits abgeschlossenes Jahr neu berechnen")
+    year_close_parser.add_argument("--format", action="append", choices=["csv", "pdf"], help="Format der Zusammenfassung")
+    year_close_parser.set_defaults(func=cmd_year_close)
+
+    ics_parser = subparsers.add_parser("ics-export", help="Kalender-Feed (ICS) genehmigter Abwesenheiten exportieren")
+    ics_parser.add_argument("name", help="Name des Feeds (Dateiname)")
+    ics_parser.add_argument("--department", help="Nur diese Abteilung (mit Unterabteilungen)")
+    ics_parser.add_argument("--employee", help="Nur dieser Mitarbeiter (Personalnummer)")
+    ics_parser.add_argument("--full", action="store_true", help="Vollständigen Kalender statt nur Änderungen schreiben")
+    ics_parser.add_argument("--output-dir", help="Zielverzeichnis der Feeds")
+    ics_parser.set_defaults(func=cmd_ics_export)
+
+    reminders_parser = subparsers.add_parser("reminders", help="Erinnerungen an offene Anträge und anstehende Ereignisse versenden")
+    reminders_parser.add_argument("--once", action="store_true", help="Einmal prüfen und versenden statt dauerhaft zu laufen")
+    reminders_parser.add_argument("--outbox", choices=sorted(reminders.OUTBOXES), help="Postausgang (Standard aus Konfiguration)")
+    reminders_parser.set_defaults(func=cmd_reminders)
+
+    archive_parser = subparsers.add_parser("archive", help="Abgeschlossenes Jahr in ein Jahresarchiv verschieben")
+    archive_parser.add_argument("year", type=int, help="Zu archivierendes Jahr")
+    archive_parser.set_defaults(func=cmd_archive)
+
+    archive_restore_parser = subparsers.add_parser("archive-restore", help="Archiviertes Jahr zurückholen")
+    archive_restore_parser.add_argument("year", type=int, help="Zurückzuholendes Jahr")
+    archive_restore_parser.set_defaults(func=cmd_archive_restore)
+
+    archive_purge_parser = subparsers.add_parser("archive-purge", help="Daten nach Ablauf der Aufbewahrungsfrist löschen")
+    archive_purge_parser.add_argument("--dry-run", action="store_true", help="Nur zählen, nichts löschen")
+    archive_purge_parser.set_defaults(func=cmd_archive_purge)
+
+    archive_list_parser = subparsers.add_parser("archive-list", help="Jahresarchive anzeigen")
+    archive_list_parser.set_defaults(func=cmd_archive_list)
+
+    anonymize_parser = subparsers.add_parser("anonymize", help="Ausgeschiedene Mitarbeiter nach Ablauf der Frist anonymisieren")
+    anonymize_parser.add_argument("--dry-run", action="store_true", help="Nur zählen, nichts ändern")
+    anonymize_parser.add_argument("--batch-size", type=int, default=anonymize.ANONYMIZE_BATCH_SIZE,
+                                  help="Mitarbeiter je Transaktion")
+    anonymize_parser.set_defaults(func=cmd_anonymize)
+
+    decrypt_parser = subparsers.add_parser("decrypt", help="Verschlüsseltes Backup oder Export entschlüsseln")
+    decrypt_parser.add_argument("file", help="Verschlüsselte Datei (.enc)")
+    decrypt_parser.add_argument("--output", "-o", help="Zieldatei (Standard: ohne Endung .enc)")
+    decrypt_parser.set_defaults(func=cmd_decrypt)
+
+    serve_parser = subparsers.add_parser("serve", help="Lokale HTTP-API starten")
+    serve_parser.add_argument("--host", help="Adresse (Standard aus Konfiguration)")
+    serve_parser.add_argument("--port", type=int, help="Port (Standard aus Konfiguration)")
+    serve_parser.add_argument("--allow-writes", action="store_true", help="Schreibende Endpunkte freigeben")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    prune_parser = subparsers.add_parser("audit-prune", help="Alte Monate aus dem Audit-Log entfernen")
+    prune_parser.add_argument("--keep-months", type=int, help="Aufbewahrte Monate (Standard aus Konfiguration)")
+    prune_parser.set_defaults(func=cmd_audit_prune)
+
+    role_parser = subparsers.add_parser("user-role", help="Rolle eines Benutzers festlegen")
+    role_parser.add_argument("username")
+    role_parser.add_argument("role", help="z. B. admin, hr, manager, user")
+    role_parser.set_defaults(func=cmd_user_role)
+
+    departments_parser = subparsers.add_parser("user-departments", help="Abteilungen eines Benutzers festlegen")
+    departments_parser.add_argument("username")
+    departments_parser.add_argument("departments", nargs="*", help="Abteilungsnamen (leer: keine)")
+    departments_parser.set_defaults(func=cmd_user_departments)
+
+    org_parent_parser = subparsers.add_parser("org-parent", help="Abteilung einer übergeordneten Abteilung zuordnen")
+    org_parent_parser.add_argument("department")
+    org_parent_parser.add_argument("parent", nargs="?", help="Übergeordnete Abteilung (leer: oberste Ebene)")
+    org_parent_parser.set_defaults(func=cmd_org_parent)
+
+    org_manager_parser = subparsers.add_parser("org-manager", help="Vorgesetzten eines Mitarbeiters festlegen")
+    org_manager_parser.add_argument("employee", help="Personalnummer")
+    org_manager_parser.add_argument("manager", nargs="?", help="Personalnummer des Vorgesetzten (leer: keiner)")
+    org_manager_parser.set_defaults(func=cmd_org_manager)
+
+    org_rebuild_parser = subparsers.add_parser("org-rebuild", help="Closure-Tabellen der Hierarchien neu aufbauen")
+    org_rebuild_parser.set_defaults(func=cmd_org_rebuild)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    setup_logging("cli")
+    setup_directories()
+    query_stats.slow_query_ms = load_config().get("slow_query_ms", SLOW_QUERY_MS)
+    setup_database()
+
+    # Änderungen aus Batch-Jobs im Audit-Log kennzeichnen
+    set_current_user("cli")
+
+    try:
+        return args.func(args)
+    finally:
+        if args.query_stats:
+            query_stats.dump(args.query_stats)
+            print(f"Abfragestatistik gespeichert in {args.query_stats}", file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1496 @@
+import sqlite3
+import os
+import datetime
+import logging
+import time
+import functools
+import contextlib
+import threading
+import json
+import re
+import bisect
+import atexit
+import queue
+import logging.handlers
+import bcrypt
+import logs
+
+# Konstanten
+APP_NAME = "MitarbeiterPro"
+VERSION = "1.0.0"
+# Ohne APPDATA (z. B. bei Batch-Jobs außerhalb von Windows) ins Benutzerverzeichnis ausweichen
+APPDATA_DIR = os.path.join(os.getenv('APPDATA') or os.path.expanduser('~'), APP_NAME)
+DATABASE_PATH = os.path.join(APPDATA_DIR, 'employees.db')
+LOG_PATH = os.path.join(APPDATA_DIR, 'logs')
+EXPORT_PATH = os.path.join(APPDATA_DIR, 'exports')
+BACKUP_PATH = os.path.join(APPDATA_DIR, 'backups')
+CONFIG_PATH = os.path.join(APPDATA_DIR, 'config.json')
+IMAGE_CACHE_PATH = os.path.join(APPDATA_DIR, 'image_cache')
+METRICS_PATH = os.path.join(LOG_PATH, 'ui_metrics.jsonl')
+
+# Wartezeit in Millisekunden, bevor ein Zugriff auf eine gesperrte Datenbank fehlschlägt
+DB_BUSY_TIMEOUT_MS = 5000
+
+# Tabellen, deren Änderungen im Änderungsprotokoll (change_log) erfasst werden
+CHANGE_TRACKED_TABLES = [
+    "employees", "vacation", "sick_leave", "salary_history",
+    "expenses", "working_time", "departments", "documents"
+]
+
+# Aufbewahrungsdauer des Änderungsprotokolls in Tagen
+CHANGE_LOG_RETENTION_DAYS = 7
+
+# Tabellen im Audit-Log und die Spalte, die den betroffenen Mitarbeiter bezeichnet
+AUDITED_TABLES = {
+    "employees": "id",
+    "vacation": "employee_id",
+    "sick_leave": "employee_id",
+    "salary_history": "employee_id"
+}
+
+# Technische und abgeleitete Spalten, deren Änderung allein keinen Audit-Eintrag erzeugt
+AUDIT_IGNORED_COLUMNS = ("id", "updated_at", "version", "sick_days_used")
+
+# Standard-Kostenfaktor für bcrypt (Konfiguration: bcrypt_rounds); ältere Hashes werden bei der Anmeldung angepasst
+BCRYPT_ROUNDS = 12
+
+# Anmeldesperre: so viele Fehlversuche innerhalb des Zeitfensters sperren den Benutzernamen bis zu dessen Ablauf
+LOGIN_MAX_FAILURES = 5
+LOGIN_LOCKOUT_MINUTES = 15
+
+# Aufbewahrungsdauer der Anmeldeversuche in Tagen
+LOGIN_ATTEMPT_RETENTION_DAYS = 90
+
+# Berechtigungen der Rollenverwaltung
+PERMISSIONS = {
+    "employees.view": "Mitarbeiter anzeigen",
+    "employees.edit": "Mitarbeiter anlegen und bearbeiten",
+    "salary.view": "Gehälter einsehen",
+    "vacation.view": "Urlaub anzeigen",
+    "vacation.request": "Urlaub beantragen",
+    "vacation.approve": "Urlaub genehmigen und ablehnen",
+    "vacation.close": "Urlaubsjahr abschließen",
+    "sick_leave.view": "Krankmeldungen anzeigen",
+    "sick_leave.edit": "Krankmeldungen eintragen",
+    "documents.upload": "Dokumente hochladen",
+    "expenses.view": "Ausgaben anzeigen",
+    "working_time.view": "Arbeitszeiten anzeigen",
+    "audit.view": "Änderungsverlauf anzeigen",
+    "reports.view": "Berichte anzeigen",
+    "export": "Daten exportieren",
+    "settings.manage": "Einstellungen verwalten"
+}
+
+# Standardrollen: Beschreibung, Zugriff auf alle Abteilungen, Berechtigungen (nur beim Anlegen der Rolle
+# gesetzt; Administratoren erhalten bei jedem Start alle bekannten Berechtigungen)
+DEFAULT_ROLES = {
+    "admin": ("Administrator", True, tuple(PERMISSIONS)),
+    "hr": ("Personalabteilung", True, (
+        "employees.view", "employees.edit", "salary.view", "vacation.view", "vacation.request",
+        "vacation.approve", "vacation.close", "sick_leave.view", "sick_leave.edit", "documents.upload", "expenses.view",
+        "working_time.view", "audit.view", "reports.view", "export"
+    )),
+    "manager": ("Abteilungsleitung", False, (
+        "employees.view", "vacation.view", "vacation.request", "vacation.approve", "sick_leave.view",
+        "expenses.view", "working_time.view", "reports.view"
+    )),
+    "user": ("Mitarbeiter", False, ("employees.view", "vacation.view", "vacation.request"))
+}
+
+# Hierarchien mit Closure-Tabelle: Tabelle -> (Spalte des Elternelements, Closure-Tabelle)
+HIERARCHIES = {
+    "departments": ("parent_id", "department_closure"),
+    "employees": ("manager_id", "employee_closure")
+}
+
+# Zeilen pro Transaktion beim Umstellen von employees.department auf department_id
+DEPARTMENT_MIGRATION_BATCH_SIZE = 5000
+
+# Kalender der Berichtsfakten: erstes Jahr (frühere Eintritte zählen zum ersten Monat) und Jahre im Voraus
+REPORT_FIRST_YEAR = 1990
+REPORT_YEARS_AHEAD = 5
+
+# Jahresabschluss Urlaub: höchstens so viele Resttage gehen ins Folgejahr, übertragene Tage verfallen
+# nach diesem Stichtag (MM-TT) des Folgejahres, soweit sie bis dahin nicht genommen wurden (§ 7 Abs. 3 BUrlG)
+VACATION_CARRYOVER_MAX_DAYS = 10
+VACATION_CARRYOVER_EXPIRY = "03-31"
+
+# Erinnerungen: Urlaubsanträge, die seit so vielen Tagen offen sind (danach erneut in diesem Abstand),
+# und Geburtstage bzw. Jubiläen, die in so vielen Tagen anstehen
+REMINDER_PENDING_DAYS = 3
+REMINDER_EVENT_DAYS = 7
+
+# Ausgeschiedene Mitarbeiter werden so viele Jahre nach dem Austritt anonymisiert (Ende der regelmäßigen
+# Verjährung möglicher Ansprüche aus dem Arbeitsverhältnis, § 195 BGB)
+ANONYMIZE_AFTER_YEARS = 3
+
+# Anzahl freier Verbindungen, die pro Thread zur Wiederverwendung vorgehalten werden
+CONNECTION_POOL_SIZE = 4
+
+# Angemeldeter Benutzer für das Audit-Log (wird an jede Verbindung als SQL-Funktion gebunden)
+_current_user = None
+_thread_user = threading.local()
+
+def set_current_user(username):
+    global _current_user
+    _current_user = username
+
+def get_current_user():
+    return getattr(_thread_user, "username", None) or _current_user
+
+# Änderungen im aktuellen Thread einem anderen Benutzer zuordnen (z. B. API-Schreibzugriffe neben der Oberfläche)
+@contextlib.contextmanager
+def acting_user(username):
+    previous = getattr(_thread_user, "username", None)
+    _thread_user.username = username
+    try:
+        yield
+    finally:
+        _thread_user.username = previous
+
+logger = logging.getLogger(APP_NAME)
+
+# Protokolldateien: Rotation ab dieser Größe bzw. beim ersten Eintrag eines neuen Tages,
+# komprimierte Archive werden nach so vielen Tagen gelöscht
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_RETENTION_DAYS = 30
+
+_log_listener = None
+
+# Logger einrichten: Aufrufer (auch der Tk-Thread) legen Einträge nur in eine Warteschlange; ein
+# QueueListener schreibt sie im Hintergrund als JSON-Zeilen (logs/<name>.jsonl) und auf die Konsole.
+# name trennt die Dateien von Oberfläche ("app") und Kommandozeile ("cli").
+def setup_logging(name="app"):
+    global _log_listener
+    if _log_listener is not None:
+        return logger
+    os.makedirs(LOG_PATH, exist_ok=True)
+    
+    file_handler = logs.RotatingJsonFileHandler(LOG_PATH, name, LOG_MAX_BYTES, LOG_RETENTION_DAYS)
+    file_handler.setFormatter(logs.JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logs.ContextQueueHandler(log_queue, get_current_user))
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(stop_logging)
+    return logger
+
+# Ausstehende Einträge schreiben und die Dateien schließen (beim Beenden)
+def stop_logging():
+    global _log_listener
+    if _log_listener is None:
+        return
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, logs.ContextQueueHandler):
+            root_logger.removeHandler(handler)
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
+    _log_listener = None
+
+# Verzeichnisse erstellen
+def setup_directories():
+    for directory in [APPDATA_DIR, LOG_PATH, EXPORT_PATH, BACKUP_PATH, IMAGE_CACHE_PATH]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+# Grenzen der Latenz-Histogramme in Millisekunden (letzter Eimer: alles darüber)
+QUERY_HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Standardgrenze für langsame Abfragen (Konfiguration: slow_query_ms)
+SLOW_QUERY_MS = 200
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_SQL_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SQL_WHITESPACE = re.compile(r"\s+")
+
+# Abfrageform: Literale durch ? ersetzen und IN-Listen zusammenfassen, damit gleiche
+# Abfragen mit unterschiedlichen Werten gemeinsam gezählt werden
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    shape = _SQL_STRING.sub("?", sql)
+    shape = _SQL_NUMBER.sub("?", shape)
+    shape = _SQL_WHITESPACE.sub(" ", shape).strip()
+    return _SQL_PLACEHOLDER_LIST.sub("(?, ...)", shape)
+
+# Anzahl, Laufzeit und Histogramm je Abfrageform; langsame Abfragen werden mit Ausführungsplan geloggt
+class QueryStats:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.enabled = True
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._plans = {}
+        self._thread = threading.local()
+        self.started_at = datetime.datetime.now()
+    
+    # Summe der Abfragezeit im aktuellen Thread (z. B. Datenanteil beim Aufbau einer Ansicht)
+    def thread_time_ms(self):
+        return getattr(self._thread, "elapsed_ms", 0.0)
+    
+    def record(self, conn, sql, params, elapsed_ms):
+        self._thread.elapsed_ms = self.thread_time_ms() + elapsed_ms
+        shape = normalize_sql(sql)
+        with self._lock:
+            entry = self._stats.get(shape)
+            if entry is None:
+                entry = self._stats[shape] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "histogram": [0] * (len(QUERY_HISTOGRAM_BOUNDS_MS) + 1), "slow": 0
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["histogram"][bisect.bisect_left(QUERY_HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+            slow = self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms
+            if slow:
+                entry["slow"] += 1
+        
+        if slow:
+            plan = self.explain(conn, shape, sql, params)
+            logger.warning(f"Langsame Abfrage ({elapsed_ms:.1f} ms): {shape}\nAusführungsplan:\n{plan}")
+    
+    # Ausführungsplan einmal je Abfrageform ermitteln (an der Instrumentierung vorbei)
+    def explain(self, conn, shape, sql, params):
+        with self._lock:
+            if shape in self._plans:
+                return self._plans[shape]
+        
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")):
+            return "-"
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+            plan = "\n".join(f"  {row[0]}|{row[1]}: {row[3]}" for row in rows)
+        except sqlite3.Error as e:
+            plan = f"  nicht verfügbar: {e}"
+        
+        with self._lock:
+            self._plans[shape] = plan
+        return plan
+    
+    # Geschätztes Perzentil aus dem Histogramm (obere Grenze des Eimers)
+    @staticmethod
+    def percentile(entry, fraction):
+        target = entry["count"] * fraction
+        seen = 0
+        for index, count in enumerate(entry["histogram"]):
+            seen += count
+            if count and seen >= target:
+                return QUERY_HISTOGRAM_BOUNDS_MS[index] if index < len(QUERY_HISTOGRAM_BOUNDS_MS) else entry["max_ms"]
+        return entry["max_ms"]
+    
+    # Momentaufnahme, nach Gesamtzeit absteigend sortiert
+    def snapshot(self):
+        with self._lock:
+            items = [(shape, dict(entry, histogram=list(entry["histogram"]))) for shape, entry in self._stats.items()]
+            plans = dict(self._plans)
+        
+        queries = []
+        for shape, entry in sorted(items, key=lambda item: item[1]["total_ms"], reverse=True):
+            entry["sql"] = shape
+            entry["mean_ms"] = entry["total_ms"] / entry["count"]
+            entry["p95_ms"] = self.percentile(entry, 0.95)
+            if shape in plans:
+                entry["plan"] = plans[shape]
+            queries.append(entry)
+        
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "slow_query_ms": self.slow_query_ms,
+            "histogram_bounds_ms": list(QUERY_HISTOGRAM_BOUNDS_MS),
+            "queries": queries
+        }
+    
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._plans = {}
+            self.started_at = datetime.datetime.now()
+    
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=4, ensure_ascii=False)
+
+query_stats = QueryStats()
+
+# Cursor, der Ausführung und Abholen der Ergebnisse einer Anweisung zusammen misst; die Messung
+# wird abgeschlossen, sobald alle Zeilen gelesen sind oder die nächste Anweisung beginnt
+class InstrumentedCursor(sqlite3.Cursor):
+    _pending = None
+    
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql, params, elapsed = pending
+            query_stats.record(self.connection, sql, params, elapsed * 1000)
+    
+    def _timed(self, method, sql, params):
+        self._finish()
+        if not query_stats.enabled:
+            return method(self, sql, params)
+        
+        start = time.perf_counter()
+        try:
+            return method(self, sql, params)
+        finally:
+            self._pending = (sql, params, time.perf_counter() - start)
+            if self.description is None:
+                # Keine Ergebniszeilen (INSERT, UPDATE, DDL): sofort abschließen
+                self._finish()
+    
+    def execute(self, sql, parameters=()):
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+    
+    def _fetch(self, method, *args):
+        if self._pending is None:
+            return method(self, *args)
+        
+        start = time.perf_counter()
+        result = method(self, *args)
+        sql, params, elapsed = self._pending
+        self._pending = (sql, params, elapsed + time.perf_counter() - start)
+        if not result or method is sqlite3.Cursor.fetchall:
+            self._finish()
+        return result
+    
+    def fetchone(self):
+        return self._fetch(sqlite3.Cursor.fetchone)
+    
+    def fetchmany(self, size=None):
+        return self._fetch(sqlite3.Cursor.fetchmany, size or self.arraysize)
+    
+    def fetchall(self):
+        return self._fetch(sqlite3.Cursor.fetchall)
+    
+    def __next__(self):
+        row = self._fetch(sqlite3.Cursor.fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+    
+    def close(self):
+        try:
+            self._finish()
+        finally:
+            super().close()
+    
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+# Verbindung, deren Anweisungen (auch über Connection.execute) von InstrumentedCursor gemessen werden
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+_connection_pool = threading.local()
+
+# Verbindung, die beim Schließen in den Pool ihres Threads zurückgeht: so muss nicht bei jedem
+# Öffnen das komplette Schema (mit allen Triggern) neu eingelesen werden
+class PooledConnection(InstrumentedConnection):
+    def close(self):
+        free = getattr(_connection_pool, "free", None)
+        if free is None or self in free or len(free) >= CONNECTION_POOL_SIZE:
+            return super().close()
+        
+        try:
+            # Nicht abgeschlossene Transaktionen nicht an den nächsten Nutzer weitergeben
+            self.rollback()
+        except sqlite3.Error:
+            return super().close()
+        
+        self.row_factory = None
+        free.append(self)
+
+# Datenbankverbindung öffnen (timeout setzt das busy_timeout der Verbindung)
+def get_connection(row_factory=None):
+    free = getattr(_connection_pool, "free", None)
+    if free is None:
+        free = _connection_pool.free = []
+    
+    if free:
+        conn = free.pop()
+    else:
+        conn = sqlite3.connect(DATABASE_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000, factory=PooledConnection)
+        conn.create_function("current_app_user", 0, get_current_user)
+    
+    if row_factory:
+        conn.row_factory = row_factory
+    return conn
+
+# Freie Verbindungen des aktuellen Threads endgültig schließen (z. B. vor dem Ersetzen der Datenbankdatei)
+def close_pooled_connections():
+    free = getattr(_connection_pool, "free", None)
+    while free:
+        sqlite3.Connection.close(free.pop())
+
+# Prüft, ob ein Fehler auf eine von einer anderen Verbindung gesperrte Datenbank zurückgeht
+def is_busy_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+# Schreibvorgänge wiederholen, wenn die Datenbank trotz busy_timeout noch gesperrt ist
+# (z. B. wenn im WAL-Modus eine Lesetransaktion zur Schreibtransaktion wird)
+def retry_on_busy(func=None, attempts=5, delay=0.1):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if not is_busy_error(e) or attempt == attempts - 1:
+                        raise
+                    logger.warning(f"Datenbank gesperrt, neuer Versuch {attempt + 2}/{attempts}: {func.__name__}")
+                    time.sleep(delay * (2 ** attempt))
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+# Passwort-Hash erzeugen (rechenintensiv, daher nicht im Tk-Thread aufrufen)
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+# Kostenfaktor aus einem bcrypt-Hash ("$2b$12$...")
+def hash_rounds(password_hash):
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+# Spalte nachträglich hinzufügen, falls sie in einer bestehenden Datenbank fehlt
+def ensure_column(cursor, table, column, definition):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+# Audit-Trigger aus den aktuellen Tabellenspalten (neu) erzeugen; gespeichert werden nur
+# geänderte Spalten als JSON-Objekt {"spalte": [alt, neu]}, NULL-Einträge entfernt json_patch
+def create_audit_triggers(cursor):
+    for table, employee_column in AUDITED_TABLES.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in cursor.fetchall() if row[1] not in AUDIT_IGNORED_COLUMNS]
+        
+        new_values = ", ".join(f"'{column}', NEW.{column}" for column in columns)
+        old_values = ", ".join(f"'{column}', OLD.{column}" for column in columns)
+        diff_values = ", ".join(
+            f"'{column}', CASE WHEN OLD.{column} IS NOT NEW.{column} THEN json_array(OLD.{column}, NEW.{column}) END"
+            for column in columns
+        )
+        changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+        
+        triggers = {
+            "insert": ("AFTER INSERT", "", "NEW", "I", new_values),
+            "update": ("AFTER UPDATE", f"WHEN {changed}", "NEW", "U", diff_values),
+            "delete": ("AFTER DELETE", "", "OLD", "D", old_values)
+        }
+        
+        for name, (event, condition, row, operation, values) in triggers.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_audit_{name}")
+            cursor.execute(f'''
+            CREATE TRIGGER trg_{table}_audit_{name}
+            {event} ON {table}
+            {condition}
+            BEGIN
+                INSERT INTO audit_log (partition_month, changed_at, changed_by, table_name, row_id, employee_id, operation, changes)
+                VALUES (
+                    strftime('%Y-%m', 'now', 'localtime'),
+                    strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'),
+                    current_app_user(),
+                    '{table}',
+                    {row}.id,
+                    {row}.{employee_column},
+                    '{operation}',
+                    json_patch('{{}}', json_object({values}))
+                );
+            END
+            ''')
+
+# Closure-Tabelle (alle Vorfahr-Nachfahr-Paare mit Abstand) und Trigger, die sie bei Einfügen,
+# Umhängen und Löschen aktuell halten; Teilbäume lassen sich so mit einer indizierten Abfrage lesen
+def create_closure(cursor, table, parent_column, closure_table):
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS {closure_table} (
+        ancestor_id INTEGER NOT NULL,
+        descendant_id INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor_id, descendant_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{closure_table}_descendant ON {closure_table} (descendant_id, depth)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{parent_column} ON {table} ({parent_column})")
+    
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_closure_insert
+    AFTER INSERT ON {table}
+    BEGIN
+        INSERT INTO {closure_table} (ancestor_id, descendant_id, depth)
+        SELECT NEW.id, NEW.id, 0
+        UNION ALL
+        SELECT ancestor_id, NEW.id, depth + 1 FROM {closure_table} WHERE descendant_id = NEW.{parent_column};
+    END
+    ''')
+    
+    # Ein Element darf nicht unter sich selbst oder einen seiner Nachfahren gehängt werden
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_closure_cycle
+    BEFORE UPDATE OF {parent_column} ON {table}
+    WHEN NEW.{parent_column} IS NOT NULL
+    BEGIN
+        SELECT RAISE(ABORT, 'Zirkelbezug in der Hierarchie')
+        WHERE EXISTS (SELECT 1 FROM {closure_table} WHERE ancestor_id = NEW.id AND descendant_id = NEW.{parent_column});
+    END
+    ''')
+    
+    # Umhängen: Verbindungen des Teilbaums zu den alten Vorfahren lösen, zu den neuen herstellen
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_closure_move
+    AFTER UPDATE OF {parent_column} ON {table}
+    WHEN OLD.{parent_column} IS NOT NEW.{parent_column}
+    BEGIN
+        DELETE FROM {closure_table}
+        WHERE descendant_id IN (SELECT descendant_id FROM {closure_table} WHERE ancestor_id = NEW.id)
+          AND ancestor_id IN (SELECT ancestor_id FROM {closure_table} WHERE descendant_id = NEW.id AND ancestor_id != NEW.id);
+        INSERT INTO {closure_table} (ancestor_id, descendant_id, depth)
+        SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+        FROM {closure_table} above, {closure_table} below
+        WHERE above.descendant_id = NEW.{parent_column} AND below.ancestor_id = NEW.id;
+    END
+    ''')
+    
+    # Löschen: Kinder rücken eine Ebene nach oben
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_closure_delete
+    AFTER DELETE ON {table}
+    BEGIN
+        UPDATE {table} SET {parent_column} = OLD.{parent_column} WHERE {parent_column} = OLD.id;
+        DELETE FROM {closure_table} WHERE descendant_id = OLD.id OR ancestor_id = OLD.id;
+    END
+    ''')
+
+# Closure-Tabelle vollständig aus der Elternspalte neu aufbauen (z. B. nach Massenimport ohne Trigger)
+def rebuild_closure(cursor, table, parent_column, closure_table):
+    cursor.execute(f"DELETE FROM {closure_table}")
+    cursor.execute(f'''
+    INSERT INTO {closure_table} (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0 FROM {table}
+        UNION ALL
+        SELECT tree.ancestor_id, child.id, tree.depth + 1
+        FROM tree JOIN {table} child ON child.{parent_column} = tree.descendant_id
+        WHERE tree.depth < 100
+    )
+    SELECT ancestor_id, descendant_id, MIN(depth) FROM tree GROUP BY ancestor_id, descendant_id
+    ''')
+
+# Monatliche Berichtsfakten je Abteilung (Abteilung 0: ohne Abteilung) mit Monatskalender und
+# Änderungsmarken: Trigger markieren betroffene Monate, reports.refresh_facts rechnet nur diese neu
+def create_report_facts(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_months (
+        month TEXT PRIMARY KEY,
+        first_day TEXT NOT NULL,
+        last_day TEXT NOT NULL,
+        days INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_facts (
+        month TEXT NOT NULL,
+        department_id INTEGER NOT NULL,
+        headcount INTEGER NOT NULL DEFAULT 0,
+        hires INTEGER NOT NULL DEFAULT 0,
+        exits INTEGER NOT NULL DEFAULT 0,
+        vacation_days REAL NOT NULL DEFAULT 0,
+        sick_days REAL NOT NULL DEFAULT 0,
+        sick_rate REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, department_id)
+    ) WITHOUT ROWID
+    ''')
+    # kind 'leave': Abwesenheiten des Monats neu verteilen; kind 'staff' (ohne Monat): Personalbestand neu rechnen
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_dirty (
+        kind TEXT NOT NULL,
+        month TEXT NOT NULL,
+        PRIMARY KEY (kind, month)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    INSERT OR IGNORE INTO report_months (month, first_day, last_day, days)
+    WITH RECURSIVE months (first_day) AS (
+        SELECT ?
+        UNION ALL
+        SELECT date(first_day, '+1 month') FROM months WHERE first_day < ?
+    )
+    SELECT substr(first_day, 1, 7), first_day, date(first_day, '+1 month', '-1 day'),
+           julianday(first_day, '+1 month') - julianday(first_day)
+    FROM months
+    ''', (f"{REPORT_FIRST_YEAR}-01-01", f"{datetime.date.today().year + REPORT_YEARS_AHEAD}-12-01"))
+    
+    # Monate eines Abwesenheitszeitraums (Bereichsabfrage auf dem Primärschlüssel des Kalenders)
+    def leave_months(row):
+        return f'''
+        INSERT OR IGNORE INTO report_dirty (kind, month)
+        SELECT 'leave', month FROM report_months
+        WHERE month BETWEEN substr({row}.start_date, 1, 7) AND substr({row}.end_date, 1, 7);'''
+    
+    for table in ("vacation", "sick_leave"):
+        # (employee_id, start_date) ersetzt den früheren Index nur auf employee_id: sortierter Durchlauf je Mitarbeiter
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_employee")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_employee_start ON {table} (employee_id, start_date)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_end_date ON {table} (end_date, start_date)")
+        triggers = {
+            "insert": ("AFTER INSERT", leave_months("NEW")),
+            "update": ("AFTER UPDATE OF employee_id, start_date, end_date, days, status" if table == "vacation"
+                       else "AFTER UPDATE OF employee_id, start_date, end_date, days", leave_months("OLD") + leave_months("NEW")),
+            "delete": ("AFTER DELETE", leave_months("OLD"))
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_report_{name}
+            {event} ON {table}
+            BEGIN{body}
+            END
+            ''')
+    
+    # Abwesenheiten eines Mitarbeiters zählen zu seiner Abteilung; wechselt sie, ändern sich alle seine Monate
+    employee_leave_months = '''
+        INSERT OR IGNORE INTO report_dirty (kind, month)
+        SELECT 'leave', m.month FROM vacation a
+        JOIN report_months m ON m.month BETWEEN substr(a.start_date, 1, 7) AND substr(a.end_date, 1, 7)
+        WHERE a.employee_id = OLD.id
+        UNION
+        SELECT 'leave', m.month FROM sick_leave a
+        JOIN report_months m ON m.month BETWEEN substr(a.start_date, 1, 7) AND substr(a.end_date, 1, 7)
+        WHERE a.employee_id = OLD.id;'''
+    staff = '''
+        INSERT OR IGNORE INTO report_dirty (kind, month) VALUES ('staff', '');'''
+    triggers = {
+        "insert": ("AFTER INSERT", "", staff),
+        "update": ("AFTER UPDATE OF hire_date, exit_date, status, department_id", "", staff),
+        "department": ("AFTER UPDATE OF department_id", "WHEN OLD.department_id IS NOT NEW.department_id", employee_leave_months),
+        "delete": ("AFTER DELETE", "", staff + employee_leave_months)
+    }
+    for name, (event, condition, body) in triggers.items():
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_employees_report_{name}
+        {event} ON employees
+        {condition}
+        BEGIN{body}
+        END
+        ''')
+
+# Zwischengespeicherte Auswertung der Krankmeldungen je Mitarbeiter; Trigger merken Mitarbeiter mit
+# geänderten Krankmeldungen vor, damit die Auswertung nur für diese neu laufen muss
+def create_sick_leave_summary(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sick_leave_summary (
+        employee_id INTEGER PRIMARY KEY,
+        spells INTEGER NOT NULL,
+        sick_days INTEGER NOT NULL,
+        bradford INTEGER NOT NULL,
+        monday_friday_spells INTEGER NOT NULL,
+        certificates_required INTEGER NOT NULL,
+        certificates_missing INTEGER NOT NULL,
+        last_sick_day TEXT,
+        year_days INTEGER NOT NULL,
+        computed_at TEXT NOT NULL,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sick_leave_summary_bradford ON sick_leave_summary (bradford)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS sick_leave_dirty (employee_id INTEGER PRIMARY KEY)")
+    
+    # Letzter Lauf je Auswertung (Datum, Dauer, Anzahl Ergebnisse)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS analytics_runs (
+        job TEXT PRIMARY KEY,
+        last_run TEXT NOT NULL,
+        duration_ms REAL,
+        row_count INTEGER
+    )
+    ''')
+    
+    mark = "INSERT OR IGNORE INTO sick_leave_dirty (employee_id) VALUES ({}.employee_id);"
+    triggers = {
+        "insert": ("AFTER INSERT", mark.format("NEW")),
+        "update": ("AFTER UPDATE", mark.format("OLD") + " " + mark.format("NEW")),
+        "delete": ("AFTER DELETE", mark.format("OLD"))
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_sick_leave_analytics_{name}
+        {event} ON sick_leave
+        BEGIN
+            {body}
+        END
+        ''')
+
+# Ergebnis des Urlaubs-Jahresabschlusses je Mitarbeiter und Jahr sowie Status der Abschlussläufe
+def create_vacation_balances(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS vacation_balances (
+        employee_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        entitlement INTEGER NOT NULL,
+        carried_in REAL NOT NULL,
+        expired REAL NOT NULL,
+        taken REAL NOT NULL,
+        remaining REAL NOT NULL,
+        carried_out REAL NOT NULL,
+        forfeited REAL NOT NULL,
+        closed_at TEXT NOT NULL,
+        PRIMARY KEY (year, employee_id),
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacation_balances_employee ON vacation_balances (employee_id, year)")
+    
+    # status: 'closed' nach dem Commit der Salden, 'done' nach dem Schreiben der Zusammenfassung
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS year_close_runs (
+        year INTEGER PRIMARY KEY,
+        status TEXT NOT NULL,
+        carryover_max_days REAL,
+        carryover_expiry TEXT NOT NULL,
+        employees INTEGER NOT NULL,
+        carried_out REAL NOT NULL,
+        expired REAL NOT NULL,
+        forfeited REAL NOT NULL,
+        duration_ms REAL,
+        closed_at TEXT NOT NULL,
+        closed_by TEXT,
+        summary_files TEXT
+    )
+    ''')
+
+# Geplante Kalender-Feeds (ICS) und je Feed der zuletzt exportierte Stand jedes Termins
+def create_ics_feeds(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ics_feeds (
+        name TEXT PRIMARY KEY,
+        department_id INTEGER,
+        employee_id INTEGER,
+        sequence INTEGER NOT NULL,
+        last_change_id INTEGER NOT NULL,
+        last_export_at TEXT NOT NULL,
+        last_path TEXT,
+        last_events INTEGER,
+        last_full INTEGER
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ics_feed_events (
+        feed TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        sequence INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        PRIMARY KEY (feed, kind, row_id)
+    ) WITHOUT ROWID
+    ''')
+
+# Verzeichnis der Jahresarchive (je abgeschlossenem Jahr eine SQLite-Datei mit Urlaub, Krankmeldungen
+# und Arbeitszeiten), die Liste der archivierten Jahre und der Anteil archivierter bzw. gelöschter
+# Abwesenheiten an den Berichtsfakten (bleibt nach dem Löschen als anonyme Summe erhalten)
+def create_archives(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS archives (
+        year INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        status TEXT NOT NULL,
+        row_counts TEXT,
+        archived_at TEXT,
+        archived_by TEXT,
+        purged_tables TEXT
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_archived_leave (
+        year INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        department_id INTEGER NOT NULL,
+        vacation_days REAL NOT NULL DEFAULT 0,
+        sick_days REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, month, department_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_working_time_date ON working_time (date)")
+
+# Anonymisierung ausgeschiedener Mitarbeiter: Zeitpunkt je Mitarbeiter, Teilindex für die noch offenen
+# Fälle nach Austrittsdatum und ein knappes Protokoll (wer, wann, wie viele Dokumente; keine Inhalte)
+def create_anonymization(cursor):
+    ensure_column(cursor, "employees", "anonymized_at", "TEXT")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS anonymization_log (
+        employee_id INTEGER PRIMARY KEY,
+        exit_date TEXT,
+        anonymized_at TEXT NOT NULL,
+        anonymized_by TEXT,
+        documents INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anonymization_log_at ON anonymization_log (anonymized_at)")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_employees_anonymize ON employees (exit_date)
+    WHERE status != 'Aktiv' AND anonymized_at IS NULL
+    ''')
+    for table in ("documents", "salary_history", "expenses", "working_time"):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_employee ON {table} (employee_id)")
+
+# Versandte Erinnerungen (je Art, Datensatz und Fälligkeitstag höchstens einmal) und Teilindizes, über die
+# der Planer fällige Einträge findet: offene Anträge nach Antragsdatum, Geburts- und Eintrittstage nach MM-TT
+def create_reminders(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reminders_sent (
+        kind TEXT NOT NULL,
+        ref_id INTEGER NOT NULL,
+        due_date TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        sent_at TEXT NOT NULL,
+        PRIMARY KEY (kind, ref_id, due_date)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacation_pending ON vacation (created_at) WHERE status = 'Beantragt'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_birthday ON employees (substr(birth_date, 6, 5)) WHERE status = 'Aktiv'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_hire_day ON employees (substr(hire_date, 6, 5)) WHERE status = 'Aktiv'")
+
+# Abteilung der Mitarbeiter von Namen (employees.department) auf den Fremdschlüssel department_id umstellen.
+# Die Zeilen werden blockweise mit eigenem Commit befüllt; ein abgebrochener Lauf setzt beim nächsten Start fort.
+def migrate_employee_departments(cursor):
+    cursor.execute("PRAGMA table_info(employees)")
+    if "department" not in [row[1] for row in cursor.fetchall()]:
+        return
+    
+    logger.info("Abteilungen der Mitarbeiter werden auf department_id umgestellt")
+    ensure_column(cursor, "employees", "department_id", "INTEGER REFERENCES departments (id)")
+    
+    # Audit-Trigger lesen die alte Spalte, der Änderungs-Trigger würde jede Zeile protokollieren;
+    # setup_database legt beide anschließend neu an
+    for trigger in ("audit_insert", "audit_update", "audit_delete", "change_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_employees_{trigger}")
+    cursor.execute("DROP INDEX IF EXISTS idx_employees_department")
+    
+    # Abteilungen, die bisher nur als Text bei Mitarbeitern vorkamen, anlegen
+    current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute('''
+    INSERT OR IGNORE INTO departments (name, created_at, updated_at)
+    SELECT DISTINCT department, ?, ? FROM employees WHERE department IS NOT NULL AND department != ''
+    ''', (current_time, current_time))
+    cursor.connection.commit()
+    
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM employees")
+    max_id = cursor.fetchone()[0]
+    for start in range(0, max_id, DEPARTMENT_MIGRATION_BATCH_SIZE):
+        cursor.execute('''
+        UPDATE employees
+        SET department_id = (SELECT d.id FROM departments d WHERE d.name = employees.department)
+        WHERE id > ? AND id <= ? AND department_id IS NULL AND department IS NOT NULL AND department != ''
+        ''', (start, start + DEPARTMENT_MIGRATION_BATCH_SIZE))
+        cursor.connection.commit()
+    
+    # DROP COLUMN erst ab SQLite 3.35; ältere Versionen behalten die Spalte unter anderem Namen
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE employees DROP COLUMN department")
+    else:
+        cursor.execute("ALTER TABLE employees RENAME COLUMN department TO department_legacy")
+    
+    logger.info(f"Abteilungen von {max_id} Mitarbeitern umgestellt")
+
+# Datenbank erstellen und initialisieren
+def setup_database():
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # WAL-Modus: Leser blockieren den Schreiber nicht (bleibt in der Datenbankdatei gespeichert)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
+    # Mitarbeitertabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id TEXT UNIQUE,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        birth_date TEXT,
+        address TEXT,
+        phone TEXT,
+        email TEXT,
+        position TEXT,
+        department_id INTEGER REFERENCES departments (id),
+        hire_date TEXT,
+        salary REAL,
+        status TEXT DEFAULT 'Aktiv',
+        vacation_days_per_year INTEGER DEFAULT 30,
+        sick_days_used INTEGER DEFAULT 0,
+        profile_image TEXT,
+        notes TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        version INTEGER NOT NULL DEFAULT 1
+    )
+    ''')
+    
+    # Urlaubstabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS vacation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        start_date TEXT,
+        end_date TEXT,
+        days INTEGER,
+        status TEXT DEFAULT 'Beantragt',
+        approved_by TEXT,
+        approved_date TEXT,
+        notes TEXT,
+        created_at TEXT,
+        version INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    
+    # Krankschreibungstabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sick_leave (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        start_date TEXT,
+        end_date TEXT,
+        days INTEGER,
+        medical_certificate BOOLEAN,
+        notes TEXT,
+        created_at TEXT,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    
+    # Gehaltstabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS salary_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        amount REAL,
+        effective_date TEXT,
+        created_at TEXT,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    
+    # Ausgabentabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        amount REAL,
+        category TEXT,
+        date TEXT,
+        receipt_path TEXT,
+        status TEXT DEFAULT 'Eingereicht',
+        approved_by TEXT,
+        approved_date TEXT,
+        notes TEXT,
+        created_at TEXT,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    
+    # Arbeitszeitentabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS working_time (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        date TEXT,
+        start_time TEXT,
+        end_time TEXT,
+        break_duration INTEGER,
+        total_hours REAL,
+        notes TEXT,
+        created_at TEXT,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    
+    # Benutzertabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password_hash TEXT,
+        full_name TEXT,
+        role TEXT,
+        last_login TEXT,
+        created_at TEXT,
+        updated_at TEXT
+    )
+    ''')
+
+    # Anmeldeversuche für die Sperre nach wiederholten Fehlversuchen
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS login_attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL,
+        attempted_at TEXT NOT NULL,
+        success INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_login_attempts_user ON login_attempts (username, attempted_at)")
+    
+    # Rollen, ihre Berechtigungen und die Abteilungen, auf die ein Benutzer beschränkt ist
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS roles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        description TEXT,
+        all_departments INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS role_permissions (
+        role_id INTEGER NOT NULL,
+        permission TEXT NOT NULL,
+        PRIMARY KEY (role_id, permission),
+        FOREIGN KEY (role_id) REFERENCES roles (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_departments (
+        user_id INTEGER NOT NULL,
+        department_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, department_id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (department_id) REFERENCES departments (id)
+    ) WITHOUT ROWID
+    ''')
+    
+    for role, (description, all_departments, permissions) in DEFAULT_ROLES.items():
+        cursor.execute("INSERT OR IGNORE INTO roles (name, description, all_departments) VALUES (?, ?, ?)",
+                       (role, description, 1 if all_departments else 0))
+        if cursor.rowcount or role == "admin":
+            cursor.execute("SELECT id FROM roles WHERE name = ?", (role,))
+            role_id = cursor.fetchone()[0]
+            cursor.executemany("INSERT OR IGNORE INTO role_permissions (role_id, permission) VALUES (?, ?)",
+                               [(role_id, permission) for permission in permissions])
+    
+    # Abteilungstabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS departments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE,
+        description TEXT,
+        manager_id INTEGER,
+        created_at TEXT,
+        updated_at TEXT,
+        FOREIGN KEY (manager_id) REFERENCES employees (id)
+    )
+    ''')
+
+    # Dokumententabelle
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        document_type TEXT,
+        file_path TEXT,
+        upload_date TEXT,
+        notes TEXT,
+        created_at TEXT,
+        FOREIGN KEY (employee_id) REFERENCES employees (id)
+    )
+    ''')
+    
+    # Versionsspalten für optimistisches Sperren in bestehenden Datenbanken ergänzen
+    ensure_column(cursor, "employees", "version", "INTEGER NOT NULL DEFAULT 1")
+    ensure_column(cursor, "vacation", "version", "INTEGER NOT NULL DEFAULT 1")
+    
+    # Abteilungshierarchie und Berichtslinien
+    ensure_column(cursor, "departments", "parent_id", "INTEGER REFERENCES departments (id)")
+    ensure_column(cursor, "employees", "manager_id", "INTEGER REFERENCES employees (id)")
+    for table, (parent_column, closure_table) in HIERARCHIES.items():
+        create_closure(cursor, table, parent_column, closure_table)
+    
+    # Abteilung als Fremdschlüssel statt als Name
+    migrate_employee_departments(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_department_id ON employees (department_id)")
+    
+    # Austrittsdatum: wird beim Wechsel aus dem bzw. in den Status 'Aktiv' gesetzt bzw. gelöscht
+    ensure_column(cursor, "employees", "exit_date", "TEXT")
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_exit_date
+    AFTER UPDATE OF status ON employees
+    WHEN (OLD.status = 'Aktiv') IS NOT (NEW.status = 'Aktiv')
+    BEGIN
+        UPDATE employees
+        SET exit_date = CASE WHEN NEW.status = 'Aktiv' THEN NULL ELSE COALESCE(NEW.exit_date, date('now', 'localtime')) END
+        WHERE id = NEW.id;
+    END
+    ''')
+    # Direkt als nicht aktiv angelegte Mitarbeiter (z. B. Import) erhalten den Anlagetag als Austritt
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_employees_exit_date_insert
+    AFTER INSERT ON employees
+    WHEN NEW.status != 'Aktiv' AND NEW.exit_date IS NULL
+    BEGIN
+        UPDATE employees SET exit_date = date('now', 'localtime') WHERE id = NEW.id;
+    END
+    ''')
+    # Bereits vor Einführung des Austrittsdatums ausgeschiedene Mitarbeiter: letzte Änderung als Austritt
+    cursor.execute('''
+    UPDATE employees
+    SET exit_date = COALESCE(date(updated_at), date(created_at), date('now', 'localtime'))
+    WHERE status != 'Aktiv' AND exit_date IS NULL
+    ''')
+    create_report_facts(cursor)
+    create_sick_leave_summary(cursor)
+    create_vacation_balances(cursor)
+    create_ics_feeds(cursor)
+    create_reminders(cursor)
+    create_archives(cursor)
+    create_anonymization(cursor)
+    
+    # Kompatibilitätssicht für Berichte und Abfragen, die employees.department als Namen erwarten
+    cursor.execute('''
+    CREATE VIEW IF NOT EXISTS employees_with_department AS
+    SELECT e.*, d.name AS department
+    FROM employees e
+    LEFT JOIN departments d ON d.id = e.department_id
+    ''')
+    
+    # Änderungsprotokoll, über das offene Ansichten geänderte Zeilen nachladen
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        operation TEXT NOT NULL,
+        changed_at TEXT NOT NULL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log (table_name, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log (changed_at)")
+    
+    for table in CHANGE_TRACKED_TABLES:
+        for operation, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_change_{operation.lower()}
+            AFTER {operation} ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, operation, changed_at)
+                VALUES ('{table}', {row}.id, '{operation}', strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'));
+            END
+            ''')
+    
+    # Audit-Log: nur anhängen; IDs steigen mit der Zeit, daher liegt jeder Monat (partition_month)
+    # als zusammenhängender Bereich in der Tabelle und lässt sich als Ganzes entfernen
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        partition_month TEXT NOT NULL,
+        changed_at TEXT NOT NULL,
+        changed_by TEXT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        employee_id INTEGER,
+        operation TEXT NOT NULL,
+        changes TEXT
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_employee ON audit_log (employee_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_partition ON audit_log (partition_month)")
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_audit_log_append_only
+    BEFORE UPDATE ON audit_log
+    BEGIN
+        SELECT RAISE(ABORT, 'audit_log darf nicht verändert werden');
+    END
+    ''')
+    create_audit_triggers(cursor)
+    
+    # Alte Einträge des Änderungsprotokolls entfernen
+    cursor.execute(
+        "DELETE FROM change_log WHERE changed_at < strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime', ?)",
+        (f"-{CHANGE_LOG_RETENTION_DAYS} days",)
+    )
+    
+    # Standardabteilungen einfügen
+    departments = [
+        ('IT', 'Informationstechnologie', None),
+        ('HR', 'Personalabteilung', None),
+        ('Finanzen', 'Finanzabteilung', None),
+        ('Vertrieb', 'Vertriebsabteilung', None),
+        ('Marketing', 'Marketingabteilung', None)
+    ]
+    
+    for dept in departments:
+        try:
+            current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            cursor.execute('''
+            INSERT INTO departments (name, description, manager_id, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (dept[0], dept[1], dept[2], current_time, current_time))
+        except sqlite3.IntegrityError:
+            # Abteilung existiert bereits
+            pass
+    
+    # Closure-Tabellen neu aufbauen, falls Zeilen ohne Trigger eingefügt wurden
+    for table, (parent_column, closure_table) in HIERARCHIES.items():
+        cursor.execute(f"SELECT (SELECT COUNT(*) FROM {table}) != (SELECT COUNT(*) FROM {closure_table} WHERE depth = 0)")
+        if cursor.fetchone()[0]:
+            logger.info(f"Closure-Tabelle {closure_table} wird neu aufgebaut")
+            rebuild_closure(cursor, table, parent_column, closure_table)
+    
+    # Standardadministrator erstellen (Hash nur berechnen, wenn der Benutzer noch fehlt)
+    cursor.execute("SELECT 1 FROM users WHERE username = 'admin'")
+    if cursor.fetchone() is None:
+        admin_password = "admin123"
+        hashed_password = hash_password(admin_password)
+        current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        cursor.execute('''
+        INSERT INTO users (username, password_hash, full_name, role, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', ('admin', hashed_password, 'Administrator', 'admin', current_time, current_time))
+    
+    conn.commit()
+    conn.close()
+
+# Standardwerte der Konfiguration; fehlende Schlüssel (z. B. nach einem Update) werden beim Laden ergänzt
+DEFAULT_CONFIG = {
+    "company_name": "Ihr Unternehmen",
+    "company_address": "Musterstraße 1, 12345 Musterstadt",
+    "company_phone": "+49 123 456789",
+    "company_email": "info@ihrunternehmen.de",
+    "company_logo": "",
+    "vacation_days_default": 30,
+    "vacation_carryover_max_days": VACATION_CARRYOVER_MAX_DAYS,
+    "vacation_carryover_expiry": VACATION_CARRYOVER_EXPIRY,
+    "reminders_enabled": True,
+    "reminder_pending_days": REMINDER_PENDING_DAYS,
+    "reminder_event_days": REMINDER_EVENT_DAYS,
+    "reminder_outbox": "log",
+    "reminder_recipient": "",
+    "smtp_host": "localhost",
+    "smtp_port": 1025,
+    "retention_years_vacation": 3,
+    "retention_years_sick_leave": 3,
+    "retention_years_working_time": 2,
+    "anonymize_after_years": ANONYMIZE_AFTER_YEARS,
+    "encrypt_backups": False,
+    "encrypt_exports": False,
+    "working_hours_per_day": 8,
+    "theme": "light",
+    "language": "de",
+    "backup_frequency": "daily",
+    "api_enabled": False,
+    "api_host": "127.0.0.1",
+    "api_port": 8765,
+    "api_allow_writes": False,
+    "audit_retention_months": 24,
+    "slow_query_ms": SLOW_QUERY_MS,
+    "bcrypt_rounds": BCRYPT_ROUNDS,
+    "login_max_failures": LOGIN_MAX_FAILURES,
+    "login_lockout_minutes": LOGIN_LOCKOUT_MINUTES
+}
+
+# Konfiguration im Speicher: gelesen wird die Datei nur, wenn sie sich geändert hat (Änderungszeit und
+# Größe, z. B. durch einen anderen Prozess), geschrieben wird atomar unter einer Sperre, damit sich
+# gleichzeitige Änderungen aus Hintergrundthreads und Oberfläche nicht gegenseitig überschreiben.
+# Abonnenten erfahren nach dem Speichern, welche Werte sich geändert haben.
+class ConfigStore:
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = defaults
+        self.lock = threading.RLock()
+        self.values = None
+        self.signature = None
+        self.subscribers = []
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # Datei neu einlesen, falls nötig; eine beschädigte Datei wird protokolliert und nicht überschrieben,
+    # bis wieder gespeichert wird
+    def _refresh(self):
+        signature = self._signature()
+        if self.values is not None and signature == self.signature:
+            return
+        values = dict(self.defaults)
+        if signature is None:
+            write_json_atomic(self.path, values)
+            signature = self._signature()
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    values.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.error(f"Konfiguration {self.path} nicht lesbar, verwende Standardwerte: {e}")
+        self.values = values
+        self.signature = signature
+
+    # Kopie der aktuellen Werte (Änderungen daran wirken erst über update)
+    def snapshot(self):
+        with self.lock:
+            self._refresh()
+            return dict(self.values)
+
+    def get(self, key, default=None):
+        with self.lock:
+            self._refresh()
+            return self.values.get(key, default)
+
+    # Werte ändern und speichern; gibt die tatsächlich geänderten Schlüssel zurück
+    def update(self, changes):
+        with self.lock:
+            self._refresh()
+            changed = {key: value for key, value in changes.items() if self.values.get(key) != value}
+            if not changed:
+                return {}
+            values = dict(self.values, **changed)
+            write_json_atomic(self.path, values)
+            self.values = values
+            self.signature = self._signature()
+            snapshot = dict(values)
+            subscribers = list(self.subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(snapshot, changed)
+            except Exception as e:
+                logger.error(f"Fehler beim Anwenden geänderter Einstellungen: {e}")
+        return changed
+
+    def set(self, key, value):
+        return self.update({key: value})
+
+    # callback(config, changed) nach jeder Änderung (im Thread des Speichernden); Rückgabe: Abmeldung
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+config_store = ConfigStore(CONFIG_PATH, DEFAULT_CONFIG)
+
+# Konfiguration laden (Kopie aus dem Zwischenspeicher)
+def load_config():
+    return config_store.snapshot()
+
+# JSON-Datei atomar ersetzen: vollständig in eine temporäre Datei im selben Verzeichnis schreiben,
+# auf die Platte bringen und umbenennen, damit ein Absturz nie eine halb geschriebene Datei hinterlässt
+def write_json_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Konfiguration speichern (nur geänderte Werte; Abonnenten werden benachrichtigt)
+def save_config(config):
+    return config_store.update(config)
+
+# Datenbank in eine neue Backup-Datei sichern; gibt Pfad und Größe zurück, Fehler (auch "database is
+# locked") werden an den Aufrufer weitergegeben
+def backup_file_path():
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(BACKUP_PATH, f'employees_backup_{timestamp}.db')
+
+def backup_database(backup_file=None):
+    backup_file = backup_file or backup_file_path()
+    
+    # Backup-API statt Dateikopie, damit auch noch nicht übernommene WAL-Inhalte gesichert werden. Die
+    # Lesetransaktion vorab wartet höchstens busy_timeout auf eine Sperre (die Backup-API selbst wartet
+    # bei gesperrter Datenbank unbegrenzt) und hält den Stand für die Dauer der Sicherung fest.
+    source = get_connection()
+    source.execute("BEGIN")
+    try:
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        target = sqlite3.connect(backup_file)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    except Exception:
+        if os.path.exists(backup_file):
+            os.remove(backup_file)
+        raise
+    finally:
+        source.rollback()
+        source.close()
+    return backup_file, os.path.getsize(backup_file)
+
+# Backup der Datenbank erstellen (Zeitpunkt und Ergebnis führt backup.run_backup im Backup-Status)
+def create_backup():
+    if not os.path.exists(DATABASE_PATH):
+        return False
+    
+    try:
+        backup_database()
+        return True
+    except Exception as e:
+        logger.error(f"Backup fehlgeschlagen: {e}")
+        return False
+
+# Hilfsfunktion: Datum formatieren
+def format_date(date_str, format_from="%Y-%m-%d", format_to="%d.%m.%Y"):
+    if not date_str:
+        return ""
+    try:
+        date_obj = datetime.datetime.strptime(date_str, format_from)
+        return date_obj.strftime(format_to)
+    except:
+        return date_str
+
+# Hilfsfunktion: Tage zwischen zwei Daten berechnen
+def calculate_days(start_date, end_date, include_weekends=True):
+    try:
+        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        if include_weekends:
+            return (end - start).days + 1
+        else:
+            days = 0
+            current = start
+            while current <= end:
+                if current.weekday() < 5:  # 0-4 sind Montag bis Freitag
+                    days += 1
+                current += datetime.timedelta(days=1)
+            return days
+    except:
+        return 0
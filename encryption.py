@@ -0,0 +1,289 @@
+import base64
+import contextlib
+import datetime
+import io
+import json
+import os
+import struct
+import tempfile
+from core import APPDATA_DIR, write_json_atomic, logger
+
+# Optional: ohne das Paket "cryptography" bleiben Backups und Exporte unverschlüsselt
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+except ImportError:
+    AESGCM = None
+
+# Schlüsselpaar der Verschlüsselung: öffentlicher Schlüssel im Klartext (Backups im Hintergrund brauchen
+# kein Passwort), privater Schlüssel mit dem Administratorpasswort verschlüsselt (nur zum Entschlüsseln)
+KEYSTORE_PATH = os.path.join(APPDATA_DIR, 'encryption_key.json')
+
+# Endung verschlüsselter Dateien
+ENCRYPTED_SUFFIX = ".enc"
+
+# Klartext je Block; der Speicherbedarf bleibt unabhängig von der Dateigröße bei etwa zwei Blöcken
+ENCRYPTION_CHUNK_SIZE = 1024 * 1024
+ENCRYPTION_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Kostenparameter für scrypt (Schlüssel aus dem Passwort, etwa 32 MB Speicher)
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# Dateiformat: Kennung mit Version, kurzlebiger öffentlicher X25519-Schlüssel, Nonce-Präfix, Blockgröße;
+# danach AES-256-GCM-Blöcke, deren Nonce Blocknummer und Endmarkierung enthält (abgeschnittene,
+# vertauschte oder angehängte Blöcke fallen bei der Prüfung auf). Der Kopf ist als AAD mitgeschützt.
+MAGIC = b"MPENC\x01"
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+HEADER_SIZE = len(MAGIC) + 32 + NONCE_PREFIX_SIZE + 4
+
+# Entsperrter privater Schlüssel (nach Anmeldung eines Administrators)
+_private_key = None
+
+def available():
+    return AESGCM is not None
+
+def _require():
+    if not available():
+        raise RuntimeError("Für die Verschlüsselung wird das Paket 'cryptography' benötigt")
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+def _raw_public(key):
+    return key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+def _password_key(password, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    return Scrypt(salt=salt, length=32, n=n, r=r, p=p).derive(password.encode('utf-8'))
+
+def _file_key(shared_secret, header, recipient):
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=header + recipient).derive(shared_secret)
+
+def _nonce(prefix, counter, last):
+    return prefix + struct.pack(">I", counter) + (b"\x01" if last else b"\x00")
+
+def _load_keystore():
+    try:
+        with open(KEYSTORE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def has_key():
+    return os.path.exists(KEYSTORE_PATH)
+
+# Neues Schlüsselpaar anlegen; der private Schlüssel wird mit dem Passwort verschlüsselt gespeichert
+def create_key(password, username=None):
+    global _private_key
+    _require()
+    private_key = X25519PrivateKey.generate()
+    salt = os.urandom(16)
+    nonce = os.urandom(12)
+    raw_private = private_key.private_bytes(serialization.Encoding.Raw, serialization.PrivateFormat.Raw,
+                                            serialization.NoEncryption())
+    write_json_atomic(KEYSTORE_PATH, {
+        "version": 1,
+        "public_key": _b64(_raw_public(private_key.public_key())),
+        "private_key": _b64(AESGCM(_password_key(password, salt)).encrypt(nonce, raw_private, b"keystore")),
+        "nonce": _b64(nonce),
+        "salt": _b64(salt),
+        "scrypt": {"n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P},
+        "created_at": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "created_by": username
+    })
+    _private_key = private_key
+    logger.info(f"Schlüssel für verschlüsselte Backups und Exporte angelegt ({username or '-'})")
+
+# Privaten Schlüssel mit dem Passwort entsperren; False bei falschem Passwort
+def unlock(password):
+    global _private_key
+    _require()
+    keystore = _load_keystore()
+    if keystore is None:
+        raise RuntimeError("Es ist noch kein Schlüssel eingerichtet")
+    params = keystore.get("scrypt", {})
+    key = _password_key(password, base64.b64decode(keystore["salt"]),
+                        params.get("n", SCRYPT_N), params.get("r", SCRYPT_R), params.get("p", SCRYPT_P))
+    try:
+        raw_private = AESGCM(key).decrypt(base64.b64decode(keystore["nonce"]),
+                                          base64.b64decode(keystore["private_key"]), b"keystore")
+    except InvalidTag:
+        return False
+    _private_key = X25519PrivateKey.from_private_bytes(raw_private)
+    return True
+
+def lock():
+    global _private_key
+    _private_key = None
+
+# Bei der Anmeldung eines Administrators: Schlüssel entsperren bzw. beim ersten Mal anlegen
+def unlock_for_admin(username, password):
+    if not available():
+        return
+    try:
+        if not has_key():
+            create_key(password, username)
+        elif not unlock(password):
+            logger.warning(f"Schlüssel der Verschlüsselung passt nicht zum Passwort von {username}")
+    except Exception as e:
+        logger.error(f"Schlüssel der Verschlüsselung nicht entsperrt: {e}")
+
+def public_key():
+    _require()
+    keystore = _load_keystore()
+    if keystore is None:
+        raise RuntimeError("Es ist noch kein Schlüssel eingerichtet; ein Administrator muss sich einmal anmelden")
+    return X25519PublicKey.from_public_bytes(base64.b64decode(keystore["public_key"]))
+
+# Schreibt verschlüsselt in fileobj: je voller Block ein GCM-Block, close() schreibt den letzten Block.
+# Nutzbar als Binärdatei, z. B. io.TextIOWrapper(EncryptedWriter(...)) für CSV.
+class EncryptedWriter(io.RawIOBase):
+    def __init__(self, fileobj, recipient=None, chunk_size=ENCRYPTION_CHUNK_SIZE):
+        super().__init__()
+        recipient = recipient or public_key()
+        ephemeral = X25519PrivateKey.generate()
+        self.prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.header = MAGIC + _raw_public(ephemeral.public_key()) + self.prefix + struct.pack(">I", chunk_size)
+        self.aead = AESGCM(_file_key(ephemeral.exchange(recipient), self.header, _raw_public(recipient)))
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.counter = 0
+        fileobj.write(self.header)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        # Ein voller Block bleibt stehen, bis feststeht, ob er der letzte ist
+        while len(self.buffer) > self.chunk_size:
+            self._emit(bytes(self.buffer[:self.chunk_size]), False)
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def _emit(self, chunk, last):
+        self.fileobj.write(self.aead.encrypt(_nonce(self.prefix, self.counter, last), chunk, self.header))
+        self.counter += 1
+
+    def close(self):
+        if not self.closed:
+            self._emit(bytes(self.buffer), True)
+            self.buffer.clear()
+            self.fileobj.close()
+        super().close()
+
+    # Nach einem Fehler: Datei schließen, ohne den letzten Block zu schreiben
+    def abort(self):
+        if not self.closed:
+            self.fileobj.close()
+        super().close()
+
+# Datei blockweise verschlüsseln; das Ziel wird erst nach vollständigem Schreiben angelegt
+def encrypt_file(source, target, recipient=None, chunk_size=ENCRYPTION_CHUNK_SIZE):
+    _require()
+    recipient = recipient or public_key()
+    temp_file = f"{target}.tmp"
+    try:
+        with open(source, 'rb') as src:
+            writer = EncryptedWriter(open(temp_file, 'wb'), recipient, chunk_size)
+            # Ganze Blöcke direkt verschlüsseln (ohne Umweg über den Puffer), den letzten schreibt close()
+            try:
+                block = src.read(chunk_size)
+                while len(block) == chunk_size:
+                    following = src.read(chunk_size)
+                    if not following:
+                        break
+                    writer._emit(block, False)
+                    block = following
+                writer.buffer += block
+            except Exception:
+                writer.abort()
+                raise
+            writer.close()
+        os.replace(temp_file, target)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return target
+
+# Verschlüsselt nach target schreiben, ohne dass Klartext auf die Platte gelangt: liefert einen Binär-
+# bzw. Textstrom (text=True, z. B. für csv). Das Ziel entsteht erst nach fehlerfreiem Schreiben.
+@contextlib.contextmanager
+def open_encrypted(target, recipient=None, text=False):
+    _require()
+    recipient = recipient or public_key()
+    temp_file = f"{target}.tmp"
+    writer = EncryptedWriter(open(temp_file, 'wb'), recipient)
+    stream = io.TextIOWrapper(io.BufferedWriter(writer), encoding='utf-8', newline='') if text else writer
+    try:
+        yield stream
+        stream.close()
+    except BaseException:
+        writer.abort()
+        os.remove(temp_file)
+        raise
+    os.replace(temp_file, target)
+
+# Für Erzeuger, die nur in eine Datei schreiben können (SQLite-Backup, PDF): write(pfad) schreibt den
+# Klartext vorübergehend in eine nur für den Benutzer lesbare temporäre Datei, die direkt nach dem
+# Verschlüsseln nach target (oder nach einem Fehler) gelöscht wird
+def encrypt_generated(write, target, recipient=None):
+    _require()
+    recipient = recipient or public_key()
+    handle, temp_file = tempfile.mkstemp(suffix=os.path.splitext(target.removesuffix(ENCRYPTED_SUFFIX))[1])
+    os.close(handle)
+    try:
+        write(temp_file)
+        return encrypt_file(temp_file, target, recipient)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+# Datei entschlüsseln (entsperrter Schlüssel oder private_key); ValueError bei beschädigten,
+# unvollständigen oder mit einem anderen Schlüssel verschlüsselten Dateien
+def decrypt_file(source, target, private_key=None):
+    _require()
+    private_key = private_key or _private_key
+    if private_key is None:
+        raise RuntimeError("Schlüssel ist gesperrt; Anmeldung als Administrator erforderlich")
+
+    temp_file = f"{target}.tmp"
+    try:
+        with open(source, 'rb') as src, open(temp_file, 'wb') as dst:
+            header = src.read(HEADER_SIZE)
+            if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+                raise ValueError(f"{source} ist keine verschlüsselte {MAGIC[:5].decode()}-Datei")
+            ephemeral = X25519PublicKey.from_public_bytes(header[len(MAGIC):len(MAGIC) + 32])
+            prefix = header[len(MAGIC) + 32:len(MAGIC) + 32 + NONCE_PREFIX_SIZE]
+            chunk_size = struct.unpack(">I", header[-4:])[0]
+            if not 0 < chunk_size <= ENCRYPTION_MAX_CHUNK_SIZE:
+                raise ValueError(f"Ungültige Blockgröße in {source}")
+            aead = AESGCM(_file_key(private_key.exchange(ephemeral), header, _raw_public(private_key.public_key())))
+
+            counter = 0
+            current = src.read(chunk_size + TAG_SIZE)
+            while True:
+                following = src.read(chunk_size + TAG_SIZE)
+                last = not following
+                try:
+                    dst.write(aead.decrypt(_nonce(prefix, counter, last), current, header))
+                except InvalidTag:
+                    raise ValueError(f"{source} ist beschädigt, unvollständig oder mit einem anderen Schlüssel verschlüsselt")
+                if last:
+                    break
+                current = following
+                counter += 1
+        os.replace(temp_file, target)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return target
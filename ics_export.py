@@ -0,0 +1,358 @@
+import datetime
+import functools
+import os
+import sqlite3
+from core import APP_NAME, VERSION, EXPORT_PATH, get_connection, retry_on_busy, load_config, logger
+import encryption
+import rbac
+import services
+
+# Verzeichnis der geplanten Kalender-Feeds
+ICS_FEED_PATH = os.path.join(EXPORT_PATH, "ics")
+
+# Zeilen, die beim vollständigen Export je Block in die Feed-Registrierung geschrieben werden
+ICS_REGISTRY_BATCH_SIZE = 5000
+
+# Krankmeldungen erscheinen ohne Grund als Abwesenheit (Gesundheitsdaten gehören nicht in geteilte Kalender)
+EVENT_LABELS = {"vacation": ("Urlaub", "Urlaub"), "sick": ("Abwesend", "Abwesenheit")}
+
+_UID_DOMAIN = f"{APP_NAME.lower()}.local"
+
+# Text für iCalendar maskieren (RFC 5545, 3.3.11); Namen wiederholen sich je Mitarbeiter
+@functools.lru_cache(maxsize=65536)
+def _escape(text):
+    return (str(text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+# Inhaltszeile mit CRLF; lange Zeilen nach 75 Byte falten, ohne UTF-8-Zeichen zu trennen
+def _line(text):
+    if len(text) <= 75 and (len(text) <= 18 or text.isascii()):
+        return text + "\r\n"
+    data = text.encode("utf-8")
+    if len(data) <= 75:
+        return text + "\r\n"
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+def _calendar_header(name):
+    return "".join(_line(text) for text in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:-//{APP_NAME}//{VERSION}//DE",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}"
+    ))
+
+# Ganztägiger Termin; DTEND ist exklusiv (dtstart/dtend kommen als JJJJMMTT aus der Abfrage).
+# Abgesagte Termine (cancelled) entfernen ihn beim Empfänger
+def _event(row, sequence, stamp, cancelled=False):
+    summary, category = EVENT_LABELS[row['kind']]
+    event = (
+        f"BEGIN:VEVENT\r\n"
+        f"UID:{row['kind']}-{row['id']}@{_UID_DOMAIN}\r\n"
+        f"DTSTAMP:{stamp}\r\n"
+        f"DTSTART;VALUE=DATE:{row['dtstart']}\r\n"
+        f"DTEND;VALUE=DATE:{row['dtend']}\r\n"
+        f"SEQUENCE:{sequence}\r\n"
+    )
+    if cancelled:
+        return event + "STATUS:CANCELLED\r\nEND:VEVENT\r\n"
+
+    event += (
+        "STATUS:CONFIRMED\r\n"
+        + _line(f"SUMMARY:{summary}: {_escape(row['first_name'])} {_escape(row['last_name'])}")
+        + f"CATEGORIES:{category}\r\nTRANSP:OPAQUE\r\nX-MICROSOFT-CDO-BUSYSTATUS:OOF\r\n"
+    )
+    if row['department']:
+        event += _line(f"DESCRIPTION:{_escape(row['department'])}")
+    return event + "END:VEVENT\r\n"
+
+# Genehmigte Urlaube und Krankmeldungen als Cursor (nicht geladen), optional beschränkt auf eine Abteilung
+# mit Unterabteilungen, einen Mitarbeiter, die Rechte eines Benutzers oder die geänderten Zeilen eines
+# inkrementellen Exports. Mit feed wird der zuletzt exportierte Stand aus der Registrierung mitgelesen.
+def _query_events(cursor, department_id=None, employee_id=None, access=None, feed=None, candidates=False,
+                  include_sick=True):
+    scope, scope_params = rbac.department_scope(access)
+    conditions = scope
+    params = list(scope_params)
+    if department_id is not None:
+        conditions += " AND e.department_id IN (SELECT descendant_id FROM department_closure WHERE ancestor_id = ?)"
+        params.append(department_id)
+    if employee_id is not None:
+        conditions += " AND e.id = ?"
+        params.append(employee_id)
+
+    selects = []
+    all_params = []
+    for kind, table, base_sequence, condition in (
+        ("vacation", "vacation", "a.version - 1", " AND a.status = 'Genehmigt'"),
+        ("sick", "sick_leave", "0", "")
+    ):
+        if kind == "sick" and not include_sick:
+            continue
+        registry = ", NULL AS registered_sequence, NULL AS fingerprint"
+        join = ""
+        if feed is not None:
+            registry = ", r.sequence AS registered_sequence, r.fingerprint"
+            join = f"LEFT JOIN ics_feed_events r ON r.feed = ? AND r.kind = '{kind}' AND r.row_id = a.id"
+        restrict = f" AND a.id IN (SELECT row_id FROM temp.ics_candidates WHERE kind = '{kind}')" if candidates else ""
+        selects.append(f"""
+            SELECT '{kind}' AS kind, a.id, a.start_date, a.end_date, {base_sequence} AS base_sequence,
+                   strftime('%Y%m%d', a.start_date) AS dtstart, strftime('%Y%m%d', a.end_date, '+1 day') AS dtend,
+                   e.first_name, e.last_name, d.name AS department{registry}
+            FROM {table} a
+            JOIN employees e ON e.id = a.employee_id
+            LEFT JOIN departments d ON d.id = e.department_id
+            {join}
+            WHERE a.end_date >= a.start_date{condition}{restrict}{conditions}
+        """)
+        all_params += ([feed] if feed is not None else []) + params
+
+    return cursor.execute(" UNION ALL ".join(selects), all_params)
+
+def _fingerprint(row):
+    return f"{row['start_date']}|{row['end_date']}|{row['first_name']}|{row['last_name']}|{row['department'] or ''}"
+
+def _stamp():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def _write_chunks(f, chunks):
+    count = 0
+    for chunk in chunks:
+        f.write(chunk)
+        count += 1
+    return count
+
+# Über eine temporäre Datei schreiben; Ziele mit ENCRYPTED_SUFFIX (encrypt_exports) direkt verschlüsselt
+def _write_atomic(filepath, chunks):
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    if filepath.endswith(encryption.ENCRYPTED_SUFFIX):
+        with encryption.open_encrypted(filepath, text=True) as f:
+            return _write_chunks(f, chunks)
+    temp_path = f"{filepath}.tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as f:
+        count = _write_chunks(f, chunks)
+    os.replace(temp_path, filepath)
+    return count
+
+# Einmaliger, vollständiger Kalender (z. B. aus der Oberfläche); Termine werden beim Lesen geschrieben.
+# Mit encrypt_exports landet er verschlüsselt unter services.export_target(filepath).
+def write_calendar(filepath, name="Abwesenheiten", department_id=None, employee_id=None, access=None,
+                   include_sick=True):
+    if access is not None:
+        access.require("export")
+    filepath = services.export_target(filepath)
+    stamp = _stamp()
+    conn = get_connection(sqlite3.Row)
+
+    def chunks():
+        yield _calendar_header(name)
+        for row in _query_events(conn.cursor(), department_id, employee_id, access,
+                                 include_sick=include_sick):
+            yield _event(row, row['base_sequence'], stamp)
+        yield _line("END:VCALENDAR")
+
+    try:
+        events = _write_atomic(filepath, chunks()) - 2
+    finally:
+        conn.close()
+
+    logger.info(f"Kalender exportiert nach {filepath}: {events} Termine")
+    return events
+
+# Feed-Stand: letzte berücksichtigte change_log-ID; ob ab dort noch alle Änderungen vorliegen
+def _change_log_bounds(cursor):
+    cursor.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'change_log'), 0)")
+    high = cursor.fetchone()[0]
+    cursor.execute("SELECT MIN(id) FROM change_log")
+    low = cursor.fetchone()[0]
+    return high, (low - 1 if low is not None else high)
+
+# Geänderte Urlaube/Krankmeldungen seit dem letzten Export, einschließlich aller Einträge geänderter
+# Mitarbeiter (Name, Abteilung), in eine temporäre Tabelle übernehmen
+def _collect_candidates(cursor, since, until):
+    cursor.execute("DROP TABLE IF EXISTS temp.ics_candidates")
+    cursor.execute("CREATE TEMP TABLE ics_candidates (kind TEXT NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (kind, row_id))")
+    for kind, table in (("vacation", "vacation"), ("sick", "sick_leave")):
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO temp.ics_candidates (kind, row_id)
+            SELECT '{kind}', row_id FROM change_log WHERE table_name = '{table}' AND id > ? AND id <= ?
+        """, (since, until))
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO temp.ics_candidates (kind, row_id)
+            SELECT '{kind}', a.id FROM {table} a
+            WHERE a.employee_id IN (SELECT row_id FROM change_log WHERE table_name = 'employees' AND id > ? AND id <= ?)
+        """, (since, until))
+    cursor.execute("SELECT COUNT(*) FROM temp.ics_candidates")
+    return cursor.fetchone()[0]
+
+# Geplanten Feed exportieren. Der erste Lauf (oder full, geänderte Filter, gekürztes Änderungsprotokoll,
+# geänderte Abteilungsstruktur) schreibt den vollständigen Kalender <name>.ics; jeder weitere nur die
+# seit dem letzten Lauf geänderten Termine als <name>-<Nummer>.ics, Entfallene als abgesagt (CANCELLED).
+# Die Feed-Registrierung hält je Termin SEQUENCE und Stand, damit Empfänger Änderungen übernehmen.
+# Mit encrypt_exports werden alle Dateien des Feeds verschlüsselt geschrieben (services.export_target).
+@retry_on_busy
+def export_feed(name, department_id=None, employee_id=None, full=False, output_dir=ICS_FEED_PATH):
+    config = load_config()
+    stamp = _stamp()
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT * FROM ics_feeds WHERE name = ?", (name,))
+        feed = cursor.fetchone()
+        high, oldest_complete = _change_log_bounds(cursor)
+
+        if feed is not None and not full:
+            if (feed['department_id'], feed['employee_id']) != (department_id, employee_id):
+                full = True
+            elif feed['last_change_id'] < oldest_complete:
+                logger.info(f"Kalender-Feed {name}: Änderungsprotokoll bereits gekürzt, vollständiger Export")
+                full = True
+            else:
+                cursor.execute("SELECT 1 FROM change_log WHERE table_name = 'departments' AND id > ? AND id <= ? LIMIT 1",
+                               (feed['last_change_id'], high))
+                full = cursor.fetchone() is not None
+        full = full or feed is None
+
+        if not full and feed['last_change_id'] >= high:
+            conn.rollback()
+            return None
+
+        sequence = 1 if feed is None else feed['sequence'] + 1
+        if full:
+            filepath = services.export_target(os.path.join(output_dir, f"{name}.ics"), config)
+            events, cancelled = _export_full(conn, name, department_id, employee_id, filepath, stamp)
+        else:
+            filepath = services.export_target(os.path.join(output_dir, f"{name}-{sequence:05d}.ics"), config)
+            events, cancelled = _export_changes(conn, name, department_id, employee_id, filepath, stamp,
+                                                feed['last_change_id'], high)
+
+        cursor.execute("""
+            INSERT INTO ics_feeds (name, department_id, employee_id, sequence, last_change_id, last_export_at,
+                                   last_path, last_events, last_full)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                department_id = excluded.department_id, employee_id = excluded.employee_id,
+                sequence = excluded.sequence, last_change_id = excluded.last_change_id,
+                last_export_at = excluded.last_export_at, last_path = excluded.last_path,
+                last_events = excluded.last_events, last_full = excluded.last_full
+        """, (name, department_id, employee_id, sequence, high,
+              datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+              filepath if events or cancelled or full else None, events + cancelled, int(full)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Kalender-Feed {name} ({'vollständig' if full else 'Änderungen'}): "
+                f"{events} Termine, {cancelled} abgesagt")
+    return {"path": filepath if events or cancelled or full else None, "full": full,
+            "events": events, "cancelled": cancelled, "sequence": sequence}
+
+def _export_full(conn, name, department_id, employee_id, filepath, stamp):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.ics_registry")
+    cursor.execute("CREATE TEMP TABLE ics_registry (kind TEXT, row_id INTEGER, sequence INTEGER, fingerprint TEXT)")
+    batch = []
+
+    def flush():
+        cursor.executemany("INSERT INTO temp.ics_registry VALUES (?, ?, ?, ?)", batch)
+        batch.clear()
+
+    def chunks():
+        yield _calendar_header(name)
+        for row in _query_events(conn.cursor(), department_id, employee_id, feed=name):
+            fingerprint = _fingerprint(row)
+            sequence = _next_sequence(row, fingerprint)
+            batch.append((row['kind'], row['id'], sequence, fingerprint))
+            if len(batch) >= ICS_REGISTRY_BATCH_SIZE:
+                flush()
+            yield _event(row, sequence, stamp)
+        yield _line("END:VCALENDAR")
+
+    events = _write_atomic(filepath, chunks()) - 2
+    flush()
+    cursor.execute("DELETE FROM ics_feed_events WHERE feed = ?", (name,))
+    cursor.execute("""
+        INSERT INTO ics_feed_events (feed, kind, row_id, sequence, fingerprint)
+        SELECT ?, kind, row_id, sequence, fingerprint FROM temp.ics_registry
+    """, (name,))
+    cursor.execute("DROP TABLE temp.ics_registry")
+    return events, 0
+
+def _export_changes(conn, name, department_id, employee_id, filepath, stamp, since, until):
+    cursor = conn.cursor()
+    if not _collect_candidates(cursor, since, until):
+        return 0, 0
+
+    events = []
+    seen = set()
+    for row in _query_events(conn.cursor(), department_id, employee_id, feed=name, candidates=True):
+        seen.add((row['kind'], row['id']))
+        fingerprint = _fingerprint(row)
+        if fingerprint == row['fingerprint']:
+            continue
+        sequence = _next_sequence(row, fingerprint)
+        events.append((row, sequence, fingerprint))
+
+    # Registrierte Termine, die es nicht mehr gibt oder die nicht mehr zum Feed gehören
+    cursor.execute("""
+        SELECT r.kind, r.row_id AS id, r.sequence, r.fingerprint
+        FROM ics_feed_events r
+        JOIN temp.ics_candidates c ON c.kind = r.kind AND c.row_id = r.row_id
+        WHERE r.feed = ?
+    """, (name,))
+    cancelled = [row for row in cursor.fetchall() if (row['kind'], row['id']) not in seen]
+
+    if events or cancelled:
+        def chunks():
+            yield _calendar_header(name)
+            for row, sequence, fingerprint in events:
+                yield _event(row, sequence, stamp)
+            for row in cancelled:
+                start_date, end_date = row['fingerprint'].split("|")[:2]
+                dtend = datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)
+                yield _event({"kind": row['kind'], "id": row['id'], "dtstart": start_date.replace("-", ""),
+                              "dtend": dtend.strftime("%Y%m%d")}, row['sequence'] + 1, stamp, cancelled=True)
+            yield _line("END:VCALENDAR")
+        _write_atomic(filepath, chunks())
+
+    cursor.executemany("""
+        INSERT INTO ics_feed_events (feed, kind, row_id, sequence, fingerprint) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (feed, kind, row_id) DO UPDATE SET sequence = excluded.sequence, fingerprint = excluded.fingerprint
+    """, [(name, row['kind'], row['id'], sequence, fingerprint) for row, sequence, fingerprint in events])
+    cursor.executemany("DELETE FROM ics_feed_events WHERE feed = ? AND kind = ? AND row_id = ?",
+                       [(name, row['kind'], row['id']) for row in cancelled])
+    cursor.execute("DROP TABLE temp.ics_candidates")
+    return len(events), len(cancelled)
+
+# SEQUENCE steigt, sobald sich ein bereits exportierter Termin ändert, und liegt nie unter der Version
+def _next_sequence(row, fingerprint):
+    registered = row['registered_sequence']
+    if registered is None:
+        return row['base_sequence']
+    if fingerprint == row['fingerprint']:
+        return max(registered, row['base_sequence'])
+    return max(registered + 1, row['base_sequence'])
+
+# Eingerichtete Feeds mit ihrem letzten Lauf
+def list_feeds():
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM ics_feeds ORDER BY name")
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
@@ -0,0 +1,132 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageOps, ImageTk
+
+# Größen der vorberechneten Bildvarianten (Breite, Höhe)
+IMAGE_VARIANTS = {
+    "avatar": (24, 24),
+    "detail": (160, 160)
+}
+
+# Maximale Anzahl an PhotoImage-Objekten pro Variante im Speicher
+DEFAULT_CACHE_LIMITS = {
+    "avatar": 1024,
+    "detail": 32
+}
+
+# Zwischenspeicher für Profilbilder: verkleinerte Varianten auf der Festplatte,
+# PhotoImage-Objekte in einem begrenzten LRU-Cache im Speicher
+class ProfileImageCache:
+    def __init__(self, cache_dir, limits=None):
+        self.cache_dir = cache_dir
+        self.limits = dict(DEFAULT_CACHE_LIMITS)
+        if limits:
+            self.limits.update(limits)
+
+        self._photos = {variant: OrderedDict() for variant in IMAGE_VARIANTS}
+        self._lock = threading.Lock()
+
+    def _cache_key(self, source_path):
+        # Pfad, Änderungszeit und Größe identifizieren eine Bildversion eindeutig
+        stat = os.stat(source_path)
+        return f"{os.path.abspath(source_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def variant_path(self, source_path, variant):
+        digest = hashlib.sha1(self._cache_key(source_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, variant, f"{digest}.png")
+
+    def get_variant(self, source_path, variant):
+        # Verkleinerte Variante beim ersten Zugriff erzeugen und danach wiederverwenden
+        target = self.variant_path(source_path, variant)
+        if not os.path.exists(target):
+            self._render_variant(source_path, target, IMAGE_VARIANTS[variant])
+        return target
+
+    def _render_variant(self, source_path, target, size):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with Image.open(source_path) as img:
+            # JPEGs direkt in reduzierter Auflösung dekodieren statt das Original vollständig zu laden
+            img.draft("RGB", size)
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA")
+            img.thumbnail(size, Image.LANCZOS)
+
+            # Auf feste Größe bringen, damit alle Zeilen gleich ausgerichtet sind
+            canvas = Image.new("RGBA", size, (0, 0, 0, 0))
+            canvas.paste(img, ((size[0] - img.width) // 2, (size[1] - img.height) // 2))
+
+        # Atomar schreiben, damit parallele Zugriffe keine halben Dateien lesen
+        temp_file = f"{target}.{threading.get_ident()}.tmp"
+        canvas.save(temp_file, "PNG")
+        os.replace(temp_file, target)
+
+    # Muss die Variante noch aus dem Original erzeugt werden? (dann besser per prefetch im Hintergrund)
+    def needs_render(self, source_path, variant="avatar"):
+        if not source_path or not os.path.isfile(source_path):
+            return False
+        try:
+            return not os.path.exists(self.variant_path(source_path, variant))
+        except OSError:
+            return False
+
+    def get_photo(self, source_path, variant="avatar"):
+        if not source_path or not os.path.isfile(source_path):
+            return None
+
+        try:
+            key = self._cache_key(source_path)
+        except OSError:
+            return None
+
+        photos = self._photos[variant]
+        with self._lock:
+            photo = photos.get(key)
+            if photo is not None:
+                photos.move_to_end(key)
+                return photo
+
+        try:
+            with Image.open(self.get_variant(source_path, variant)) as img:
+                photo = ImageTk.PhotoImage(img)
+        except Exception:
+            return None
+
+        with self._lock:
+            photos[key] = photo
+            while len(photos) > self.limits[variant]:
+                photos.popitem(last=False)
+
+        return photo
+
+    def prefetch(self, source_paths, variant="avatar"):
+        # Varianten im Hintergrund vorberechnen (ohne Tk, daher threadsicher)
+        def worker():
+            for path in source_paths:
+                if path and os.path.isfile(path):
+                    try:
+                        self.get_variant(path, variant)
+                    except Exception:
+                        pass
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    def invalidate(self, source_path=None):
+        with self._lock:
+            if source_path is None:
+                for photos in self._photos.values():
+                    photos.clear()
+                return
+
+            prefix = f"{os.path.abspath(source_path)}|"
+            for photos in self._photos.values():
+                for key in [k for k in photos if k.startswith(prefix)]:
+                    del photos[key]
+
+    def stats(self):
+        with self._lock:
+            return {variant: len(photos) for variant, photos in self._photos.items()}
@@ -0,0 +1,306 @@
+import copy
+import datetime
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import time
+
+# Strukturierte Protokolle: je Zeile ein JSON-Objekt (Zeit, Stufe, Ereignis, Benutzer, betroffene
+# Datensätze, Meldung). Die laufende Datei wird nach Größe oder Tageswechsel in gzip-Blöcke komprimiert;
+# eine Indexdatei je Archiv fasst jeden Block zusammen, damit die Suche nur passende Blöcke entpackt.
+# Nur Standardbibliothek, damit core das Modul vor allem anderen laden kann.
+
+# Felder aus extra=..., die als betroffene Datensätze ins Protokoll übernommen werden
+ENTITY_FIELDS = ("employee_id", "vacation_id", "sick_leave_id", "department_id", "document_id", "year")
+
+# Zeilen je komprimiertem Block (Einheit, die die Suche entpackt)
+LOG_INDEX_BLOCK_LINES = 1000
+
+INDEX_SUFFIX = ".idx.json"
+
+# Namen der Protokolle (Oberfläche und Kommandozeile schreiben getrennte Dateien, damit sich zwei
+# Prozesse beim Rotieren nicht in die Quere kommen); andere .jsonl-Dateien wie die UI-Metriken zählen nicht
+LOG_NAMES = ("app", "cli")
+
+def _timestamp(created):
+    return datetime.datetime.fromtimestamp(created).isoformat(timespec="milliseconds")
+
+# JSON-Zeilen; ohne extra={"event": ...} ist das Ereignis Modul.Funktion des Aufrufers
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": _timestamp(record.created),
+            "level": record.levelname,
+            "event": getattr(record, "event", None) or f"{record.module}.{record.funcName}",
+            "user": getattr(record, "user", None),
+            "msg": record.getMessage()
+        }
+        for field in ENTITY_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+# Übergibt Einträge an die Warteschlange des Schreib-Threads. Meldung, Ausnahme und angemeldeter
+# Benutzer werden im aufrufenden Thread festgehalten, formatiert und geschrieben wird im Hintergrund.
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, queue, get_user):
+        super().__init__(queue)
+        self.get_user = get_user
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "user", None) is None:
+            record.user = self.get_user()
+        return record
+
+# Zusammenfassung einer Zeilenmenge für den Index
+def _summarize(entries):
+    return {
+        "first": entries[0].get("ts") if entries else None,
+        "last": entries[-1].get("ts") if entries else None,
+        "levels": sorted({entry.get("level") for entry in entries if entry.get("level")}),
+        "events": sorted({entry.get("event") for entry in entries if entry.get("event")}),
+        "users": sorted({entry.get("user") for entry in entries if entry.get("user")}),
+        "employees": sorted({entry["employee_id"] for entry in entries if isinstance(entry.get("employee_id"), int)})
+    }
+
+def _parse(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {"msg": line.rstrip("\n")}
+
+def _write_json_atomic(path, data):
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_file, path)
+
+# Laufende Datei als Folge von gzip-Blöcken schreiben (jeder für sich entpackbar) und den Index daneben legen
+def compress_with_index(source, target, block_lines=LOG_INDEX_BLOCK_LINES):
+    blocks = []
+    offset = 0
+    with open(source, 'r', encoding='utf-8', errors='replace') as src, open(f"{target}.tmp", 'wb') as dst:
+        lines = []
+        while True:
+            line = src.readline()
+            if line:
+                lines.append(line)
+            if lines and (len(lines) >= block_lines or not line):
+                data = gzip.compress("".join(lines).encode('utf-8'), mtime=0)
+                dst.write(data)
+                block = _summarize([_parse(item) for item in lines])
+                block.update({"offset": offset, "length": len(data), "lines": len(lines)})
+                blocks.append(block)
+                offset += len(data)
+                lines = []
+            if not line:
+                break
+    index = {
+        "version": 1,
+        "lines": sum(block["lines"] for block in blocks),
+        "first": blocks[0]["first"] if blocks else None,
+        "last": blocks[-1]["last"] if blocks else None
+    }
+    for key in ("levels", "events", "users", "employees"):
+        index[key] = sorted({value for block in blocks for value in block[key]})
+    index["blocks"] = blocks
+    _write_json_atomic(target + INDEX_SUFFIX, index)
+    os.replace(f"{target}.tmp", target)
+
+# Schreibt JSON-Zeilen in <name>.jsonl und rotiert nach Größe oder Tageswechsel in
+# <name>-JJJJMMTT-HHMMSS.jsonl.gz; Archive und alte Tagesdateien (*.log) werden nach
+# retention_days gelöscht. Läuft im Thread des QueueListener, blockiert also nie die Oberfläche.
+class RotatingJsonFileHandler(logging.Handler):
+    def __init__(self, directory, name, max_bytes, retention_days, block_lines=LOG_INDEX_BLOCK_LINES):
+        super().__init__()
+        self.directory = directory
+        self.name_prefix = name
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.block_lines = block_lines
+        self.stream = None
+        self.size = 0
+        self.day = None
+        self._open()
+        self.prune()
+
+    def _open(self):
+        self.stream = open(self.path, 'a', encoding='utf-8')
+        self.size = self.stream.tell()
+        self.day = None
+        if self.size:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                self.day = _parse(f.readline()).get("ts", "")[:10] or None
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + "\n"
+            day = _timestamp(record.created)[:10]
+            if self.size and (self.size + len(line) > self.max_bytes or (self.day and self.day != day)):
+                self.rollover()
+            self.stream.write(line)
+            self.stream.flush()
+            self.size += len(line.encode('utf-8'))
+            self.day = self.day or day
+        except Exception:
+            self.handleError(record)
+
+    def rollover(self):
+        self.stream.close()
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = os.path.join(self.directory, f"{self.name_prefix}-{stamp}.jsonl.gz")
+        suffix = 1
+        while os.path.exists(target):
+            target = os.path.join(self.directory, f"{self.name_prefix}-{stamp}-{suffix}.jsonl.gz")
+            suffix += 1
+        compress_with_index(self.path, target, self.block_lines)
+        os.remove(self.path)
+        self._open()
+        self.prune()
+
+    def prune(self):
+        cutoff = time.time() - self.retention_days * 86400
+        for path in (glob.glob(os.path.join(self.directory, f"{self.name_prefix}-*.jsonl.gz"))
+                     + glob.glob(os.path.join(self.directory, "????-??-??.log"))):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    if os.path.exists(path + INDEX_SUFFIX):
+                        os.remove(path + INDEX_SUFFIX)
+            except OSError:
+                pass
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+        super().close()
+
+# --- Suche ---
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+def _level_rank(level):
+    return LEVELS.index(level) if level in LEVELS else 0
+
+# Suchkriterien; leere Werte gelten als "alle". level ist die Mindeststufe, event ein Präfix
+class LogQuery:
+    def __init__(self, level=None, event=None, user=None, employee_id=None, text=None, since=None, until=None):
+        self.level = level
+        self.event = event
+        self.user = user
+        self.employee_id = employee_id
+        self.text = text.lower() if text else None
+        self.since = since
+        self.until = until
+
+    # Kann ein Block oder eine Datei mit dieser Zusammenfassung passende Einträge enthalten?
+    def may_match(self, summary):
+        if self.since and summary.get("last") and summary["last"] < self.since:
+            return False
+        if self.until and summary.get("first") and summary["first"] > self.until:
+            return False
+        if self.level and not any(_level_rank(level) >= _level_rank(self.level) for level in summary.get("levels", ())):
+            return False
+        if self.event and not any(event.startswith(self.event) for event in summary.get("events", ())):
+            return False
+        if self.user and self.user not in summary.get("users", ()):
+            return False
+        if self.employee_id is not None and self.employee_id not in summary.get("employees", ()):
+            return False
+        return True
+
+    def matches(self, entry):
+        ts = entry.get("ts", "")
+        if self.since and ts < self.since:
+            return False
+        if self.until and ts > self.until:
+            return False
+        if self.level and _level_rank(entry.get("level")) < _level_rank(self.level):
+            return False
+        if self.event and not (entry.get("event") or "").startswith(self.event):
+            return False
+        if self.user and entry.get("user") != self.user:
+            return False
+        if self.employee_id is not None and entry.get("employee_id") != self.employee_id:
+            return False
+        if self.text and self.text not in (entry.get("msg") or "").lower() and self.text not in (entry.get("exc") or "").lower():
+            return False
+        return True
+
+def _load_index(path):
+    try:
+        with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Einträge eines Archivs von hinten nach vorn; ohne Index (z. B. gelöscht) wird die Datei ganz gelesen
+def _archive_entries(path, query):
+    index = _load_index(path)
+    if index is None:
+        with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as f:
+            yield from reversed([_parse(line) for line in f if line.strip()])
+        return
+    if not query.may_match(index):
+        return
+    with open(path, 'rb') as f:
+        for block in reversed(index["blocks"]):
+            if not query.may_match(block):
+                continue
+            f.seek(block["offset"])
+            data = gzip.decompress(f.read(block["length"])).decode('utf-8', errors='replace')
+            yield from reversed([_parse(line) for line in data.splitlines() if line.strip()])
+
+def _active_entries(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return
+    yield from (_parse(line) for line in reversed(lines) if line.strip())
+
+# Neueste passende Einträge aller Protokolle (laufende Dateien und Archive), höchstens limit. Dateien werden
+# vom neuesten zum ältesten gelesen (Änderungszeit = spätester Eintrag); sobald eine Datei nur ältere Einträge
+# als die bisher gefundenen enthalten kann, endet die Suche.
+def search(directory, query, limit=500, names=LOG_NAMES):
+    sources = []
+    for name in names:
+        sources += [(os.path.getmtime(path), _active_entries(path))
+                    for path in glob.glob(os.path.join(directory, f"{name}.jsonl"))]
+        sources += [(os.path.getmtime(path), _archive_entries(path, query))
+                    for path in glob.glob(os.path.join(directory, f"{name}-*.jsonl.gz"))]
+
+    results = []
+    for mtime, entries in sorted(sources, key=lambda source: source[0], reverse=True):
+        if len(results) >= limit and _timestamp(mtime) < results[-1].get("ts", ""):
+            break
+        found = 0
+        for entry in entries:
+            if query.matches(entry):
+                results.append(entry)
+                found += 1
+                if found >= limit:
+                    break
+        results.sort(key=lambda entry: entry.get("ts", ""), reverse=True)
+        del results[limit:]
+    return results
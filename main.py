@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import sqlite3
 import os
 import datetime
 import calendar
@@ -9,17 +8,33 @@ import matplotlib.dates as mdates
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from tkcalendar import Calendar, DateEntry
 import locale
-import bcrypt
 from PIL import Image, ImageTk
-import csv
 import json
 import webbrowser
 import threading
 import uuid
-import logging
-import shutil
-from fpdf import FPDF
 import re
+import time
+from core import (
+    APP_NAME, VERSION, LOG_PATH, EXPORT_PATH, IMAGE_CACHE_PATH, SLOW_QUERY_MS, logger, query_stats,
+    setup_logging, setup_directories, setup_database, config_store, load_config, save_config, format_date
+)
+import services
+import rbac
+import org
+import reports
+import sick_analytics
+import year_close
+import ics_export
+import reminders
+import backup
+import encryption
+import logs
+import api
+import audit
+from image_cache import ProfileImageCache
+from absence_calendar import AbsenceCalendar, ABSENCE_COLORS
+from ui_metrics import UiMetrics, timed_view
 
 # Setze deutsche Sprache
 try:
@@ -31,14 +46,6 @@ except:
         pass
 
 # Konstanten
-APP_NAME = "MitarbeiterPro"
-VERSION = "1.0.0"
-APPDATA_DIR = os.path.join(os.getenv('APPDATA'), APP_NAME)
-DATABASE_PATH = os.path.join(APPDATA_DIR, 'employees.db')
-LOG_PATH = os.path.join(APPDATA_DIR, 'logs')
-EXPORT_PATH = os.path.join(APPDATA_DIR, 'exports')
-BACKUP_PATH = os.path.join(APPDATA_DIR, 'backups')
-CONFIG_PATH = os.path.join(APPDATA_DIR, 'config.json')
 THEME_COLOR = "#3498db"
 LIGHT_COLOR = "#ecf0f1"
 DARK_COLOR = "#2c3e50"
@@ -46,297 +53,121 @@ WARNING_COLOR = "#e74c3c"
 SUCCESS_COLOR = "#2ecc71"
 NEUTRAL_COLOR = "#f39c12"
 
-# Logger einrichten
-def setup_logging():
-    if not os.path.exists(LOG_PATH):
-        os.makedirs(LOG_PATH)
-    
-    log_file = os.path.join(LOG_PATH, f'{datetime.datetime.now().strftime("%Y-%m-%d")}.log')
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(APP_NAME)
+# Intervall, in dem das Ergebnis der Passwortprüfung abgefragt wird
+LOGIN_POLL_INTERVAL_MS = 50
 
-# Verzeichnisse erstellen
-def setup_directories():
-    for directory in [APPDATA_DIR, LOG_PATH, EXPORT_PATH, BACKUP_PATH]:
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+# Intervall, in dem die Oberfläche auf das Ende von Hintergrund-Threads (Profilbilder, Jahresabschluss, Protokollsuche) prüft
+WORKER_POLL_INTERVAL_MS = 50
 
-# Datenbank erstellen und initialisieren
-def setup_database():
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Mitarbeitertabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS employees (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id TEXT UNIQUE,
-        first_name TEXT NOT NULL,
-        last_name TEXT NOT NULL,
-        birth_date TEXT,
-        address TEXT,
-        phone TEXT,
-        email TEXT,
-        position TEXT,
-        department TEXT,
-        hire_date TEXT,
-        salary REAL,
-        status TEXT DEFAULT 'Aktiv',
-        vacation_days_per_year INTEGER DEFAULT 30,
-        sick_days_used INTEGER DEFAULT 0,
-        profile_image TEXT,
-        notes TEXT,
-        created_at TEXT,
-        updated_at TEXT
-    )
-    ''')
-    
-    # Urlaubstabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS vacation (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER,
-        start_date TEXT,
-        end_date TEXT,
-        days INTEGER,
-        status TEXT DEFAULT 'Beantragt',
-        approved_by TEXT,
-        approved_date TEXT,
-        notes TEXT,
-        created_at TEXT,
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    )
-    ''')
-    
-    # Krankschreibungstabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS sick_leave (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER,
-        start_date TEXT,
-        end_date TEXT,
-        days INTEGER,
-        medical_certificate BOOLEAN,
-        notes TEXT,
-        created_at TEXT,
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    )
-    ''')
-    
-    # Gehaltstabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS salary_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER,
-        amount REAL,
-        effective_date TEXT,
-        created_at TEXT,
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    )
-    ''')
-    
-    # Ausgabentabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS expenses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER,
-        amount REAL,
-        category TEXT,
-        date TEXT,
-        receipt_path TEXT,
-        status TEXT DEFAULT 'Eingereicht',
-        approved_by TEXT,
-        approved_date TEXT,
-        notes TEXT,
-        created_at TEXT,
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    )
-    ''')
-    
-    # Arbeitszeitentabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS working_time (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER,
-        date TEXT,
-        start_time TEXT,
-        end_time TEXT,
-        break_duration INTEGER,
-        total_hours REAL,
-        notes TEXT,
-        created_at TEXT,
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    )
-    ''')
-    
-    # Benutzertabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password_hash TEXT,
-        full_name TEXT,
-        role TEXT,
-        last_login TEXT,
-        created_at TEXT,
-        updated_at TEXT
-    )
-    ''')
+# Intervall, in dem Änderungen anderer Benutzer abgefragt werden
+CHANGE_POLL_INTERVAL_MS = 2000
 
-    # Abteilungstabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS departments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE,
-        description TEXT,
-        manager_id INTEGER,
-        created_at TEXT,
-        updated_at TEXT,
-        FOREIGN KEY (manager_id) REFERENCES employees (id)
-    )
-    ''')
+# Intervall, in dem Berichtsfakten und Krankheitsauswertung im Hintergrund fortgeschrieben werden
+BACKGROUND_JOB_INTERVAL_MS = 5 * 60 * 1000
 
-    # Dokumententabelle
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS documents (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER,
-        document_type TEXT,
-        file_path TEXT,
-        upload_date TEXT,
-        notes TEXT,
-        created_at TEXT,
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    )
-    ''')
-    
-    # Standardabteilungen einfügen
-    departments = [
-        ('IT', 'Informationstechnologie', None),
-        ('HR', 'Personalabteilung', None),
-        ('Finanzen', 'Finanzabteilung', None),
-        ('Vertrieb', 'Vertriebsabteilung', None),
-        ('Marketing', 'Marketingabteilung', None)
-    ]
-    
-    for dept in departments:
-        try:
-            current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute('''
-            INSERT INTO departments (name, description, manager_id, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (dept[0], dept[1], dept[2], current_time, current_time))
-        except sqlite3.IntegrityError:
-            # Abteilung existiert bereits
-            pass
-    
-    # Standardadministrator erstellen
-    try:
-        admin_password = "admin123"
-        hashed_password = bcrypt.hashpw(admin_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        cursor.execute('''
-        INSERT INTO users (username, password_hash, full_name, role, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', ('admin', hashed_password, 'Administrator', 'admin', current_time, current_time))
-    except sqlite3.IntegrityError:
-        # Admin existiert bereits
-        pass
-    
-    conn.commit()
-    conn.close()
+# Intervall, in dem die Einstellungen den Zustand eines laufenden Backups abfragen
+BACKUP_STATUS_POLL_MS = 1000
 
-# Konfiguration laden oder erstellen
-def load_config():
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    else:
-        default_config = {
-            "company_name": "Ihr Unternehmen",
-            "company_address": "Musterstraße 1, 12345 Musterstadt",
-            "company_phone": "+49 123 456789",
-            "company_email": "info@ihrunternehmen.de",
-            "company_logo": "",
-            "vacation_days_default": 30,
-            "working_hours_per_day": 8,
-            "theme": "light",
-            "language": "de",
-            "backup_frequency": "daily",
-            "last_backup": None
-        }
-        save_config(default_config)
-        return default_config
+# Protokollanzeige in den Einstellungen: Zeiträume und höchstens angezeigte Einträge
+LOG_VIEW_RANGES = {"24 Stunden": 1, "7 Tage": 7, "30 Tage": 30, "Alle": None}
+LOG_VIEW_LIMIT = 500
 
-# Konfiguration speichern
-def save_config(config):
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=4)
+# Berechtigung, die für einen Menüpunkt nötig ist (Dashboard ist immer sichtbar)
+MENU_PERMISSIONS = {
+    "Mitarbeiter": "employees.view",
+    "Organigramm": "employees.view",
+    "Urlaub": "vacation.view",
+    "Abwesenheiten": "vacation.view",
+    "Krankschreibungen": "sick_leave.view",
+    "Gehalt": "salary.view",
+    "Ausgaben": "expenses.view",
+    "Arbeitszeit": "working_time.view",
+    "Berichte": "reports.view",
+    "Einstellungen": "settings.manage"
+}
 
-# Backup der Datenbank erstellen
-def create_backup():
-    if not os.path.exists(DATABASE_PATH):
-        return False
-    
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(BACKUP_PATH, f'employees_backup_{timestamp}.db')
-    
-    try:
-        shutil.copy2(DATABASE_PATH, backup_file)
-        
-        # Aktualisiere letzte Backup-Zeit in Konfiguration
-        config = load_config()
-        config['last_backup'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        save_config(config)
-        
-        return True
-    except Exception as e:
-        logger.error(f"Backup fehlgeschlagen: {e}")
-        return False
+# Zwischengespeicherte Ansichten: Titel, Menüpunkt, Aufbau- und Ladefunktion, Tabellen, deren
+# Änderungen die Ansicht veralten lassen, und Funktionen zum zeilenweisen Nachladen
+CACHED_VIEWS = {
+    "dashboard": {
+        "title": "Dashboard", "button": "Dashboard", "build": "build_dashboard",
+        "tables": ("employees", "vacation", "sick_leave")
+    },
+    "employees": {
+        "title": "Mitarbeiterverwaltung", "button": "Mitarbeiter", "build": "build_employees",
+        "refresh": "load_employees", "tables": ("employees", "departments"),
+        "incremental": {"employees": "refresh_employee_rows"}, "live": True
+    },
+    "org_chart": {
+        "title": "Organigramm", "button": "Organigramm", "build": "build_org_chart",
+        "refresh": "load_org_chart", "tables": ("departments", "employees")
+    },
+    "vacation": {
+        "title": "Urlaubsverwaltung", "button": "Urlaub", "build": "build_vacation",
+        "refresh": "load_vacation_data", "tables": ("vacation", "employees"),
+        "incremental": {"vacation": "refresh_vacation_rows"}, "live": True
+    },
+    "absence_calendar": {
+        "title": "Abwesenheitskalender", "button": "Abwesenheiten", "build": "build_absence_calendar",
+        "refresh": "load_absence_calendar", "tables": ("vacation", "sick_leave", "employees", "departments"),
+        "live": True
+    },
+    "sick_leave": {
+        "title": "Krankschreibungen", "button": "Krankschreibungen", "build": "build_sick_leave",
+        "refresh": "refresh_sick_leave", "tables": ("sick_leave", "employees"), "live": True
+    },
+    "reports": {
+        "title": "Berichte", "button": "Berichte", "build": "build_reports", "refresh": "load_reports",
+        "tables": ("employees", "vacation", "sick_leave", "departments"), "live": True
+    },
+    "settings": {
+        "title": "Einstellungen", "button": "Einstellungen", "build": "build_settings", "tables": ()
+    }
+}
 
-# Hilfsfunktion: Datum formatieren
-def format_date(date_str, format_from="%Y-%m-%d", format_to="%d.%m.%Y"):
-    if not date_str:
-        return ""
-    try:
-        date_obj = datetime.datetime.strptime(date_str, format_from)
-        return date_obj.strftime(format_to)
-    except:
-        return date_str
+# Grenzen des Ansichtsspeichers: Anzahl Ansichten, Widgets plus Tabellenzeilen, Leerlaufzeit
+VIEW_CACHE_MAX_VIEWS = 4
+VIEW_CACHE_MAX_ELEMENTS = 100000
+VIEW_CACHE_IDLE_SECONDS = 15 * 60
 
-# Hilfsfunktion: Tage zwischen zwei Daten berechnen
-def calculate_days(start_date, end_date, include_weekends=True):
-    try:
-        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
-        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
-        
-        if include_weekends:
-            return (end - start).days + 1
-        else:
-            days = 0
-            current = start
-            while current <= end:
-                if current.weekday() < 5:  # 0-4 sind Montag bis Freitag
-                    days += 1
-                current += datetime.timedelta(days=1)
-            return days
-    except:
-        return 0
+# Ab so vielen geänderten Zeilen wird eine Ansicht komplett statt zeilenweise neu geladen
+VIEW_INCREMENTAL_LIMIT = 500
+
+# Felder der Einstellungsansicht: Schlüssel, Beschriftung, Typ, Auswahlwerte
+SETTINGS_FIELDS = [
+    ("company_name", "Firmenname", "str", None),
+    ("company_address", "Adresse", "str", None),
+    ("company_phone", "Telefon", "str", None),
+    ("company_email", "E-Mail", "str", None),
+    ("vacation_days_default", "Urlaubstage (Standard)", "int", None),
+    ("vacation_carryover_max_days", "Resturlaub-Übertrag höchstens (Tage)", "int", None),
+    ("vacation_carryover_expiry", "Verfall des Übertrags (MM-TT)", "str", None),
+    ("working_hours_per_day", "Arbeitsstunden pro Tag", "int", None),
+    ("backup_frequency", "Backup-Häufigkeit", "str", ["daily", "weekly", "monthly"]),
+    ("reminders_enabled", "Erinnerungen versenden", "bool", None),
+    ("reminder_pending_days", "Erinnerung an offene Anträge nach (Tagen)", "int", None),
+    ("reminder_event_days", "Geburtstage/Jubiläen vorab (Tage)", "int", None),
+    ("reminder_outbox", "Postausgang", "str", ["log", "file", "smtp"]),
+    ("reminder_recipient", "Empfänger der Erinnerungen", "str", None),
+    ("smtp_host", "SMTP-Server", "str", None),
+    ("smtp_port", "SMTP-Port", "int", None),
+    ("anonymize_after_years", "Ausgeschiedene anonymisieren nach (Jahren)", "int", None),
+    ("encrypt_backups", "Backups verschlüsseln", "bool", None),
+    ("encrypt_exports", "Exporte verschlüsseln", "bool", None),
+    ("api_enabled", "Lokale API aktivieren", "bool", None),
+    ("api_port", "API-Port", "int", None),
+    ("api_allow_writes", "Schreibzugriff über API", "bool", None),
+    ("bcrypt_rounds", "Passwort-Kostenfaktor (bcrypt)", "int", None),
+    ("slow_query_ms", "Langsame Abfragen ab (ms)", "int", None)
+]
 
 # Login-Fenster
 class LoginWindow:
     def __init__(self, root, on_successful_login):
         self.root = root
         self.on_successful_login = on_successful_login
+        self.login_thread = None
+        self.login_result = None
         self.root.title(f"{APP_NAME} - Login")
         self.root.geometry("400x500")
         self.root.resizable(False, False)
@@ -375,7 +206,7 @@ class LoginWindow:
         self.password_entry.pack(fill=tk.X, pady=(0, 15))
         
         # Login Button
-        login_button = tk.Button(
+        self.login_button = tk.Button(
             form_frame, 
             text="Anmelden", 
             font=("Arial", 12, "bold"), 
@@ -386,7 +217,11 @@ class LoginWindow:
             pady=10,
             command=self.login
         )
-        login_button.pack(fill=tk.X, pady=(20, 0))
+        self.login_button.pack(fill=tk.X, pady=(20, 0))
+        self.password_entry.bind("<Return>", lambda event: self.login())
+        
+        # Fortschrittsanzeige während der Passwortprüfung
+        self.progress = ttk.Progressbar(form_frame, mode="indeterminate")
         
         # Status Label
         self.status_label = tk.Label(form_frame, text="", font=("Arial", 10), fg=WARNING_COLOR, bg=LIGHT_COLOR)
@@ -406,6 +241,9 @@ class LoginWindow:
         copyright_label.pack()
         
     def login(self):
+        if self.login_thread is not None:
+            return
+        
         username = self.username_entry.get().strip()
         password = self.password_entry.get()
         
@@ -413,31 +251,51 @@ class LoginWindow:
             self.status_label.config(text="Bitte Benutzername und Passwort eingeben")
             return
         
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        # Passwortprüfung (bcrypt) im Hintergrund, damit das Fenster bedienbar bleibt
+        self.login_result = None
+        self.login_thread = threading.Thread(target=self.verify_login, args=(username, password), daemon=True)
+        self.login_thread.start()
         
-        cursor.execute("SELECT id, password_hash, role FROM users WHERE username = ?", (username,))
-        user = cursor.fetchone()
+        self.login_button.config(state=tk.DISABLED)
+        self.status_label.config(text="")
+        self.progress.pack(fill=tk.X, pady=(10, 0), before=self.status_label)
+        self.progress.start(15)
+        self.root.after(LOGIN_POLL_INTERVAL_MS, self.check_login)
+    
+    def verify_login(self, username, password):
+        try:
+            self.login_result = ("ok", services.authenticate(username, password))
+        except services.LoginLockedError as e:
+            self.login_result = ("locked", e.seconds)
+        except Exception as e:
+            logger.error(f"Fehler bei der Anmeldung: {e}")
+            self.login_result = ("error", str(e))
+    
+    # Ergebnis des Hintergrund-Threads im Tk-Thread abholen
+    def check_login(self):
+        if self.login_thread.is_alive():
+            self.root.after(LOGIN_POLL_INTERVAL_MS, self.check_login)
+            return
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user[1].encode('utf-8')):
-            # Update last login
-            current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute("UPDATE users SET last_login = ?, updated_at = ? WHERE id = ?", 
-                           (current_time, current_time, user[0]))
-            conn.commit()
-            
-            # Log successful login
-            logger.info(f"Benutzer {username} hat sich erfolgreich angemeldet.")
-            
+        self.login_thread = None
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.login_button.config(state=tk.NORMAL)
+        
+        status, value = self.login_result
+        if status == "ok" and value:
             # Call success callback with user info
-            self.on_successful_login({"id": user[0], "username": username, "role": user[2]})
+            self.on_successful_login(value)
             
             self.root.destroy()
+        elif status == "locked":
+            minutes = (value + 59) // 60
+            self.status_label.config(text=f"Zu viele Fehlversuche. Bitte in {minutes} Minute(n) erneut versuchen")
+        elif status == "error":
+            self.status_label.config(text="Anmeldung derzeit nicht möglich")
         else:
+            self.password_entry.delete(0, tk.END)
             self.status_label.config(text="Ungültiger Benutzername oder Passwort")
-            logger.warning(f"Fehlgeschlagener Anmeldeversuch für Benutzer {username}")
-        
-        conn.close()
 
 # Hauptanwendung
 class EmployeeManagementSystem:
@@ -445,29 +303,93 @@ class EmployeeManagementSystem:
         self.root = root
         self.user = user
         self.active_frame = None
+        
+        # Bei der Anmeldung berechnete Berechtigungen
+        self.access = user.get("access") or rbac.load_access(user["id"], user["role"])
+        
+        # Zwischengespeicherte Ansichten und Änderungszähler je Tabelle
+        self.views = {}
+        self.current_view = None
+        self.change_counters = {}
         self.config = load_config()
+        query_stats.slow_query_ms = self.config.get("slow_query_ms", SLOW_QUERY_MS)
+        self.image_cache = ProfileImageCache(IMAGE_CACHE_PATH)
+        self.employee_avatars = {}
+        self.employee_rows = {}
+        self.pending_avatars = {}
+        
+        # Zeilenversionen der angezeigten Datensätze für optimistisches Sperren
+        self.employee_versions = {}
+        self.vacation_versions = {}
+        self.change_watcher = services.ChangeWatcher()
         
         self.setup_ui()
+        
+        # Dauer von Ansichtswechseln und Blockaden der Hauptschleife messen
+        self.ui_metrics = UiMetrics(self.root, on_view_timed=self.show_view_timing)
+        self.ui_metrics.start_watchdog()
+        
         self.show_dashboard()
         
-        # Überprüfe, ob ein Backup erstellt werden sollte
-        self.check_backup_needs()
+        # Optionale lokale HTTP-API für andere interne Werkzeuge
+        self.api_server = None
+        if self.config.get('api_enabled'):
+            self.api_server, _ = api.start_in_thread(self.config)
         
-    def check_backup_needs(self):
-        if not self.config.get('last_backup'):
-            # Erstes Backup erstellen
-            threading.Thread(target=create_backup).start()
-            return
-            
-        last_backup = datetime.datetime.strptime(self.config['last_backup'], "%Y-%m-%d %H:%M:%S")
-        now = datetime.datetime.now()
+        # Backups regelmäßig im Hintergrund, solange das Programm läuft
+        self.backup_scheduler = backup.BackupScheduler(self.config.get("backup_frequency", "daily"))
+        self.backup_scheduler.start()
+        
+        # Änderungen anderer Benutzer regelmäßig abfragen
+        self.root.after(CHANGE_POLL_INTERVAL_MS, self.poll_changes)
+        
+        # Berichtsfakten und Krankheitsauswertung kurz nach dem Start und dann regelmäßig fortschreiben
+        self.background_thread = None
+        if self.access.can("reports.view") or self.access.can("sick_leave.view"):
+            self.root.after(CHANGE_POLL_INTERVAL_MS, self.schedule_background_jobs)
+        
+        # Erinnerungen an offene Urlaubsanträge sowie Geburtstage und Jubiläen (Planer auf root.after)
+        self.reminder_scheduler = None
+        self.start_reminders()
+        
+        # Geänderte Einstellungen sofort übernehmen (gespeichert wird im Tk-Thread)
+        self.unsubscribe_config = config_store.subscribe(self.apply_config)
         
-        if self.config['backup_frequency'] == 'daily' and (now - last_backup).days >= 1:
-            threading.Thread(target=create_backup).start()
-        elif self.config['backup_frequency'] == 'weekly' and (now - last_backup).days >= 7:
-            threading.Thread(target=create_backup).start()
-        elif self.config['backup_frequency'] == 'monthly' and (now - last_backup).days >= 30:
-            threading.Thread(target=create_backup).start()
+    def start_reminders(self):
+        if self.reminder_scheduler is not None:
+            self.reminder_scheduler.stop()
+            self.reminder_scheduler = None
+        if self.access.can("vacation.approve") and self.config.get("reminders_enabled", True):
+            try:
+                self.reminder_scheduler = reminders.build_scheduler(self.root, config=self.config)
+            except ValueError as e:
+                logger.error(f"Erinnerungen nicht gestartet: {e}")
+    
+    def apply_config(self, config, changed):
+        self.config = config
+        query_stats.slow_query_ms = config.get("slow_query_ms", SLOW_QUERY_MS)
+        if "backup_frequency" in changed:
+            self.backup_scheduler.set_frequency(config.get("backup_frequency", "daily"))
+        if any(key.startswith(("reminder", "smtp_")) for key in changed) or "company_email" in changed:
+            self.start_reminders()
+        if any(key.startswith("api_") for key in changed):
+            self.update_status("Änderungen an der API werden beim nächsten Start übernommen")
+    
+    def schedule_background_jobs(self):
+        if self.background_thread is None or not self.background_thread.is_alive():
+            self.background_thread = threading.Thread(target=self.run_background_jobs, daemon=True)
+            self.background_thread.start()
+        self.root.after(BACKGROUND_JOB_INTERVAL_MS, self.schedule_background_jobs)
+    
+    def run_background_jobs(self):
+        try:
+            reports.refresh_facts()
+        except Exception as e:
+            logger.error(f"Fehler beim Aktualisieren der Berichtsfakten: {e}")
+        try:
+            sick_analytics.run_analysis()
+        except Exception as e:
+            logger.error(f"Fehler bei der Auswertung der Krankmeldungen: {e}")
     
     def setup_ui(self):
         # Fenster konfigurieren
@@ -509,7 +431,9 @@ class EmployeeManagementSystem:
         menu_items = [
             ("Dashboard", self.show_dashboard, "🏠"),
             ("Mitarbeiter", self.show_employees, "👥"),
+            ("Organigramm", self.show_org_chart, "🏢"),
             ("Urlaub", self.show_vacation, "🏖️"),
+            ("Abwesenheiten", self.show_absence_calendar, "📅"),
             ("Krankschreibungen", self.show_sick_leave, "🏥"),
             ("Gehalt", self.show_salary, "💰"),
             ("Ausgaben", self.show_expenses, "💸"),
@@ -521,6 +445,9 @@ class EmployeeManagementSystem:
         self.menu_buttons = {}
         
         for text, command, icon in menu_items:
+            if text in MENU_PERMISSIONS and not self.access.can(MENU_PERMISSIONS[text]):
+                continue
+            
             btn = tk.Button(
                 self.sidebar,
                 text=f"{icon} {text}",
@@ -628,6 +555,16 @@ class EmployeeManagementSystem:
         )
         version_label.pack(side=tk.RIGHT, padx=10)
         
+        # Dauer des letzten Ansichtswechsels
+        self.view_time_label = tk.Label(
+            self.status_bar, 
+            text="", 
+            font=("Arial", 8), 
+            fg="white", 
+            bg=DARK_COLOR
+        )
+        self.view_time_label.pack(side=tk.RIGHT, padx=10)
+        
         # Status
         self.status_label = tk.Label(
             self.status_bar, 
@@ -646,15 +583,175 @@ class EmployeeManagementSystem:
     def update_status(self, message):
         self.status_label.config(text=message)
     
+    def show_view_timing(self, timing):
+        self.view_time_label.config(
+            text=f"Ansicht: {timing['total_ms']:.0f} ms (Daten {timing['fetch_ms']:.0f} ms, Aufbau {timing['build_ms']:.0f} ms)"
+        )
+    
     def clear_content(self):
-        # Bisherigen Inhalt entfernen
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        # Aktuelle Ansicht ausblenden; sie bleibt für den nächsten Aufruf im Zwischenspeicher
+        view = self.views.get(self.current_view)
+        if view is not None:
+            view["frame"].pack_forget()
         
         # Aktiven Button zurücksetzen
         for button in self.menu_buttons.values():
             button.config(bg=DARK_COLOR)
     
+    def widget_alive(self, name):
+        widget = getattr(self, name, None)
+        return widget is not None and bool(widget.winfo_exists())
+    
+    def show_view(self, name):
+        spec = CACHED_VIEWS[name]
+        self.clear_content()
+        self.header_title.config(text=spec["title"])
+        self.highlight_menu_button(spec["button"])
+        
+        # Eigene, noch nicht abgefragte Änderungen berücksichtigen
+        self.collect_changes()
+        
+        view = self.views.get(name)
+        if view is None:
+            view = self.build_view(name)
+            self.ui_metrics.annotate("cache", "build")
+        elif self.view_is_stale(view):
+            self.refresh_view(view)
+            self.ui_metrics.annotate("cache", "refresh")
+        else:
+            self.ui_metrics.annotate("cache", "hit")
+            self.update_status(f"{spec['title']} (zwischengespeichert)")
+        
+        view["frame"].pack(fill=tk.BOTH, expand=True)
+        view["uses"] += 1
+        view["last_used"] = time.monotonic()
+        view["footprint"] = self.view_footprint(view)
+        self.current_view = name
+        
+        self.evict_views()
+    
+    def build_view(self, name):
+        frame = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        getattr(self, CACHED_VIEWS[name]["build"])(frame)
+        
+        view = self.views.get(name) or {"name": name, "uses": 0, "last_used": time.monotonic()}
+        view.update(frame=frame, pending={}, counters=self.view_counters(name))
+        self.views[name] = view
+        return view
+    
+    def view_counters(self, name):
+        return {table: self.change_counters.get(table, 0) for table in CACHED_VIEWS[name]["tables"]}
+    
+    def view_is_stale(self, view):
+        return view["counters"] != self.view_counters(view["name"])
+    
+    def refresh_view(self, view):
+        spec = CACHED_VIEWS[view["name"]]
+        incremental = spec.get("incremental", {})
+        pending = view["pending"]
+        
+        if pending and all(table in incremental and rows is not None for table, rows in pending.items()):
+            # Nur die geänderten Zeilen nachladen
+            for table, rows in pending.items():
+                getattr(self, incremental[table])(rows)
+        elif "refresh" in spec:
+            getattr(self, spec["refresh"])()
+        else:
+            # Ansicht ohne eigene Ladefunktion (z. B. Diagramme) neu aufbauen
+            view["frame"].destroy()
+            self.build_view(view["name"])
+            return
+        
+        view["pending"] = {}
+        view["counters"] = self.view_counters(view["name"])
+    
+    def collect_changes(self):
+        try:
+            changes = self.change_watcher.poll()
+        except Exception as e:
+            logger.error(f"Fehler beim Abfragen von Änderungen: {e}")
+            changes = {}
+        
+        for table, rows in changes.items():
+            self.change_counters[table] = self.change_counters.get(table, 0) + len(rows)
+            
+            # Geänderte Zeilen je Ansicht sammeln; bei zu vielen wird die Ansicht komplett neu geladen
+            for view in self.views.values():
+                if table not in CACHED_VIEWS[view["name"]]["tables"]:
+                    continue
+                pending = view["pending"]
+                if table in pending and pending[table] is None:
+                    continue
+                merged = pending.setdefault(table, {})
+                merged.update(rows)
+                if len(merged) > VIEW_INCREMENTAL_LIMIT:
+                    pending[table] = None
+        return changes
+    
+    def poll_changes(self):
+        self.collect_changes()
+        
+        # Offene Tabellenansicht sofort nachziehen, ausgeblendete erst beim nächsten Anzeigen
+        view = self.views.get(self.current_view)
+        if view is not None and CACHED_VIEWS[view["name"]].get("live") and self.view_is_stale(view):
+            self.refresh_view(view)
+        
+        self.root.after(CHANGE_POLL_INTERVAL_MS, self.poll_changes)
+    
+    # Geschätzter Speicherbedarf einer Ansicht: Anzahl Widgets plus Tabellenzeilen
+    def view_footprint(self, view):
+        widgets = 0
+        rows = 0
+        stack = [view["frame"]]
+        while stack:
+            widget = stack.pop()
+            widgets += 1
+            if isinstance(widget, ttk.Treeview):
+                rows += len(widget.get_children())
+            stack.extend(widget.winfo_children())
+        return widgets, rows
+    
+    def view_cache_report(self):
+        report = []
+        for view in self.views.values():
+            widgets, rows = self.view_footprint(view)
+            report.append({
+                "view": view["name"],
+                "widgets": widgets,
+                "rows": rows,
+                "uses": view["uses"],
+                "idle_s": round(time.monotonic() - view["last_used"]),
+                "stale": self.view_is_stale(view)
+            })
+        return report
+    
+    # Selten genutzte Ansichten freigeben, wenn zu viele oder zu große im Speicher liegen
+    def evict_views(self):
+        now = time.monotonic()
+        while True:
+            candidates = [view for view in self.views.values() if view["name"] != self.current_view]
+            if not candidates:
+                return
+            
+            # Größe wurde beim letzten Anzeigen der jeweiligen Ansicht ermittelt
+            total = sum(sum(view["footprint"]) for view in self.views.values())
+            idle = [view for view in candidates if now - view["last_used"] > VIEW_CACHE_IDLE_SECONDS]
+            
+            if idle:
+                victim = min(idle, key=lambda view: view["last_used"])
+            elif len(self.views) > VIEW_CACHE_MAX_VIEWS or total > VIEW_CACHE_MAX_ELEMENTS:
+                victim = min(candidates, key=lambda view: (view["uses"], view["last_used"]))
+            else:
+                return
+            
+            widgets, rows = victim["footprint"]
+            logger.info(
+                f"Ansicht {victim['name']} aus dem Zwischenspeicher entfernt "
+                f"({widgets} Widgets, {rows} Zeilen, {victim['uses']} Aufrufe)"
+            )
+            victim["frame"].destroy()
+            del self.views[victim["name"]]
+    
     def highlight_menu_button(self, button_name):
         if button_name in self.menu_buttons:
             self.menu_buttons[button_name].config(bg=THEME_COLOR)
@@ -662,6 +759,11 @@ class EmployeeManagementSystem:
     def logout(self):
         if messagebox.askyesno("Abmelden", "Möchten Sie sich wirklich abmelden?"):
             logger.info(f"Benutzer {self.user['username']} hat sich abgemeldet.")
+            self.unsubscribe_config()
+            self.backup_scheduler.stop()
+            encryption.lock()
+            if self.reminder_scheduler is not None:
+                self.reminder_scheduler.stop()
             self.root.destroy()
             
             # Neue Anwendung starten
@@ -676,23 +778,25 @@ class EmployeeManagementSystem:
     
     # --- Hauptfunktionen für die verschiedenen Bereiche ---
     
+    @timed_view("dashboard")
     def show_dashboard(self):
-        self.clear_content()
-        self.header_title.config(text="Dashboard")
-        self.highlight_menu_button("Dashboard")
-        
+        self.show_view("dashboard")
+    
+    def build_dashboard(self, parent):
         # Container für Statistiken
-        stats_frame = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        stats_frame = tk.Frame(parent, bg=LIGHT_COLOR)
         stats_frame.pack(fill=tk.X, pady=(0, 20))
         
-        # Karten für verschiedene Statistiken
-        self.create_stat_card(stats_frame, "Mitarbeiter", self.get_employee_count(), "👥", "#3498db")
-        self.create_stat_card(stats_frame, "Aktuell im Urlaub", self.get_current_vacation_count(), "🏖️", "#2ecc71")
-        self.create_stat_card(stats_frame, "Krank gemeldet", self.get_current_sick_count(), "🏥", "#e74c3c")
-        self.create_stat_card(stats_frame, "Geburtstage diesen Monat", self.get_birthdays_this_month(), "🎂", "#f39c12")
+        # Karten für verschiedene Statistiken (nur die Abteilungen des Benutzers, Krankmeldungen nur mit Berechtigung)
+        show_sick = self.access.can("sick_leave.view")
+        self.create_stat_card(stats_frame, "Mitarbeiter", services.get_employee_count(self.access), "👥", "#3498db")
+        self.create_stat_card(stats_frame, "Aktuell im Urlaub", services.get_current_vacation_count(self.access), "🏖️", "#2ecc71")
+        if show_sick:
+            self.create_stat_card(stats_frame, "Krank gemeldet", services.get_current_sick_count(self.access), "🏥", "#e74c3c")
+        self.create_stat_card(stats_frame, "Geburtstage diesen Monat", services.get_birthdays_this_month(self.access), "🎂", "#f39c12")
         
         # Container für Diagramme
-        charts_frame = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        charts_frame = tk.Frame(parent, bg=LIGHT_COLOR)
         charts_frame.pack(fill=tk.BOTH, expand=True)
         
         # Linkes Diagramm (Mitarbeiter nach Abteilung)
@@ -705,7 +809,7 @@ class EmployeeManagementSystem:
         # Diagramm erstellen
         figure1 = plt.Figure(figsize=(5, 4), dpi=100)
         ax1 = figure1.add_subplot(111)
-        departments, counts = self.get_employees_by_department()
+        departments, counts = services.get_employees_by_department(self.access)
         ax1.bar(departments, counts, color=THEME_COLOR)
         ax1.set_ylabel('Anzahl')
         ax1.set_title('')
@@ -720,18 +824,20 @@ class EmployeeManagementSystem:
         right_chart_frame = tk.Frame(charts_frame, bg="white", bd=1, relief=tk.SOLID)
         right_chart_frame.grid(row=0, column=1, padx=(10, 0), pady=10, sticky="nsew")
         
-        chart_title = tk.Label(right_chart_frame, text="Urlaub & Krankheitstage", font=("Arial", 12, "bold"), bg="white")
+        chart_title = tk.Label(right_chart_frame, text="Urlaub & Krankheitstage" if show_sick else "Urlaubstage",
+                               font=("Arial", 12, "bold"), bg="white")
         chart_title.pack(pady=(10, 0))
         
         # Diagramm erstellen
         figure2 = plt.Figure(figsize=(5, 4), dpi=100)
         ax2 = figure2.add_subplot(111)
         months = [calendar.month_name[i] for i in range(1, 13)]
-        vacation_data = self.get_vacation_by_month()
-        sick_data = self.get_sick_leave_by_month()
+        vacation_data = services.get_vacation_by_month(access=self.access)
         
         ax2.plot(months, vacation_data, label='Urlaub', marker='o', color='#3498db')
-        ax2.plot(months, sick_data, label='Krankheit', marker='s', color='#e74c3c')
+        if show_sick:
+            sick_data = services.get_sick_leave_by_month(access=self.access)
+            ax2.plot(months, sick_data, label='Krankheit', marker='s', color='#e74c3c')
         ax2.set_ylabel('Tage')
         ax2.set_title('')
         ax2.legend()
@@ -745,7 +851,7 @@ class EmployeeManagementSystem:
         charts_frame.grid_rowconfigure(0, weight=1)
         
         # Aktuelle Ereignisse (Geburtstage, Jubiläen, etc.)
-        events_frame = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        events_frame = tk.Frame(parent, bg=LIGHT_COLOR)
         events_frame.pack(fill=tk.X, pady=(20, 0))
         
         events_title = tk.Label(events_frame, text="Anstehende Ereignisse", font=("Arial", 14, "bold"), fg=DARK_COLOR, bg=LIGHT_COLOR)
@@ -755,7 +861,7 @@ class EmployeeManagementSystem:
         events_container.pack(fill=tk.X)
         
         # Ereignisse laden
-        events = self.get_upcoming_events()
+        events = services.get_upcoming_events(self.access)
         
         if events:
             for event in events:
@@ -794,211 +900,13 @@ class EmployeeManagementSystem:
         value_label = tk.Label(card, text=str(value), font=("Arial", 18, "bold"), fg=DARK_COLOR, bg="white")
         value_label.grid(row=1, column=1, sticky=tk.W)
     
-    def get_employee_count(self):
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM employees WHERE status = 'Aktiv'")
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    
-    def get_current_vacation_count(self):
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(DISTINCT employee_id) FROM vacation 
-            WHERE start_date <= ? AND end_date >= ? AND status = 'Genehmigt'
-        """, (today, today))
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    
-    def get_current_sick_count(self):
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(DISTINCT employee_id) FROM sick_leave 
-            WHERE start_date <= ? AND end_date >= ?
-        """, (today, today))
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    
-    def get_birthdays_this_month(self):
-        current_month = datetime.datetime.now().month
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(*) FROM employees 
-            WHERE strftime('%m', birth_date) = ? AND status = 'Aktiv'
-        """, (f"{current_month:02d}",))
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    
-    def get_employees_by_department(self):
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT department, COUNT(*) 
-            FROM employees 
-            WHERE status = 'Aktiv' 
-            GROUP BY department
-        """)
-        data = cursor.fetchall()
-        conn.close()
-        
-        departments = [dept[0] if dept[0] else "Andere" for dept in data]
-        counts = [dept[1] for dept in data]
-        
-        return departments, counts
-    
-    def get_vacation_by_month(self):
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT strftime('%m', start_date) as month, SUM(days) 
-            FROM vacation 
-            WHERE status = 'Genehmigt' AND strftime('%Y', start_date) = strftime('%Y', 'now')
-            GROUP BY month
-        """)
-        data = {int(month): count for month, count in cursor.fetchall()}
-        conn.close()
-        
-        # Alle Monate abdecken
-        return [data.get(i, 0) for i in range(1, 13)]
-    
-    def get_sick_leave_by_month(self):
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT strftime('%m', start_date) as month, SUM(days) 
-            FROM sick_leave 
-            WHERE strftime('%Y', start_date) = strftime('%Y', 'now')
-            GROUP BY month
-        """)
-        data = {int(month): count for month, count in cursor.fetchall()}
-        conn.close()
-        
-        # Alle Monate abdecken
-        return [data.get(i, 0) for i in range(1, 13)]
-    
-    def get_upcoming_events(self):
-        events = []
-        today = datetime.datetime.now().date()
-        
-        # Kommende Geburtstage
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Geburtstage in den nächsten 30 Tagen
-        cursor.execute("""
-            SELECT first_name, last_name, birth_date 
-            FROM employees 
-            WHERE status = 'Aktiv' 
-            ORDER BY strftime('%m-%d', birth_date)
-        """)
-        
-        employees = cursor.fetchall()
-        for emp in employees:
-            if emp[2]:  # Wenn Geburtsdatum vorhanden
-                try:
-                    birth_date = datetime.datetime.strptime(emp[2], "%Y-%m-%d").date()
-                    
-                    # Nächster Geburtstag in diesem Jahr
-                    next_birthday = datetime.date(today.year, birth_date.month, birth_date.day)
-                    
-                    # Falls der Geburtstag dieses Jahr schon vorbei ist, zum nächsten Jahr wechseln
-                    if next_birthday < today:
-                        next_birthday = datetime.date(today.year + 1, birth_date.month, birth_date.day)
-                    
-                    # Nur Ereignisse in den nächsten 30 Tagen anzeigen
-                    delta = (next_birthday - today).days
-                    if 0 <= delta <= 30:
-                        events.append({
-                            "icon": "🎂",
-                            "text": f"Geburtstag von {emp[0]} {emp[1]}",
-                            "date": next_birthday.strftime("%d.%m.%Y")
-                        })
-                except:
-                    pass
-        
-        # Jubiläen (Mitarbeiter, die X Jahre im Unternehmen sind)
-        cursor.execute("""
-            SELECT first_name, last_name, hire_date 
-            FROM employees 
-            WHERE status = 'Aktiv' 
-            ORDER BY hire_date
-        """)
-        
-        employees = cursor.fetchall()
-        for emp in employees:
-            if emp[2]:  # Wenn Einstellungsdatum vorhanden
-                try:
-                    hire_date = datetime.datetime.strptime(emp[2], "%Y-%m-%d").date()
-                    
-                    # Jubiläumsdatum in diesem Jahr
-                    years_employed = today.year - hire_date.year
-                    anniversary_date = datetime.date(today.year, hire_date.month, hire_date.day)
-                    
-                    # Falls das Jubiläum dieses Jahr schon vorbei ist, zum nächsten Jahr wechseln
-                    if anniversary_date < today:
-                        anniversary_date = datetime.date(today.year + 1, hire_date.month, hire_date.day)
-                        years_employed += 1
-                    
-                    # Nur Ereignisse in den nächsten 30 Tagen und bei rundem Jubiläum (5, 10, 15, etc. Jahre)
-                    delta = (anniversary_date - today).days
-                    if 0 <= delta <= 30 and years_employed > 0 and years_employed % 5 == 0:
-                        events.append({
-                            "icon": "🏆",
-                            "text": f"{years_employed}-jähriges Jubiläum von {emp[0]} {emp[1]}",
-                            "date": anniversary_date.strftime("%d.%m.%Y")
-                        })
-                except:
-                    pass
-        
-        # Kommender Urlaub
-        cursor.execute("""
-            SELECT e.first_name, e.last_name, v.start_date, v.end_date 
-            FROM vacation v
-            JOIN employees e ON v.employee_id = e.id
-            WHERE v.status = 'Genehmigt' AND v.start_date >= ?
-            ORDER BY v.start_date
-            LIMIT 5
-        """, (today.strftime("%Y-%m-%d"),))
-        
-        vacations = cursor.fetchall()
-        for vac in vacations:
-            try:
-                start_date = datetime.datetime.strptime(vac[2], "%Y-%m-%d").date()
-                
-                # Nur Urlaub in den nächsten 14 Tagen anzeigen
-                delta = (start_date - today).days
-                if 0 <= delta <= 14:
-                    events.append({
-                        "icon": "🏖️",
-                        "text": f"{vac[0]} {vac[1]} ist im Urlaub",
-                        "date": f"{format_date(vac[2])} - {format_date(vac[3])}"
-                    })
-            except:
-                pass
-        
-        conn.close()
-        
-        # Nach Datum sortieren
-        events.sort(key=lambda x: datetime.datetime.strptime(x["date"].split(" - ")[0], "%d.%m.%Y"))
-        
-        return events[:10]  # Maximal 10 Ereignisse anzeigen
-    
+    @timed_view("employees")
     def show_employees(self):
-        self.clear_content()
-        self.header_title.config(text="Mitarbeiterverwaltung")
-        self.highlight_menu_button("Mitarbeiter")
-        
+        self.show_view("employees")
+    
+    def build_employees(self, parent):
         # Toolleiste erstellen
-        toolbar = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        toolbar = tk.Frame(parent, bg=LIGHT_COLOR)
         toolbar.pack(fill=tk.X, pady=(0, 10))
         
         # Suchfeld
@@ -1025,7 +933,12 @@ class EmployeeManagementSystem:
         self.department_var.set("Alle")
         self.department_var.trace_add("write", lambda name, index, mode: self.filter_employees())
         
-        departments = ["Alle"] + self.get_departments()
+        # Auswahl zeigt Namen, gefiltert wird nach department_id
+        self.department_ids = {
+            name: department_id for name, department_id in services.get_department_ids().items()
+            if self.access.covers(department_id)
+        }
+        departments = ["Alle"] + list(self.department_ids)
         department_menu = ttk.Combobox(filter_frame, textvariable=self.department_var, values=departments, state="readonly", width=15)
         department_menu.pack(side=tk.LEFT)
         
@@ -1057,7 +970,8 @@ class EmployeeManagementSystem:
             relief=tk.FLAT,
             command=self.add_employee
         )
-        add_button.pack(side=tk.RIGHT, padx=5)
+        if self.access.can("employees.edit"):
+            add_button.pack(side=tk.RIGHT, padx=5)
         
         export_button = tk.Button(
             button_frame,
@@ -1069,10 +983,11 @@ class EmployeeManagementSystem:
             relief=tk.FLAT,
             command=lambda: self.export_data("employees")
         )
-        export_button.pack(side=tk.RIGHT, padx=5)
+        if self.access.can("export"):
+            export_button.pack(side=tk.RIGHT, padx=5)
         
         # Tabelle für Mitarbeiter
-        table_frame = tk.Frame(self.content_frame, bg="white")
+        table_frame = tk.Frame(parent, bg="white")
         table_frame.pack(fill=tk.BOTH, expand=True)
         
         # Scrollbar
@@ -1084,15 +999,22 @@ class EmployeeManagementSystem:
         
         # Treeview für tabellarische Anzeige
         columns = ("id", "employee_id", "name", "department", "position", "hire_date", "status")
+        
+        # Eigener Stil mit höheren Zeilen für die Profilbilder
+        style = ttk.Style()
+        style.configure("Employee.Treeview", rowheight=28)
+        
         self.employee_tree = ttk.Treeview(
             table_frame, 
             columns=columns,
-            show="headings",
+            show="tree headings",
+            style="Employee.Treeview",
             yscrollcommand=scrollbar_y.set,
             xscrollcommand=scrollbar_x.set
         )
         
         # Spalten konfigurieren
+        self.employee_tree.heading("#0", text="")
         self.employee_tree.heading("id", text="ID")
         self.employee_tree.heading("employee_id", text="Personalnummer")
         self.employee_tree.heading("name", text="Name")
@@ -1101,6 +1023,7 @@ class EmployeeManagementSystem:
         self.employee_tree.heading("hire_date", text="Einstellungsdatum")
         self.employee_tree.heading("status", text="Status")
         
+        self.employee_tree.column("#0", width=40, stretch=False, anchor=tk.CENTER)
         self.employee_tree.column("id", width=50, anchor=tk.CENTER)
         self.employee_tree.column("employee_id", width=120, anchor=tk.CENTER)
         self.employee_tree.column("name", width=200)
@@ -1115,17 +1038,22 @@ class EmployeeManagementSystem:
         scrollbar_y.config(command=self.employee_tree.yview)
         scrollbar_x.config(command=self.employee_tree.xview)
         
-        # Kontextmenü für Zeilen
+        # Kontextmenü für Zeilen (nur Einträge, für die der Benutzer berechtigt ist)
         self.employee_context_menu = tk.Menu(self.employee_tree, tearoff=0)
-        self.employee_context_menu.add_command(label="Details anzeigen", command=self.view_employee)
-        self.employee_context_menu.add_command(label="Bearbeiten", command=self.edit_employee)
-        self.employee_context_menu.add_separator()
-        self.employee_context_menu.add_command(label="Urlaub beantragen", command=self.request_vacation)
-        self.employee_context_menu.add_command(label="Krankmeldung eintragen", command=self.report_sick_leave)
-        self.employee_context_menu.add_separator()
-        self.employee_context_menu.add_command(label="Dokument hochladen", command=self.upload_document)
-        self.employee_context_menu.add_separator()
-        self.employee_context_menu.add_command(label="Status ändern", command=self.change_employee_status)
+        menu_groups = [
+            [("Details anzeigen", self.view_employee, None), ("Bearbeiten", self.edit_employee, "employees.edit")],
+            [("Urlaub beantragen", self.request_vacation, "vacation.request"),
+             ("Krankmeldung eintragen", self.report_sick_leave, "sick_leave.edit")],
+            [("Dokument hochladen", self.upload_document, "documents.upload"),
+             ("Änderungsverlauf", self.show_employee_history, "audit.view")],
+            [("Status ändern", self.change_employee_status, "employees.edit")]
+        ]
+        for group in menu_groups:
+            entries = [(label, command) for label, command, permission in group if not permission or self.access.can(permission)]
+            if entries and self.employee_context_menu.index(tk.END) is not None:
+                self.employee_context_menu.add_separator()
+            for label, command in entries:
+                self.employee_context_menu.add_command(label=label, command=command)
         
         self.employee_tree.bind("<Button-3>", self.show_employee_context_menu)
         self.employee_tree.bind("<Double-1>", lambda event: self.view_employee())
@@ -1134,6 +1062,82 @@ class EmployeeManagementSystem:
         self.load_employees()
         self.update_status("Mitarbeiterverwaltung geladen")
     
+    @timed_view("org_chart")
+    def show_org_chart(self):
+        self.show_view("org_chart")
+    
+    def build_org_chart(self, parent):
+        table_frame = tk.Frame(parent, bg="white")
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar_y = tk.Scrollbar(table_frame)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Abteilungen und Berichtslinien; Teilbäume werden erst beim Aufklappen geladen
+        columns = ("position", "headcount")
+        self.org_tree = ttk.Treeview(table_frame, columns=columns, show="tree headings", yscrollcommand=scrollbar_y.set)
+        
+        self.org_tree.heading("#0", text="Abteilung / Mitarbeiter")
+        self.org_tree.heading("position", text="Position")
+        self.org_tree.heading("headcount", text="Mitarbeiter (gesamt)")
+        
+        self.org_tree.column("#0", width=350)
+        self.org_tree.column("position", width=200)
+        self.org_tree.column("headcount", width=140, anchor=tk.CENTER)
+        
+        self.org_tree.pack(fill=tk.BOTH, expand=True)
+        scrollbar_y.config(command=self.org_tree.yview)
+        
+        self.org_tree.bind("<<TreeviewOpen>>", self.expand_org_node)
+        
+        self.load_org_chart()
+        self.update_status("Organigramm geladen")
+    
+    def load_org_chart(self):
+        self.org_tree.delete(*self.org_tree.get_children())
+        self.org_nodes = {}
+        
+        for row in org.get_department_children(access=self.access):
+            self.insert_department_node("", row)
+    
+    def insert_department_node(self, parent_iid, row):
+        iid = f"{parent_iid}/d{row['id']}"
+        self.org_tree.insert(parent_iid, tk.END, iid=iid, text=f"🏢 {row['name']}", values=(row['description'] or "", row['headcount']))
+        self.org_nodes[iid] = ("department", row['id'])
+        if row['has_children']:
+            # Platzhalter, damit der Knoten aufklappbar ist
+            self.org_tree.insert(iid, tk.END, iid=f"{iid}/…", text="…")
+    
+    def insert_employee_node(self, parent_iid, row):
+        iid = f"{parent_iid}/e{row['id']}"
+        name = f"{row['last_name']}, {row['first_name']}"
+        if row['status'] != "Aktiv":
+            name += f" ({row['status']})"
+        self.org_tree.insert(
+            parent_iid, tk.END, iid=iid, text=f"👤 {name}",
+            values=(row['position'] or "", row['direct_reports'] if row['direct_reports'] else "")
+        )
+        self.org_nodes[iid] = ("employee", row['id'])
+        if row['direct_reports']:
+            self.org_tree.insert(iid, tk.END, iid=f"{iid}/…", text="…")
+    
+    def expand_org_node(self, event):
+        iid = self.org_tree.focus()
+        placeholder = f"{iid}/…"
+        if not self.org_tree.exists(placeholder):
+            return
+        self.org_tree.delete(placeholder)
+        
+        kind, node_id = self.org_nodes[iid]
+        if kind == "department":
+            for row in org.get_department_children(node_id):
+                self.insert_department_node(iid, row)
+            for row in org.get_department_employees(node_id):
+                self.insert_employee_node(iid, row)
+        else:
+            for row in org.get_direct_reports(node_id, self.access):
+                self.insert_employee_node(iid, row)
+    
     def show_employee_context_menu(self, event):
         try:
             iid = self.employee_tree.identify_row(event.y)
@@ -1143,81 +1147,119 @@ class EmployeeManagementSystem:
         except:
             pass
     
-    def get_departments(self):
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM departments ORDER BY name")
-        departments = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return departments
-    
     def load_employees(self):
-        # Alle bestehenden Einträge löschen
-        for item in self.employee_tree.get_children():
-            self.employee_tree.delete(item)
+        # Alle bestehenden Einträge löschen, auch die vom Filter ausgeblendeten
+        for item in set(self.employee_tree.get_children()) | set(self.employee_rows):
+            if self.employee_tree.exists(item):
+                self.employee_tree.delete(item)
         
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row  # Ermöglicht Zugriff auf Spalten nach Namen
-        cursor = conn.cursor()
+        # Referenzen auf die Profilbilder der Zeilen halten, solange sie angezeigt werden
+        self.employee_avatars = {}
+        self.employee_versions = {}
+        self.employee_rows = {}
+        self.pending_avatars = {}
         
         # Mitarbeiter laden
-        cursor.execute("""
-            SELECT id, employee_id, first_name, last_name, department, position, hire_date, status 
-            FROM employees
-            ORDER BY last_name, first_name
-        """)
-        
-        for row in cursor.fetchall():
-            formatted_date = format_date(row['hire_date']) if row['hire_date'] else ""
-            
-            self.employee_tree.insert(
-                "", 
-                tk.END, 
-                values=(
-                    row['id'],
-                    row['employee_id'],
-                    f"{row['last_name']}, {row['first_name']}",
-                    row['department'],
-                    row['position'],
-                    formatted_date,
-                    row['status']
-                )
-            )
-        
-        conn.close()
+        for row in services.list_employees(self.access):
+            self.show_employee_row(row)
+        self.prefetch_avatars()
         
         # Filter anwenden, falls aktiv
         self.filter_employees()
     
+    def show_employee_row(self, row):
+        iid = str(row['id'])
+        formatted_date = format_date(row['hire_date']) if row['hire_date'] else ""
+        
+        # Verkleinertes Profilbild aus dem Cache statt des Originals; fehlende Varianten werden im
+        # Hintergrund erzeugt (prefetch_avatars), statt die Originale im Tk-Thread zu dekodieren
+        if self.image_cache.needs_render(row['profile_image'], "avatar"):
+            self.pending_avatars[iid] = row['profile_image']
+            avatar = None
+        else:
+            avatar = self.image_cache.get_photo(row['profile_image'], "avatar")
+        
+        values = (
+            row['id'],
+            row['employee_id'],
+            f"{row['last_name']}, {row['first_name']}",
+            row['department'],
+            row['position'],
+            formatted_date,
+            row['status']
+        )
+        
+        if self.employee_tree.exists(iid):
+            self.employee_tree.item(iid, image=avatar if avatar else "", values=values)
+        else:
+            self.employee_tree.insert("", tk.END, iid=iid, image=avatar if avatar else "", values=values)
+        
+        if avatar:
+            self.employee_avatars[iid] = avatar
+        else:
+            self.employee_avatars.pop(iid, None)
+        self.employee_versions[iid] = row['version']
+        self.employee_rows[iid] = row
+    
+    def refresh_employee_rows(self, changes):
+        for row_id, operation in changes.items():
+            iid = str(row_id)
+            if operation == "DELETE" and self.employee_tree.exists(iid):
+                self.employee_tree.delete(iid)
+                self.employee_avatars.pop(iid, None)
+                self.employee_versions.pop(iid, None)
+                self.employee_rows.pop(iid, None)
+        
+        changed_ids = [row_id for row_id, operation in changes.items() if operation != "DELETE"]
+        for row in services.get_employee_rows(changed_ids, self.access):
+            self.show_employee_row(row)
+        self.prefetch_avatars()
+        
+        self.filter_employees()
+    
+    # Fehlende Profilbild-Varianten in einem Hintergrund-Thread erzeugen und danach in die Zeilen setzen
+    def prefetch_avatars(self):
+        if not self.pending_avatars:
+            return
+        pending, self.pending_avatars = self.pending_avatars, {}
+        thread = self.image_cache.prefetch(list(pending.values()), "avatar")
+        self.root.after(WORKER_POLL_INTERVAL_MS, lambda: self.apply_avatars(thread, pending))
+    
+    def apply_avatars(self, thread, pending):
+        if thread.is_alive():
+            self.root.after(WORKER_POLL_INTERVAL_MS, lambda: self.apply_avatars(thread, pending))
+            return
+        if not self.widget_alive("employee_tree"):
+            return
+        
+        for iid, path in pending.items():
+            row = self.employee_rows.get(iid)
+            # Zeile inzwischen entfernt oder mit anderem Bild neu geladen
+            if row is None or row['profile_image'] != path or not self.employee_tree.exists(iid):
+                continue
+            avatar = self.image_cache.get_photo(path, "avatar")
+            if avatar:
+                self.employee_tree.item(iid, image=avatar)
+                self.employee_avatars[iid] = avatar
+    
     def filter_employees(self):
-        search_term = self.search_var.get().lower()
-        department_filter = self.department_var.get()
-        status_filter = self.status_var.get()
+        visible = {
+            str(row['id']) for row in services.filter_employee_rows(
+                self.employee_rows.values(),
+                self.search_var.get(),
+                self.department_ids.get(self.department_var.get()),
+                self.status_var.get()
+            )
+        }
         
-        for item in self.employee_tree.get_children():
-            values = self.employee_tree.item(item, "values")
-            
-            # Anwendung der Filter
-            show_item = True
-            
-            # Suchfilter
-            if search_term:
-                if not (search_term in values[2].lower() or search_term in values[1].lower()):
-                    show_item = False
-            
-            # Abteilungsfilter
-            if department_filter != "Alle" and values[3] != department_filter:
-                show_item = False
-            
-            # Statusfilter
-            if status_filter != "Alle" and values[6] != status_filter:
-                show_item = False
-            
-            # Sichtbarkeit anpassen
-            if show_item:
-                self.employee_tree.item(item, tags=())
+        # Ausgeblendete Zeilen lösen, passende in der ursprünglichen Reihenfolge wieder einhängen
+        index = 0
+        for iid in self.employee_rows:
+            if iid in visible:
+                self.employee_tree.move(iid, "", index)
+                index += 1
             else:
-                self.employee_tree.detach(item)
+                self.employee_tree.detach(iid)
     
     def add_employee(self):
         EmployeeDialog(self.root, self.load_employees)
@@ -1247,7 +1289,7 @@ class EmployeeManagementSystem:
             return
         
         employee_id = self.employee_tree.item(selected_item[0], "values")[0]
-        VacationDialog(self.root, employee_id)
+        VacationDialog(self.root, employee_id, access=self.access)
     
     def report_sick_leave(self):
         selected_item = self.employee_tree.selection()
@@ -1256,7 +1298,7 @@ class EmployeeManagementSystem:
             return
         
         employee_id = self.employee_tree.item(selected_item[0], "values")[0]
-        SickLeaveDialog(self.root, employee_id)
+        SickLeaveDialog(self.root, employee_id, access=self.access)
     
     def upload_document(self):
         selected_item = self.employee_tree.selection()
@@ -1267,6 +1309,15 @@ class EmployeeManagementSystem:
         employee_id = self.employee_tree.item(selected_item[0], "values")[0]
         DocumentUploadDialog(self.root, employee_id)
     
+    def show_employee_history(self):
+        selected_item = self.employee_tree.selection()
+        if not selected_item:
+            messagebox.showinfo("Information", "Bitte wählen Sie einen Mitarbeiter aus.")
+            return
+        
+        employee_data = self.employee_tree.item(selected_item[0], "values")
+        AuditHistoryDialog(self.root, employee_data[0], employee_data[2])
+    
     def change_employee_status(self):
         selected_item = self.employee_tree.selection()
         if not selected_item:
@@ -1276,32 +1327,21 @@ class EmployeeManagementSystem:
         employee_data = self.employee_tree.item(selected_item[0], "values")
         employee_id = employee_data[0]
         current_status = employee_data[6]
+        expected_version = self.employee_versions.get(selected_item[0])
         
         new_status = "Inaktiv" if current_status == "Aktiv" else "Aktiv"
         
         if messagebox.askyesno("Status ändern", f"Möchten Sie den Status des Mitarbeiters von '{current_status}' zu '{new_status}' ändern?"):
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
-            
             try:
-                current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                cursor.execute("""
-                    UPDATE employees 
-                    SET status = ?, updated_at = ?
-                    WHERE id = ?
-                """, (new_status, current_time, employee_id))
-                
-                conn.commit()
+                services.set_employee_status(employee_id, new_status, expected_version, self.access)
                 self.load_employees()
                 self.update_status(f"Mitarbeiterstatus erfolgreich geändert")
-                
-                logger.info(f"Mitarbeiterstatus geändert: ID {employee_id}, neuer Status: {new_status}")
+            except services.ConcurrentModificationError:
+                messagebox.showwarning("Konflikt", "Der Mitarbeiter wurde zwischenzeitlich von einem anderen Benutzer geändert. Die Ansicht wurde aktualisiert.")
+                self.load_employees()
             except Exception as e:
-                conn.rollback()
                 messagebox.showerror("Fehler", f"Fehler beim Ändern des Mitarbeiterstatus: {str(e)}")
                 logger.error(f"Fehler beim Ändern des Mitarbeiterstatus: {e}")
-            finally:
-                conn.close()
     
     def export_data(self, data_type):
         if data_type == "employees":
@@ -1323,31 +1363,14 @@ class EmployeeManagementSystem:
             if not export_path:
                 return
             
-            # Mitarbeiterdaten abrufen
-            conn = sqlite3.connect(DATABASE_PATH)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT e.*, d.name as department_name
-                FROM employees e
-                LEFT JOIN departments d ON e.department = d.name
-            """)
-            
-            employees = cursor.fetchall()
-            conn.close()
-            
             try:
                 # In verschiedene Formate exportieren
-                if export_path.endswith(".csv"):
-                    self.export_to_csv(export_path, employees)
-                elif export_path.endswith(".xlsx"):
+                if export_path.endswith(".xlsx"):
                     messagebox.showinfo("Information", "Excel-Export ist in dieser Version nicht verfügbar.")
-                elif export_path.endswith(".pdf"):
-                    self.export_to_pdf(export_path, employees)
-                else:
-                    self.export_to_csv(export_path, employees)  # Standardmäßig als CSV
+                    return
                 
+                services.export_employees(export_path, self.access)
+                export_path = services.export_target(export_path, self.config)
                 self.update_status(f"Mitarbeiterdaten erfolgreich exportiert nach {export_path}")
                 
                 # Export-Ordner öffnen
@@ -1356,60 +1379,38 @@ class EmployeeManagementSystem:
             except Exception as e:
                 messagebox.showerror("Exportfehler", f"Fehler beim Exportieren der Daten: {str(e)}")
                 logger.error(f"Exportfehler: {e}")
-    
-    def export_to_csv(self, filepath, data):
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            # Feldnamen aus den Daten extrahieren
-            fieldnames = [key for key in data[0].keys()]
+        elif data_type == "absences":
+            # Genehmigte Abwesenheiten der gewählten Abteilung als Kalenderdatei (iCalendar)
+            department = self.absence_department_var.get()
+            export_path = filedialog.asksaveasfilename(
+                defaultextension=".ics",
+                filetypes=[("Kalenderdateien", "*.ics"), ("Alle Dateien", "*.*")],
+                initialdir=EXPORT_PATH,
+                initialfile=f"abwesenheiten_{department.lower()}.ics",
+                title="Abwesenheiten exportieren"
+            )
             
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+            if not export_path:
+                return
             
-            for row in data:
-                writer.writerow({key: row[key] for key in fieldnames})
-    
-    def export_to_pdf(self, filepath, data):
-        pdf = FPDF()
-        pdf.add_page()
-        
-        # Titel
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(190, 10, "Mitarbeiterliste", 0, 1, "C")
-        pdf.ln(10)
-        
-        # Tabellenkopf
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(15, 10, "ID", 1, 0, "C")
-        pdf.cell(40, 10, "Name", 1, 0, "C")
-        pdf.cell(30, 10, "Personalnr.", 1, 0, "C")
-        pdf.cell(40, 10, "Abteilung", 1, 0, "C")
-        pdf.cell(40, 10, "Position", 1, 0, "C")
-        pdf.cell(25, 10, "Status", 1, 1, "C")
-        
-        # Tabellendaten
-        pdf.set_font("Arial", "", 10)
-        for row in data:
-            pdf.cell(15, 10, str(row['id']), 1, 0, "C")
-            pdf.cell(40, 10, f"{row['first_name']} {row['last_name']}", 1, 0, "L")
-            pdf.cell(30, 10, str(row['employee_id']), 1, 0, "L")
-            pdf.cell(40, 10, str(row['department']), 1, 0, "L")
-            pdf.cell(40, 10, str(row['position']), 1, 0, "L")
-            pdf.cell(25, 10, str(row['status']), 1, 1, "C")
-        
-        # Fußzeile
-        pdf.ln(10)
-        pdf.set_font("Arial", "I", 8)
-        pdf.cell(0, 10, f"Erstellt mit {APP_NAME} am {datetime.datetime.now().strftime('%d.%m.%Y %H:%M')}", 0, 0, "L")
-        
-        pdf.output(filepath)
+            try:
+                events = ics_export.write_calendar(
+                    export_path, f"Abwesenheiten {department}", self.absence_department_ids.get(department),
+                    access=self.access, include_sick=self.access.can("sick_leave.view")
+                )
+                export_path = services.export_target(export_path, self.config)
+                self.update_status(f"{events} Abwesenheiten exportiert nach {export_path}")
+            except Exception as e:
+                messagebox.showerror("Exportfehler", f"Fehler beim Exportieren der Abwesenheiten: {str(e)}")
+                logger.error(f"Exportfehler: {e}")
     
+    @timed_view("vacation")
     def show_vacation(self):
-        self.clear_content()
-        self.header_title.config(text="Urlaubsverwaltung")
-        self.highlight_menu_button("Urlaub")
-        
+        self.show_view("vacation")
+    
+    def build_vacation(self, parent):
         # Toolbar erstellen
-        toolbar = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        toolbar = tk.Frame(parent, bg=LIGHT_COLOR)
         toolbar.pack(fill=tk.X, pady=(0, 10))
         
         # Filter für Jahr und Monat
@@ -1447,10 +1448,24 @@ class EmployeeManagementSystem:
             relief=tk.FLAT,
             command=self.new_vacation_request
         )
-        new_vacation_button.pack(side=tk.RIGHT, padx=5)
+        if self.access.can("vacation.request"):
+            new_vacation_button.pack(side=tk.RIGHT, padx=5)
+        
+        self.year_close_button = tk.Button(
+            button_frame,
+            text="Jahresabschluss",
+            bg=DARK_COLOR,
+            fg="white",
+            padx=10,
+            pady=2,
+            relief=tk.FLAT,
+            command=self.close_vacation_year
+        )
+        if self.access.can("vacation.close"):
+            self.year_close_button.pack(side=tk.RIGHT, padx=5)
         
         # Tabelle für Urlaubsanträge
-        table_frame = tk.Frame(self.content_frame, bg="white")
+        table_frame = tk.Frame(parent, bg="white")
         table_frame.pack(fill=tk.BOTH, expand=True)
         
         # Scrollbars
@@ -1498,8 +1513,9 @@ class EmployeeManagementSystem:
         # Kontextmenü für Urlaubsanträge
         self.vacation_context_menu = tk.Menu(self.vacation_tree, tearoff=0)
         self.vacation_context_menu.add_command(label="Details anzeigen", command=self.view_vacation)
-        self.vacation_context_menu.add_command(label="Genehmigen", command=lambda: self.change_vacation_status("Genehmigt"))
-        self.vacation_context_menu.add_command(label="Ablehnen", command=lambda: self.change_vacation_status("Abgelehnt"))
+        if self.access.can("vacation.approve"):
+            self.vacation_context_menu.add_command(label="Genehmigen", command=lambda: self.change_vacation_status("Genehmigt"))
+            self.vacation_context_menu.add_command(label="Ablehnen", command=lambda: self.change_vacation_status("Abgelehnt"))
         
         self.vacation_tree.bind("<Button-3>", self.show_vacation_context_menu)
         self.vacation_tree.bind("<Double-1>", lambda event: self.view_vacation())
@@ -1526,46 +1542,111 @@ class EmployeeManagementSystem:
         for item in self.vacation_tree.get_children():
             self.vacation_tree.delete(item)
         
-        # Verbindung zur Datenbank
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # Ausgewähltes Jahr und Monat
         selected_year = int(self.year_var.get())
         selected_month = list(calendar.month_name).index(self.month_var.get())
         
-        # SQL-Abfrage für Urlaubsanträge des ausgewählten Monats
-        cursor.execute("""
-            SELECT v.*, e.first_name, e.last_name, u.username as approver_name
-            FROM vacation v
-            JOIN employees e ON v.employee_id = e.id
-            LEFT JOIN users u ON v.approved_by = u.id
-            WHERE strftime('%Y', v.start_date) = ?
-            AND strftime('%m', v.start_date) = ?
-            ORDER BY v.start_date DESC
-        """, (str(selected_year), f"{selected_month:02d}"))
-        
-        for row in cursor.fetchall():
-            self.vacation_tree.insert(
-                "",
-                tk.END,
-                values=(
-                    row['id'],
-                    f"{row['last_name']}, {row['first_name']}",
-                    format_date(row['start_date']),
-                    format_date(row['end_date']),
-                    row['days'],
-                    row['status'],
-                    row['approver_name'] if row['approver_name'] else "-",
-                    format_date(row['created_at'], format_from="%Y-%m-%d %H:%M:%S", format_to="%d.%m.%Y %H:%M")
-                )
-            )
+        self.vacation_versions = {}
         
-        conn.close()
+        # Urlaubsanträge des ausgewählten Monats
+        for row in services.list_vacation(selected_year, selected_month, self.access):
+            self.show_vacation_row(row)
+    
+    def show_vacation_row(self, row):
+        iid = str(row['id'])
+        values = (
+            row['id'],
+            f"{row['last_name']}, {row['first_name']}",
+            format_date(row['start_date']),
+            format_date(row['end_date']),
+            row['days'],
+            row['status'],
+            row['approver_name'] if row['approver_name'] else "-",
+            format_date(row['created_at'], format_from="%Y-%m-%d %H:%M:%S", format_to="%d.%m.%Y %H:%M")
+        )
+        
+        if self.vacation_tree.exists(iid):
+            self.vacation_tree.item(iid, values=values)
+        else:
+            self.vacation_tree.insert("", tk.END, iid=iid, values=values)
+        self.vacation_versions[iid] = row['version']
+    
+    def refresh_vacation_rows(self, changes):
+        selected_year = int(self.year_var.get())
+        selected_month = list(calendar.month_name).index(self.month_var.get())
+        month_prefix = f"{selected_year}-{selected_month:02d}"
+        
+        for row_id, operation in changes.items():
+            iid = str(row_id)
+            if operation == "DELETE" and self.vacation_tree.exists(iid):
+                self.vacation_tree.delete(iid)
+                self.vacation_versions.pop(iid, None)
+        
+        changed_ids = [row_id for row_id, operation in changes.items() if operation != "DELETE"]
+        for row in services.get_vacation_rows(changed_ids, self.access):
+            iid = str(row['id'])
+            if row['start_date'] and row['start_date'].startswith(month_prefix):
+                self.show_vacation_row(row)
+            elif self.vacation_tree.exists(iid):
+                # Antrag wurde in einen anderen Monat verschoben
+                self.vacation_tree.delete(iid)
+                self.vacation_versions.pop(iid, None)
+
+    # Urlaubsjahr abschließen: gewähltes Jahr, solange es beendet ist, sonst das Vorjahr
+    def close_vacation_year(self):
+        year = min(int(self.year_var.get()), datetime.date.today().year - 1)
+        run = year_close.get_run(year)
+        if run is not None:
+            question = (f"Das Urlaubsjahr {year} wurde am {format_date(run['closed_at'][:10])} abgeschlossen.\n\n"
+                        "Salden neu berechnen? Bereits abgeschlossene Folgejahre werden ebenfalls neu berechnet.")
+        else:
+            question = (f"Urlaubsjahr {year} abschließen?\n\n"
+                        "Resturlaub wird bis zur Obergrenze übertragen, nicht genommener Übertrag des Vorjahres verfällt.")
+        if not messagebox.askyesno("Jahresabschluss", question):
+            return
+        
+        self.year_close_result = None
+        self.year_close_thread = threading.Thread(target=self.run_year_close, args=(year, run is not None), daemon=True)
+        self.year_close_thread.start()
+        self.year_close_button.config(state=tk.DISABLED)
+        self.update_status(f"Urlaubsjahr {year} wird abgeschlossen...")
+        self.root.after(WORKER_POLL_INTERVAL_MS, self.check_year_close)
+    
+    def run_year_close(self, year, force):
+        try:
+            self.year_close_result = ("ok", year_close.close_year(year, force))
+        except Exception as e:
+            logger.error(f"Fehler beim Jahresabschluss {year}: {e}")
+            self.year_close_result = ("error", str(e))
+    
+    def check_year_close(self):
+        if self.year_close_thread.is_alive():
+            self.root.after(WORKER_POLL_INTERVAL_MS, self.check_year_close)
+            return
+        
+        self.year_close_thread = None
+        if self.year_close_button.winfo_exists():
+            self.year_close_button.config(state=tk.NORMAL)
+        
+        status, result = self.year_close_result
+        if status == "error":
+            self.update_status("Jahresabschluss fehlgeschlagen")
+            messagebox.showerror("Fehler", f"Jahresabschluss fehlgeschlagen: {result}")
+            return
+        
+        files = "\n".join(json.loads(result['summary_files'] or "[]"))
+        self.update_status(f"Urlaubsjahr {result['year']} abgeschlossen")
+        messagebox.showinfo(
+            "Jahresabschluss",
+            f"Urlaubsjahr {result['year']} abgeschlossen: {result['employees']} Mitarbeiter\n\n"
+            f"Übertragen: {result['carried_out']:g} Tage\n"
+            f"Verfallen (Stichtag): {result['expired']:g} Tage\n"
+            f"Über Obergrenze: {result['forfeited']:g} Tage\n\n"
+            f"Zusammenfassung:\n{files}"
+        )
 
     def new_vacation_request(self):
-        VacationDialog(self.root, None, self.load_vacation_data)
+        VacationDialog(self.root, None, self.load_vacation_data, access=self.access)
 
     def view_vacation(self):
         selected_item = self.vacation_tree.selection()
@@ -1584,42 +1665,129 @@ class EmployeeManagementSystem:
         
         vacation_id = self.vacation_tree.item(selected_item[0], "values")[0]
         current_status = self.vacation_tree.item(selected_item[0], "values")[5]
+        expected_version = self.vacation_versions.get(selected_item[0])
         
         if current_status == new_status:
             messagebox.showinfo("Information", f"Der Urlaubsantrag hat bereits den Status '{new_status}'.")
             return
         
         if messagebox.askyesno("Status ändern", f"Möchten Sie den Status des Urlaubsantrags zu '{new_status}' ändern?"):
-            conn = sqlite3.connect(DATABASE_PATH)
-            cursor = conn.cursor()
-            
             try:
-                current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                cursor.execute("""
-                    UPDATE vacation 
-                    SET status = ?, approved_by = ?, approved_date = ?
-                    WHERE id = ?
-                """, (new_status, self.user['id'], current_time, vacation_id))
-                
-                conn.commit()
+                services.set_vacation_status(vacation_id, new_status, self.user['id'], expected_version, self.access)
                 self.load_vacation_data()
                 self.update_status(f"Urlaubsantrag erfolgreich {new_status.lower()}")
-                
-                logger.info(f"Urlaubsantrag Status geändert: ID {vacation_id}, neuer Status: {new_status}")
+            except services.ConcurrentModificationError:
+                messagebox.showwarning("Konflikt", "Der Urlaubsantrag wurde zwischenzeitlich von einem anderen Benutzer bearbeitet. Die Ansicht wurde aktualisiert.")
+                self.load_vacation_data()
             except Exception as e:
-                conn.rollback()
                 messagebox.showerror("Fehler", f"Fehler beim Ändern des Urlaubsstatus: {str(e)}")
                 logger.error(f"Fehler beim Ändern des Urlaubsstatus: {e}")
-            finally:
-                conn.close()
 
-    def show_sick_leave(self):
-        self.clear_content()
-        self.header_title.config(text="Krankschreibungen")
-        self.highlight_menu_button("Krankschreibungen")
+    @timed_view("absence_calendar")
+    def show_absence_calendar(self):
+        self.show_view("absence_calendar")
+    
+    def build_absence_calendar(self, parent):
+        # Toolbar: Zeitraum, Blättern, Abteilung
+        toolbar = tk.Frame(parent, bg=LIGHT_COLOR)
+        toolbar.pack(fill=tk.X, pady=(0, 10))
+        
+        self.absence_mode_var = tk.StringVar(value="Monat")
+        mode_menu = ttk.Combobox(toolbar, textvariable=self.absence_mode_var, values=["Monat", "Quartal"], state="readonly", width=8)
+        mode_menu.pack(side=tk.LEFT, padx=(0, 10))
+        
+        today = datetime.date.today()
+        self.absence_anchor = datetime.date(today.year, today.month, 1)
+        for text, months in (("◀", -1), ("Heute", 0), ("▶", 1)):
+            button = tk.Button(toolbar, text=text, bg="white", relief=tk.FLAT, padx=8,
+                               command=lambda months=months: self.shift_absence_period(months))
+            button.pack(side=tk.LEFT, padx=2)
+        
+        self.absence_period_label = tk.Label(toolbar, text="", font=("Arial", 11, "bold"), bg=LIGHT_COLOR, fg=DARK_COLOR)
+        self.absence_period_label.pack(side=tk.LEFT, padx=10)
+        
+        department_label = tk.Label(toolbar, text="Abteilung:", bg=LIGHT_COLOR)
+        department_label.pack(side=tk.LEFT, padx=(20, 5))
+        
+        self.absence_department_ids = {
+            name: department_id for name, department_id in services.get_department_ids().items()
+            if self.access.covers(department_id)
+        }
+        self.absence_department_var = tk.StringVar(value="Alle")
+        department_menu = ttk.Combobox(toolbar, textvariable=self.absence_department_var,
+                                       values=["Alle"] + list(self.absence_department_ids), state="readonly", width=15)
+        department_menu.pack(side=tk.LEFT)
+        
+        if self.access.can("export"):
+            ics_button = tk.Button(toolbar, text="ICS exportieren", bg=THEME_COLOR, fg="white", relief=tk.FLAT,
+                                   padx=10, command=lambda: self.export_data("absences"))
+            ics_button.pack(side=tk.LEFT, padx=(20, 0))
+        
+        # Legende
+        legend = [("Urlaub", ABSENCE_COLORS[("vacation", "Genehmigt")]), ("Beantragt", ABSENCE_COLORS[("vacation", "Beantragt")])]
+        if self.access.can("sick_leave.view"):
+            legend.append(("Krank", ABSENCE_COLORS[("sick", None)]))
+        for text, color in reversed(legend):
+            tk.Label(toolbar, text=text, bg=LIGHT_COLOR).pack(side=tk.RIGHT, padx=(2, 10))
+            tk.Label(toolbar, text="  ", bg=color).pack(side=tk.RIGHT)
+        
+        # Kalender auf einem Canvas; es werden nur die sichtbaren Zeilen gezeichnet
+        self.absence_calendar = AbsenceCalendar(parent, on_hover=self.update_status)
+        self.absence_calendar.pack(fill=tk.BOTH, expand=True)
+        
+        self.absence_mode_var.trace_add("write", lambda *args: self.load_absence_calendar())
+        self.absence_department_var.trace_add("write", lambda *args: self.load_absence_calendar())
+        
+        self.load_absence_calendar()
+    
+    # Angezeigter Zeitraum: Monat des Ankers bzw. das Quartal, in dem er liegt
+    def absence_period(self):
+        first = self.absence_anchor
+        months = 1
+        if self.absence_mode_var.get() == "Quartal":
+            first = first.replace(month=(first.month - 1) // 3 * 3 + 1)
+            months = 3
+        month_index = first.month - 1 + months
+        last = datetime.date(first.year + month_index // 12, month_index % 12 + 1, 1) - datetime.timedelta(days=1)
+        return first, last
+    
+    # Um einen Zeitraum (Monat bzw. Quartal) blättern; 0 springt zum aktuellen Monat
+    def shift_absence_period(self, direction):
+        if direction == 0:
+            today = datetime.date.today()
+            self.absence_anchor = datetime.date(today.year, today.month, 1)
+        else:
+            step = 3 if self.absence_mode_var.get() == "Quartal" else 1
+            month_index = self.absence_anchor.year * 12 + self.absence_anchor.month - 1 + direction * step
+            self.absence_anchor = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+        self.load_absence_calendar()
+    
+    # Daten des Zeitraums laden (eine Abfrage für alle Abwesenheiten); gezeichnet wird nur, was sich geändert hat
+    def load_absence_calendar(self):
+        first, last = self.absence_period()
+        if self.absence_mode_var.get() == "Quartal":
+            self.absence_period_label.config(text=f"Q{(first.month - 1) // 3 + 1} {first.year}")
+        else:
+            self.absence_period_label.config(text=f"{calendar.month_name[first.month]} {first.year}")
+        
+        employees = services.get_calendar_employees(
+            first.isoformat(), last.isoformat(),
+            self.absence_department_ids.get(self.absence_department_var.get()), self.access
+        )
+        absences = services.get_absences(first.isoformat(), last.isoformat(),
+                                         self.access.can("sick_leave.view"), self.access)
         
+        self.absence_calendar.set_period(first, last)
+        self.absence_calendar.set_data(employees, absences)
+        self.update_status(f"{len(employees)} Mitarbeiter, {len(absences)} Abwesenheiten im Zeitraum")
+    
+    @timed_view("sick_leave")
+    def show_sick_leave(self):
+        self.show_view("sick_leave")
+    
+    def build_sick_leave(self, parent):
         # Toolbar erstellen
-        toolbar = tk.Frame(self.content_frame, bg=LIGHT_COLOR)
+        toolbar = tk.Frame(parent, bg=LIGHT_COLOR)
         toolbar.pack(fill=tk.X, pady=(0, 10))
         
         # Filter für Jahr und Monat
@@ -1657,10 +1825,11 @@ class EmployeeManagementSystem:
             relief=tk.FLAT,
             command=lambda: self.report_sick_leave()
         )
-        new_sick_leave_button.pack(side=tk.RIGHT, padx=5)
+        if self.access.can("sick_leave.edit"):
+            new_sick_leave_button.pack(side=tk.RIGHT, padx=5)
         
         # Tabelle für Krankmeldungen
-        table_frame = tk.Frame(self.content_frame, bg="white")
+        table_frame = tk.Frame(parent, bg="white")
         table_frame.pack(fill=tk.BOTH, expand=True)
         
         # Scrollbars
@@ -1703,39 +1872,99 @@ class EmployeeManagementSystem:
         scrollbar_y.config(command=self.sick_leave_tree.yview)
         scrollbar_x.config(command=self.sick_leave_tree.xview)
         
+        # Auswertung der letzten 52 Wochen je Mitarbeiter (zwischengespeichert)
+        summary_title = tk.Label(parent, text="Auswertung der letzten 52 Wochen", font=("Arial", 12, "bold"), fg=DARK_COLOR, bg=LIGHT_COLOR)
+        summary_title.pack(anchor=tk.W, pady=(15, 5))
+        
+        summary_frame = tk.Frame(parent, bg="white")
+        summary_frame.pack(fill=tk.X)
+        
+        summary_scrollbar = tk.Scrollbar(summary_frame)
+        summary_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        columns = ("employee", "department", "spells", "days", "bradford", "monday_friday", "certificates", "year_days")
+        self.sick_summary_tree = ttk.Treeview(
+            summary_frame,
+            columns=columns,
+            show="headings",
+            height=8,
+            yscrollcommand=summary_scrollbar.set
+        )
+        
+        self.sick_summary_tree.heading("employee", text="Mitarbeiter")
+        self.sick_summary_tree.heading("department", text="Abteilung")
+        self.sick_summary_tree.heading("spells", text="Fälle")
+        self.sick_summary_tree.heading("days", text="Tage")
+        self.sick_summary_tree.heading("bradford", text="Bradford-Faktor")
+        self.sick_summary_tree.heading("monday_friday", text="Mo/Fr")
+        self.sick_summary_tree.heading("certificates", text="Fehlende Atteste")
+        self.sick_summary_tree.heading("year_days", text="Tage lfd. Jahr")
+        
+        self.sick_summary_tree.column("employee", width=200)
+        self.sick_summary_tree.column("department", width=120)
+        for column in columns[2:]:
+            self.sick_summary_tree.column(column, width=100, anchor=tk.CENTER)
+        
+        # Hervorhebung: hoher Bradford-Faktor, Häufung an Montagen/Freitagen, fehlende Atteste
+        self.sick_summary_tree.tag_configure("review", background="#fdecea")
+        self.sick_summary_tree.tag_configure("pattern", foreground=NEUTRAL_COLOR)
+        
+        self.sick_summary_tree.pack(fill=tk.X)
+        summary_scrollbar.config(command=self.sick_summary_tree.yview)
+        
         # Event-Handler für Filter
         self.sick_year_var.trace_add("write", lambda *args: self.load_sick_leave_data())
         self.sick_month_var.trace_add("write", lambda *args: self.load_sick_leave_data())
         
         # Daten laden
-        self.load_sick_leave_data()
+        self.refresh_sick_leave()
         self.update_status("Krankschreibungen geladen")
+    
+    def refresh_sick_leave(self):
+        self.load_sick_leave_data()
+        self.load_sick_leave_summary()
+    
+    def load_sick_leave_summary(self):
+        # Geänderte Mitarbeiter sofort nachrechnen; der tägliche vollständige Lauf erfolgt im Hintergrund
+        try:
+            sick_analytics.run_analysis(allow_full=False)
+        except Exception as e:
+            logger.error(f"Fehler bei der Auswertung der Krankmeldungen: {e}")
+        
+        self.sick_summary_tree.delete(*self.sick_summary_tree.get_children())
+        for row in sick_analytics.get_summary(self.access):
+            tags = []
+            if row['bradford'] >= sick_analytics.BRADFORD_REVIEW_THRESHOLD or row['certificates_missing']:
+                tags.append("review")
+            if row['pattern']:
+                tags.append("pattern")
+            self.sick_summary_tree.insert(
+                "",
+                tk.END,
+                values=(
+                    f"{row['last_name']}, {row['first_name']}",
+                    row['department'] or "",
+                    row['spells'],
+                    row['sick_days'],
+                    row['bradford'],
+                    f"{row['monday_friday_spells']} von {row['spells']}",
+                    f"{row['certificates_missing']} von {row['certificates_required']}" if row['certificates_required'] else "-",
+                    row['year_days']
+                ),
+                tags=tags
+            )
 
     def load_sick_leave_data(self):
         # Bestehende Einträge löschen
         for item in self.sick_leave_tree.get_children():
             self.sick_leave_tree.delete(item)
         
-        # Verbindung zur Datenbank
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # Ausgewähltes Jahr und Monat
         selected_year = int(self.sick_year_var.get())
         selected_month = list(calendar.month_name).index(self.sick_month_var.get())
         
-        # SQL-Abfrage für Krankmeldungen des ausgewählten Monats
-        cursor.execute("""
-            SELECT s.*, e.first_name, e.last_name
-            FROM sick_leave s
-            JOIN employees e ON s.employee_id = e.id
-            WHERE strftime('%Y', s.start_date) = ?
-            AND strftime('%m', s.start_date) = ?
-            ORDER BY s.start_date DESC
-        """, (str(selected_year), f"{selected_month:02d}"))
-        
-        for row in cursor.fetchall():
+        # Krankmeldungen des ausgewählten Monats
+        for row in services.list_sick_leave(selected_year, selected_month, self.access):
             self.sick_leave_tree.insert(
                 "",
                 tk.END,
@@ -1749,8 +1978,570 @@ class EmployeeManagementSystem:
                     format_date(row['created_at'], format_from="%Y-%m-%d %H:%M:%S", format_to="%d.%m.%Y %H:%M")
                 )
             )
+
+    @timed_view("reports")
+    def show_reports(self):
+        self.show_view("reports")
+    
+    def build_reports(self, parent):
+        # Toolbar mit Jahr und Kennzahl
+        toolbar = tk.Frame(parent, bg=LIGHT_COLOR)
+        toolbar.pack(fill=tk.X, pady=(0, 10))
+        
+        filter_frame = tk.Frame(toolbar, bg=LIGHT_COLOR)
+        filter_frame.pack(side=tk.LEFT)
+        
+        year_label = tk.Label(filter_frame, text="Jahr:", bg=LIGHT_COLOR)
+        year_label.pack(side=tk.LEFT, padx=(0, 5))
+        
+        current_year = datetime.datetime.now().year
+        years = list(range(current_year - 4, current_year + 1))
+        self.report_year_var = tk.StringVar(value=str(current_year))
+        year_menu = ttk.Combobox(filter_frame, textvariable=self.report_year_var, values=years, state="readonly", width=6)
+        year_menu.pack(side=tk.LEFT, padx=(0, 20))
+        
+        metric_label = tk.Label(filter_frame, text="Kennzahl:", bg=LIGHT_COLOR)
+        metric_label.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.report_metrics = {label: metric for metric, label in reports.REPORT_METRICS.items()}
+        self.report_metric_var = tk.StringVar(value=reports.REPORT_METRICS["sick_days"])
+        metric_menu = ttk.Combobox(filter_frame, textvariable=self.report_metric_var, values=list(self.report_metrics), state="readonly", width=18)
+        metric_menu.pack(side=tk.LEFT)
+        
+        # Auswahl wechselt nur die Darstellung; die Fakten liegen bereits vor
+        self.report_year_var.trace_add("write", lambda name, index, mode: self.draw_reports())
+        self.report_metric_var.trace_add("write", lambda name, index, mode: self.draw_reports())
+        
+        button_frame = tk.Frame(toolbar, bg=LIGHT_COLOR)
+        button_frame.pack(side=tk.RIGHT)
+        
+        rebuild_button = tk.Button(
+            button_frame,
+            text="Neu berechnen",
+            bg=THEME_COLOR,
+            fg="white",
+            padx=10,
+            pady=2,
+            relief=tk.FLAT,
+            command=lambda: self.load_reports(full=True)
+        )
+        rebuild_button.pack(side=tk.RIGHT, padx=5)
+        
+        # Diagramme: Monatsverlauf gegenüber Vorjahr und Fünfjahrestrend
+        charts_frame = tk.Frame(parent, bg=LIGHT_COLOR)
+        charts_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.report_axes = {}
+        self.report_canvases = {}
+        for column, (key, title) in enumerate((("yoy", "Vergleich zum Vorjahr"), ("trend", "Entwicklung über fünf Jahre"))):
+            chart_frame = tk.Frame(charts_frame, bg="white", bd=1, relief=tk.SOLID)
+            chart_frame.grid(row=0, column=column, padx=(0, 10) if column == 0 else (10, 0), pady=10, sticky="nsew")
+            
+            chart_title = tk.Label(chart_frame, text=title, font=("Arial", 12, "bold"), bg="white")
+            chart_title.pack(pady=(10, 0))
+            
+            figure = plt.Figure(figsize=(5, 3.5), dpi=100)
+            self.report_axes[key] = figure.add_subplot(111)
+            canvas = FigureCanvasTkAgg(figure, chart_frame)
+            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self.report_canvases[key] = canvas
+        
+        charts_frame.grid_columnconfigure(0, weight=1)
+        charts_frame.grid_columnconfigure(1, weight=1)
+        charts_frame.grid_rowconfigure(0, weight=1)
+        
+        # Kennzahlen je Abteilung für das gewählte Jahr
+        table_frame = tk.Frame(parent, bg="white")
+        table_frame.pack(fill=tk.X)
+        
+        columns = ("department", "headcount", "hires", "exits", "vacation_days", "sick_days", "sick_rate")
+        self.report_tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=8)
+        
+        self.report_tree.heading("department", text="Abteilung")
+        self.report_tree.heading("headcount", text="Ø Mitarbeiter")
+        self.report_tree.heading("hires", text="Eintritte")
+        self.report_tree.heading("exits", text="Austritte")
+        self.report_tree.heading("vacation_days", text="Urlaubstage")
+        self.report_tree.heading("sick_days", text="Krankheitstage")
+        self.report_tree.heading("sick_rate", text="Krankenquote")
+        
+        self.report_tree.column("department", width=200)
+        for column in columns[1:]:
+            self.report_tree.column(column, width=110, anchor=tk.E)
+        
+        self.report_tree.pack(fill=tk.X)
+        
+        self.load_reports()
+    
+    def load_reports(self, full=False):
+        try:
+            reports.refresh_facts(full)
+        except Exception as e:
+            logger.error(f"Fehler beim Aktualisieren der Berichtsfakten: {e}")
+            messagebox.showerror("Fehler", f"Berichtsdaten konnten nicht aktualisiert werden: {e}")
+        self.draw_reports()
+    
+    def draw_reports(self):
+        year = int(self.report_year_var.get())
+        metric = self.report_metrics[self.report_metric_var.get()]
+        label = reports.REPORT_METRICS[metric]
+        
+        current, previous = reports.get_year_over_year(year, metric, self.access)
+        months = [calendar.month_abbr[i] for i in range(1, 13)]
+        ax = self.report_axes["yoy"]
+        ax.clear()
+        ax.plot(months, previous, label=str(year - 1), marker='o', color='#95a5a6')
+        ax.plot(months, current, label=str(year), marker='o', color=THEME_COLOR)
+        ax.set_ylabel(label)
+        ax.legend()
+        self.report_canvases["yoy"].draw_idle()
+        
+        trend = reports.get_yearly_trend(year, metric, access=self.access)
+        ax = self.report_axes["trend"]
+        ax.clear()
+        ax.bar([str(trend_year) for trend_year, _ in trend], [value for _, value in trend], color=THEME_COLOR)
+        ax.set_ylabel(label)
+        self.report_canvases["trend"].draw_idle()
+        
+        self.report_tree.delete(*self.report_tree.get_children())
+        for row in reports.get_department_facts(year, self.access):
+            self.report_tree.insert("", tk.END, values=(
+                row['department'],
+                f"{row['headcount']:.1f}",
+                row['hires'],
+                row['exits'],
+                f"{row['vacation_days']:.1f}",
+                f"{row['sick_days']:.1f}",
+                f"{row['sick_rate']:.2f} %"
+            ))
+        
+        self.update_status(f"Berichte {year}: {label}")
+    
+    @timed_view("settings")
+    def show_settings(self):
+        self.show_view("settings")
+    
+    def build_settings(self, parent):
+        # Formular mit den Werten aus der Konfiguration
+        form_frame = tk.Frame(parent, bg="white", padx=20, pady=20)
+        form_frame.pack(fill=tk.X)
+        form_frame.columnconfigure(1, weight=1)
+        
+        self.settings_vars = {}
+        for row, (key, label, kind, values) in enumerate(SETTINGS_FIELDS):
+            field_label = tk.Label(form_frame, text=label, bg="white", anchor="w")
+            field_label.grid(row=row, column=0, sticky=tk.W, padx=(0, 20), pady=4)
+            
+            if kind == "bool":
+                var = tk.BooleanVar(value=bool(self.config.get(key)))
+                widget = tk.Checkbutton(form_frame, variable=var, bg="white", activebackground="white")
+                widget.grid(row=row, column=1, sticky=tk.W, pady=4)
+            elif values:
+                var = tk.StringVar(value=str(self.config.get(key, values[0])))
+                widget = ttk.Combobox(form_frame, textvariable=var, values=values, state="readonly", width=15)
+                widget.grid(row=row, column=1, sticky=tk.W, pady=4)
+            else:
+                value = self.config.get(key)
+                var = tk.StringVar(value="" if value is None else str(value))
+                widget = tk.Entry(form_frame, textvariable=var, width=50)
+                widget.grid(row=row, column=1, sticky=tk.W, pady=4)
+            self.settings_vars[key] = (var, kind)
+        
+        save_button = tk.Button(
+            form_frame,
+            text="Speichern",
+            bg=THEME_COLOR,
+            fg="white",
+            padx=10,
+            pady=2,
+            relief=tk.FLAT,
+            command=self.save_settings
+        )
+        save_button.grid(row=len(SETTINGS_FIELDS), column=1, sticky=tk.E, pady=(10, 0))
+        
+        # Zustand des Backup-Planers
+        backup_frame = tk.Frame(parent, bg="white", padx=20, pady=10)
+        backup_frame.pack(fill=tk.X, pady=(10, 0))
+        self.backup_status_label = tk.Label(backup_frame, text="", bg="white", anchor="w", justify=tk.LEFT)
+        self.backup_status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        backup_button = tk.Button(backup_frame, text="Jetzt sichern", bg=THEME_COLOR, fg="white", padx=10, pady=2,
+                                  relief=tk.FLAT, command=self.request_backup)
+        backup_button.pack(side=tk.RIGHT)
+        self.refresh_backup_status()
+        
+        self.build_log_viewer(parent)
+        
+        # Diagnosebereich bleibt verborgen, bis er mit Strg+Umschalt+D eingeblendet wird
+        self.diagnostics_frame = tk.Frame(parent, bg=LIGHT_COLOR)
+        self.root.bind("<Control-D>", lambda event: self.toggle_diagnostics())
+        
+        self.update_status("Einstellungen geladen")
+    
+    def request_backup(self):
+        self.backup_scheduler.request_backup()
+        self.update_status("Backup wird erstellt...")
+        self.root.after(BACKUP_STATUS_POLL_MS, self.refresh_backup_status)
+    
+    # Anzeige aktualisieren; während eines Laufs regelmäßig erneut abfragen
+    def refresh_backup_status(self):
+        if not self.widget_alive("backup_status_label"):
+            return
+        state = self.backup_scheduler.status()
+        status = {"ok": "erfolgreich", "busy": "Datenbank gesperrt", "error": "fehlgeschlagen"}.get(state['status'], "-")
+        lines = [f"Letztes Backup: {state['last_success'] or '-'}    Letzter Lauf: {state['last_run'] or '-'} ({status})"]
+        if state['size'] is not None:
+            lines.append(f"Größe: {state['size'] / 1024 / 1024:.1f} MB    Dauer: {state['duration_ms']:.0f} ms")
+        if state['error']:
+            lines.append(f"Fehler: {state['error']}")
+        lines.append("Backup läuft..." if state['running'] or self.backup_scheduler.requested
+                     else f"Nächstes Backup: {state['next_run']}")
+        self.backup_status_label.config(text="\n".join(lines), fg=WARNING_COLOR if state['error'] else DARK_COLOR)
+        if state['running'] or self.backup_scheduler.requested:
+            self.root.after(BACKUP_STATUS_POLL_MS, self.refresh_backup_status)
+    
+    # Protokollanzeige: Filter und Liste der neuesten passenden Einträge
+    def build_log_viewer(self, parent):
+        log_frame = tk.Frame(parent, bg="white", padx=20, pady=10)
+        log_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        
+        filter_frame = tk.Frame(log_frame, bg="white")
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(filter_frame, text="Protokoll", font=("Arial", 11, "bold"), fg=DARK_COLOR, bg="white").pack(side=tk.LEFT, padx=(0, 15))
+        
+        self.log_filter_vars = {
+            "level": tk.StringVar(value="Alle"),
+            "range": tk.StringVar(value="7 Tage"),
+            "event": tk.StringVar(),
+            "user": tk.StringVar(),
+            "employee_id": tk.StringVar(),
+            "text": tk.StringVar()
+        }
+        for label, key, values, width in (
+            ("Stufe:", "level", ("Alle", "INFO", "WARNING", "ERROR"), 9),
+            ("Zeitraum:", "range", tuple(LOG_VIEW_RANGES), 10),
+            ("Ereignis:", "event", None, 14),
+            ("Benutzer:", "user", None, 10),
+            ("Mitarbeiter-ID:", "employee_id", None, 6),
+            ("Text:", "text", None, 16)
+        ):
+            tk.Label(filter_frame, text=label, bg="white").pack(side=tk.LEFT, padx=(5, 2))
+            if values:
+                widget = ttk.Combobox(filter_frame, textvariable=self.log_filter_vars[key], values=values, state="readonly", width=width)
+            else:
+                widget = tk.Entry(filter_frame, textvariable=self.log_filter_vars[key], width=width)
+                widget.bind("<Return>", lambda event: self.search_logs())
+            widget.pack(side=tk.LEFT)
+        
+        self.log_search_button = tk.Button(filter_frame, text="Suchen", bg=THEME_COLOR, fg="white", padx=10, pady=2,
+                                           relief=tk.FLAT, command=self.search_logs)
+        self.log_search_button.pack(side=tk.RIGHT)
+        
+        table_frame = tk.Frame(log_frame, bg="white")
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        scrollbar_y = tk.Scrollbar(table_frame)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        columns = ("ts", "level", "event", "user", "msg")
+        self.log_tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=10, yscrollcommand=scrollbar_y.set)
+        for column, text, width in (
+            ("ts", "Zeit", 160), ("level", "Stufe", 70), ("event", "Ereignis", 160), ("user", "Benutzer", 90), ("msg", "Meldung", 600)
+        ):
+            self.log_tree.heading(column, text=text)
+            self.log_tree.column(column, width=width, anchor=tk.W)
+        self.log_tree.pack(fill=tk.BOTH, expand=True)
+        scrollbar_y.config(command=self.log_tree.yview)
+        
+        self.log_result_label = tk.Label(log_frame, text="", font=("Arial", 9), bg="white", anchor="w")
+        self.log_result_label.pack(fill=tk.X, pady=(5, 0))
+        self.search_logs()
+    
+    # Suche im Hintergrund; komprimierte Protokolle werden nur in den laut Index passenden Blöcken gelesen
+    def search_logs(self):
+        if getattr(self, "log_search_thread", None) is not None:
+            return
+        values = {key: var.get().strip() for key, var in self.log_filter_vars.items()}
+        employee_id = None
+        if values["employee_id"]:
+            try:
+                employee_id = int(values["employee_id"])
+            except ValueError:
+                messagebox.showerror("Fehler", f"Ungültige Mitarbeiter-ID: {values['employee_id']}")
+                return
+        days = LOG_VIEW_RANGES.get(values["range"])
+        since = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat(timespec="milliseconds") if days else None
+        query = logs.LogQuery(
+            level=None if values["level"] == "Alle" else values["level"],
+            event=values["event"] or None,
+            user=values["user"] or None,
+            employee_id=employee_id,
+            text=values["text"] or None,
+            since=since
+        )
+        
+        self.log_search_result = None
+        self.log_search_thread = threading.Thread(target=self.run_log_search, args=(query,), daemon=True)
+        self.log_search_thread.start()
+        self.log_search_button.config(state=tk.DISABLED)
+        self.root.after(WORKER_POLL_INTERVAL_MS, self.check_log_search)
+    
+    def run_log_search(self, query):
+        start = time.perf_counter()
+        try:
+            entries = logs.search(LOG_PATH, query, LOG_VIEW_LIMIT)
+            self.log_search_result = ("ok", entries, (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            logger.error(f"Fehler bei der Protokollsuche: {e}")
+            self.log_search_result = ("error", str(e), 0)
+    
+    def check_log_search(self):
+        if self.log_search_thread.is_alive():
+            self.root.after(WORKER_POLL_INTERVAL_MS, self.check_log_search)
+            return
+        
+        self.log_search_thread = None
+        if not self.widget_alive("log_tree"):
+            return
+        self.log_search_button.config(state=tk.NORMAL)
+        
+        status, result, duration_ms = self.log_search_result
+        self.log_tree.delete(*self.log_tree.get_children())
+        if status == "error":
+            self.log_result_label.config(text=f"Suche fehlgeschlagen: {result}", fg=WARNING_COLOR)
+            return
+        for entry in result:
+            self.log_tree.insert("", tk.END, values=(
+                (entry.get("ts") or "").replace("T", " "), entry.get("level", ""), entry.get("event", ""),
+                entry.get("user") or "", (entry.get("msg") or "").replace("\n", " ")
+            ))
+        suffix = f" (neueste {LOG_VIEW_LIMIT})" if len(result) >= LOG_VIEW_LIMIT else ""
+        self.log_result_label.config(text=f"{len(result)} Einträge{suffix} in {duration_ms:.0f} ms", fg=DARK_COLOR)
+    
+    def save_settings(self):
+        config = dict(self.config)
+        for key, (var, kind) in self.settings_vars.items():
+            value = var.get()
+            if kind == "int":
+                try:
+                    value = int(value)
+                except ValueError:
+                    messagebox.showerror("Fehler", f"Ungültiger Wert für {key}: {value}")
+                    return
+            elif kind == "str":
+                value = value.strip()
+            config[key] = value
+        
+        changed = save_config(config)
+        if not changed:
+            self.update_status("Keine Einstellungen geändert")
+            return
+        logger.info(f"Einstellungen gespeichert von {self.user['username']}: {', '.join(sorted(changed))}")
+        if not any(key.startswith("api_") for key in changed):
+            self.update_status("Einstellungen gespeichert")
+    
+    def toggle_diagnostics(self):
+        if self.current_view != "settings" or not self.widget_alive("diagnostics_frame"):
+            return
+        
+        if self.diagnostics_frame.winfo_manager():
+            self.diagnostics_frame.pack_forget()
+            return
+        
+        if not self.diagnostics_frame.winfo_children():
+            self.build_diagnostics_panel()
+        self.diagnostics_frame.pack(fill=tk.BOTH, expand=True, pady=(20, 0))
+        self.load_query_stats()
+    
+    def build_diagnostics_panel(self):
+        toolbar = tk.Frame(self.diagnostics_frame, bg=LIGHT_COLOR)
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+        
+        self.diagnostics_label = tk.Label(toolbar, text="Abfragestatistik", font=("Arial", 11, "bold"), fg=DARK_COLOR, bg=LIGHT_COLOR)
+        self.diagnostics_label.pack(side=tk.LEFT)
+        
+        for text, command in (
+            ("Als JSON speichern", self.dump_query_stats),
+            ("Zurücksetzen", self.reset_query_stats),
+            ("Aktualisieren", self.load_query_stats)
+        ):
+            button = tk.Button(toolbar, text=text, bg=DARK_COLOR, fg="white", padx=10, pady=2, relief=tk.FLAT, command=command)
+            button.pack(side=tk.RIGHT, padx=5)
+        
+        table_frame = tk.Frame(self.diagnostics_frame, bg="white")
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar_y = tk.Scrollbar(table_frame)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        columns = ("count", "total", "mean", "p95", "max", "slow", "sql")
+        self.query_stats_tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=10, yscrollcommand=scrollbar_y.set)
+        
+        for column, text, width in (
+            ("count", "Anzahl", 70), ("total", "Gesamt (ms)", 90), ("mean", "Mittel (ms)", 90),
+            ("p95", "p95 (ms)", 80), ("max", "Max (ms)", 80), ("slow", "Langsam", 70), ("sql", "Abfrage", 600)
+        ):
+            self.query_stats_tree.heading(column, text=text)
+            self.query_stats_tree.column(column, width=width, anchor=tk.W if column == "sql" else tk.E)
+        
+        self.query_stats_tree.pack(fill=tk.BOTH, expand=True)
+        scrollbar_y.config(command=self.query_stats_tree.yview)
+        
+        # Zwischengespeicherte Ansichten mit geschätztem Speicherbedarf
+        self.view_cache_label = tk.Label(self.diagnostics_frame, text="", font=("Arial", 9), justify=tk.LEFT, anchor="w", bg=LIGHT_COLOR)
+        self.view_cache_label.pack(fill=tk.X, pady=(5, 0))
+        
+        # Ausführungsplan der ausgewählten Abfrage (nur für langsame Abfragen ermittelt)
+        self.query_plan_label = tk.Label(self.diagnostics_frame, text="", font=("Courier", 9), justify=tk.LEFT, anchor="w", bg=LIGHT_COLOR)
+        self.query_plan_label.pack(fill=tk.X, pady=(5, 0))
+        self.query_stats_tree.bind("<<TreeviewSelect>>", self.show_query_plan)
+    
+    def load_query_stats(self):
+        self.query_stats_tree.delete(*self.query_stats_tree.get_children())
+        self.query_stats_entries = {}
+        
+        snapshot = query_stats.snapshot()
+        for index, entry in enumerate(snapshot["queries"]):
+            iid = str(index)
+            self.query_stats_entries[iid] = entry
+            self.query_stats_tree.insert(
+                "",
+                tk.END,
+                iid=iid,
+                values=(
+                    entry["count"],
+                    f"{entry['total_ms']:.1f}",
+                    f"{entry['mean_ms']:.2f}",
+                    f"{entry['p95_ms']:g}",
+                    f"{entry['max_ms']:.1f}",
+                    entry["slow"],
+                    entry["sql"]
+                )
+            )
+        
+        self.diagnostics_label.config(
+            text=f"Abfragestatistik seit {format_date(snapshot['started_at'], format_from='%Y-%m-%dT%H:%M:%S', format_to='%d.%m.%Y %H:%M')} "
+                 f"(langsam ab {snapshot['slow_query_ms']} ms)"
+        )
+        
+        views = ", ".join(
+            f"{entry['view']}: {entry['widgets']} Widgets, {entry['rows']} Zeilen, {entry['uses']}× genutzt"
+            + (" (veraltet)" if entry["stale"] else "")
+            for entry in self.view_cache_report()
+        )
+        self.view_cache_label.config(text=f"Ansichten im Speicher – {views}")
+    
+    def show_query_plan(self, event):
+        selected_item = self.query_stats_tree.selection()
+        if not selected_item:
+            return
+        
+        entry = self.query_stats_entries.get(selected_item[0], {})
+        self.query_plan_label.config(text=entry.get("plan", "Kein Ausführungsplan (Abfrage war nicht langsam)"))
+    
+    def reset_query_stats(self):
+        query_stats.reset()
+        self.load_query_stats()
+    
+    def dump_query_stats(self):
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = filedialog.asksaveasfilename(
+            initialdir=EXPORT_PATH,
+            initialfile=f"abfragestatistik_{timestamp}.json",
+            defaultextension=".json",
+            filetypes=[("JSON-Dateien", "*.json")]
+        )
+        if not filepath:
+            return
+        
+        query_stats.dump(filepath)
+        self.update_status(f"Abfragestatistik gespeichert: {os.path.basename(filepath)}")
+
+# Änderungsverlauf eines Mitarbeiters aus dem Audit-Log
+class AuditHistoryDialog:
+    PAGE_SIZE = 200
+    
+    def __init__(self, parent, employee_id, employee_name):
+        self.employee_id = employee_id
+        self.oldest_id = None
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"Änderungsverlauf - {employee_name}")
+        self.window.geometry("900x500")
+        self.window.configure(bg=LIGHT_COLOR)
+        self.window.transient(parent)
+        
+        table_frame = tk.Frame(self.window, bg="white")
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        
+        scrollbar_y = tk.Scrollbar(table_frame)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        columns = ("changed_at", "changed_by", "area", "operation", "changes")
+        self.history_tree = ttk.Treeview(table_frame, columns=columns, show="headings", yscrollcommand=scrollbar_y.set)
+        
+        self.history_tree.heading("changed_at", text="Zeitpunkt")
+        self.history_tree.heading("changed_by", text="Benutzer")
+        self.history_tree.heading("area", text="Bereich")
+        self.history_tree.heading("operation", text="Aktion")
+        self.history_tree.heading("changes", text="Änderungen")
+        
+        self.history_tree.column("changed_at", width=130, anchor=tk.CENTER)
+        self.history_tree.column("changed_by", width=100)
+        self.history_tree.column("area", width=100)
+        self.history_tree.column("operation", width=80, anchor=tk.CENTER)
+        self.history_tree.column("changes", width=470)
+        
+        self.history_tree.pack(fill=tk.BOTH, expand=True)
+        scrollbar_y.config(command=self.history_tree.yview)
+        
+        button_frame = tk.Frame(self.window, bg=LIGHT_COLOR)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        self.more_button = tk.Button(
+            button_frame,
+            text="Ältere Einträge laden",
+            bg=DARK_COLOR,
+            fg="white",
+            padx=10,
+            pady=2,
+            relief=tk.FLAT,
+            command=self.load_history
+        )
+        self.more_button.pack(side=tk.LEFT)
+        
+        close_button = tk.Button(
+            button_frame,
+            text="Schließen",
+            bg=THEME_COLOR,
+            fg="white",
+            padx=10,
+            pady=2,
+            relief=tk.FLAT,
+            command=self.window.destroy
+        )
+        close_button.pack(side=tk.RIGHT)
+        
+        self.load_history()
+    
+    def load_history(self):
+        # Seitenweise über den Index (employee_id, id) nachladen
+        rows = audit.get_employee_history(self.employee_id, self.PAGE_SIZE, self.oldest_id)
+        
+        for row in rows:
+            self.history_tree.insert(
+                "",
+                tk.END,
+                values=(
+                    format_date(row['changed_at'], format_from="%Y-%m-%d %H:%M:%S", format_to="%d.%m.%Y %H:%M"),
+                    row['changed_by'] or "-",
+                    f"{audit.TABLE_LABELS.get(row['table_name'], row['table_name'])} #{row['row_id']}",
+                    audit.OPERATION_LABELS.get(row['operation'], row['operation']),
+                    audit.describe_changes(row['operation'], row['changes'])
+                )
+            )
+            self.oldest_id = row['id']
         
-        conn.close()
+        if len(rows) < self.PAGE_SIZE:
+            self.more_button.config(state=tk.DISABLED)
 
 if __name__ == "__main__":
     # Logger initialisieren
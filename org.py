@@ -0,0 +1,189 @@
+import sqlite3
+from core import HIERARCHIES, get_connection, rebuild_closure, retry_on_busy, logger
+import rbac
+
+# Abfragen auf den Hierarchien (Abteilungen und Berichtslinien) über die Closure-Tabellen
+
+# Unterabteilungen einer Abteilung (ohne parent_id: oberste Ebene) mit Kopfzahl des ganzen Teilbaums
+def get_department_children(parent_id=None, access=None):
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+
+    sql = """
+        SELECT d.id, d.name, d.description,
+               (SELECT COUNT(*)
+                FROM department_closure c
+                JOIN employees e ON e.department_id = c.descendant_id
+                WHERE c.ancestor_id = d.id AND e.status = 'Aktiv') AS headcount,
+               EXISTS (SELECT 1 FROM departments child WHERE child.parent_id = d.id)
+               OR EXISTS (SELECT 1 FROM employees e WHERE e.department_id = d.id) AS has_children
+        FROM departments d
+    """
+    if parent_id is None and access is not None and not access.all_departments:
+        # Eingeschränkte Benutzer sehen ihre obersten zugewiesenen Abteilungen als Wurzeln
+        ids = sorted(access.department_ids)
+        placeholders = ", ".join("?" for _ in ids) or "NULL"
+        sql += f" WHERE d.id IN ({placeholders}) AND (d.parent_id IS NULL OR d.parent_id NOT IN ({placeholders}))"
+        params = ids + ids
+    else:
+        sql += " WHERE d.parent_id IS ?"
+        params = [parent_id]
+    sql += " ORDER BY d.name"
+
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+_EMPLOYEE_NODE_COLUMNS = """
+    e.id, e.employee_id, e.first_name, e.last_name, e.position, e.department_id, e.status,
+    (SELECT COUNT(*) FROM employees r WHERE r.manager_id = e.id) AS direct_reports
+"""
+
+# Mitarbeiter, die direkt einer Abteilung zugeordnet sind
+def get_department_employees(department_id):
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {_EMPLOYEE_NODE_COLUMNS}
+        FROM employees e
+        WHERE e.department_id = ?
+        ORDER BY e.last_name, e.first_name
+    """, (department_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Direkt unterstellte Mitarbeiter einer Führungskraft
+def get_direct_reports(manager_id, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {_EMPLOYEE_NODE_COLUMNS}
+        FROM employees e
+        WHERE e.manager_id = ?{scope}
+        ORDER BY e.last_name, e.first_name
+    """, [manager_id] + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Alle Mitarbeiter unterhalb einer Führungskraft (alle Ebenen) mit ihrem Abstand in der Berichtslinie
+def get_employees_under_manager(manager_id, max_depth=None, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+
+    sql = f"""
+        SELECT e.id, e.employee_id, e.first_name, e.last_name, e.position, d.name AS department, e.status, c.depth
+        FROM employee_closure c
+        JOIN employees e ON e.id = c.descendant_id
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE c.ancestor_id = ? AND c.depth > 0{scope}
+    """
+    params = [manager_id] + params
+    if max_depth is not None:
+        sql += " AND c.depth <= ?"
+        params.append(max_depth)
+    sql += " ORDER BY c.depth, e.last_name, e.first_name"
+
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Aktive Mitarbeiter je Abteilung einschließlich aller Unterabteilungen
+def get_headcount_by_subtree():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT d.name, COUNT(e.id)
+        FROM departments d
+        JOIN department_closure c ON c.ancestor_id = d.id
+        LEFT JOIN employees e ON e.department_id = c.descendant_id AND e.status = 'Aktiv'
+        GROUP BY d.id
+        ORDER BY d.name
+    """)
+    headcount = dict(cursor.fetchall())
+    conn.close()
+    return headcount
+
+# Abteilung unter eine andere hängen (ohne parent_name: oberste Ebene)
+@retry_on_busy
+def set_department_parent(department_name, parent_name=None):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        parent_id = None
+        if parent_name:
+            cursor.execute("SELECT id FROM departments WHERE name = ?", (parent_name,))
+            parent = cursor.fetchone()
+            if parent is None:
+                raise ValueError(f"Unbekannte Abteilung: {parent_name}")
+            parent_id = parent[0]
+
+        try:
+            cursor.execute("UPDATE departments SET parent_id = ?, updated_at = strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime') WHERE name = ?",
+                           (parent_id, department_name))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"{department_name} kann nicht unter {parent_name} gehängt werden (Zirkelbezug)")
+        if cursor.rowcount == 0:
+            raise ValueError(f"Unbekannte Abteilung: {department_name}")
+        conn.commit()
+
+        logger.info(f"Abteilung {department_name} untergeordnet: {parent_name or '-'}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# Vorgesetzten eines Mitarbeiters festlegen (Personalnummern; ohne manager: keiner)
+@retry_on_busy
+def set_employee_manager(employee_number, manager_number=None):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        manager_id = None
+        if manager_number:
+            cursor.execute("SELECT id FROM employees WHERE employee_id = ?", (manager_number,))
+            manager = cursor.fetchone()
+            if manager is None:
+                raise ValueError(f"Unbekannte Personalnummer: {manager_number}")
+            manager_id = manager[0]
+
+        try:
+            cursor.execute("UPDATE employees SET manager_id = ?, version = version + 1 WHERE employee_id = ?",
+                           (manager_id, employee_number))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"{manager_number} kann nicht Vorgesetzter von {employee_number} sein (Zirkelbezug)")
+        if cursor.rowcount == 0:
+            raise ValueError(f"Unbekannte Personalnummer: {employee_number}")
+        conn.commit()
+
+        logger.info(f"Vorgesetzter von {employee_number} festgelegt: {manager_number or '-'}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# Beide Closure-Tabellen aus den Elternspalten neu aufbauen
+def rebuild_hierarchies():
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        for table, (parent_column, closure_table) in HIERARCHIES.items():
+            rebuild_closure(cursor, table, parent_column, closure_table)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logger.info("Hierarchien neu aufgebaut")
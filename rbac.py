@@ -0,0 +1,128 @@
+from core import PERMISSIONS, get_connection, retry_on_busy, logger
+
+class PermissionDeniedError(Exception):
+    def __init__(self, permission):
+        super().__init__(f"Keine Berechtigung: {PERMISSIONS.get(permission, permission)}")
+        self.permission = permission
+
+# Bei der Anmeldung einmal berechnete Rechte eines Benutzers; Prüfungen sind reine Mengenzugriffe
+class Access:
+    def __init__(self, user_id, role, permissions, all_departments, department_ids=()):
+        self.user_id = user_id
+        self.role = role
+        self.permissions = frozenset(permissions)
+        self.all_departments = all_departments
+        self.department_ids = frozenset(department_ids)
+
+    def can(self, permission):
+        return permission in self.permissions
+
+    def require(self, permission):
+        if permission not in self.permissions:
+            raise PermissionDeniedError(permission)
+
+    def covers(self, department_id):
+        return self.all_departments or department_id in self.department_ids
+
+# Rechte und Abteilungen eines Benutzers laden
+def load_access(user_id, role):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT r.all_departments, rp.permission
+        FROM roles r
+        LEFT JOIN role_permissions rp ON rp.role_id = r.id
+        WHERE r.name = ?
+    """, (role,))
+    rows = cursor.fetchall()
+
+    # Zugewiesene Abteilungen einschließlich aller Unterabteilungen
+    cursor.execute("""
+        SELECT DISTINCT c.descendant_id
+        FROM user_departments ud
+        JOIN department_closure c ON c.ancestor_id = ud.department_id
+        WHERE ud.user_id = ?
+    """, (user_id,))
+    department_ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+
+    if not rows:
+        logger.warning(f"Unbekannte Rolle {role} für Benutzer {user_id}: keine Berechtigungen")
+        return Access(user_id, role, (), False)
+
+    return Access(
+        user_id,
+        role,
+        [permission for _, permission in rows if permission],
+        bool(rows[0][0]),
+        department_ids
+    )
+
+# SQL-Bedingung, die eine Abfrage auf die Abteilungen des Benutzers (mit Unterabteilungen) beschränkt;
+# ohne Access oder mit Zugriff auf alle Abteilungen entfällt sie
+def department_scope(access, column="e.department_id"):
+    if access is None or access.all_departments:
+        return "", []
+    return (
+        f""" AND {column} IN (
+            SELECT c.descendant_id FROM user_departments ud
+            JOIN department_closure c ON c.ancestor_id = ud.department_id
+            WHERE ud.user_id = ?)""",
+        [access.user_id]
+    )
+
+# Rolle eines Benutzers ändern (wirkt ab der nächsten Anmeldung)
+@retry_on_busy
+def set_user_role(username, role):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT 1 FROM roles WHERE name = ?", (role,))
+        if cursor.fetchone() is None:
+            raise ValueError(f"Unbekannte Rolle: {role}")
+
+        cursor.execute("UPDATE users SET role = ? WHERE username = ?", (role, username))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Unbekannter Benutzer: {username}")
+        conn.commit()
+
+        logger.info(f"Rolle von {username} geändert: {role}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# Abteilungen festlegen, auf die ein Benutzer ohne Zugriff auf alle Abteilungen beschränkt ist
+@retry_on_busy
+def set_user_departments(username, department_names):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+        if user is None:
+            raise ValueError(f"Unbekannter Benutzer: {username}")
+
+        department_ids = []
+        for name in department_names:
+            cursor.execute("SELECT id FROM departments WHERE name = ?", (name,))
+            department = cursor.fetchone()
+            if department is None:
+                raise ValueError(f"Unbekannte Abteilung: {name}")
+            department_ids.append(department[0])
+
+        cursor.execute("DELETE FROM user_departments WHERE user_id = ?", (user[0],))
+        cursor.executemany("INSERT INTO user_departments (user_id, department_id) VALUES (?, ?)",
+                           [(user[0], department_id) for department_id in department_ids])
+        conn.commit()
+
+        logger.info(f"Abteilungen von {username} festgelegt: {', '.join(department_names) or '-'}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
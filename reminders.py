@@ -0,0 +1,239 @@
+import datetime
+import os
+import smtplib
+import sqlite3
+import uuid
+from email.message import EmailMessage
+from core import (
+    APP_NAME, APPDATA_DIR, REMINDER_PENDING_DAYS, REMINDER_EVENT_DAYS, get_connection, retry_on_busy,
+    load_config, format_date, logger
+)
+from scheduler import Scheduler
+
+# Verzeichnis des Datei-Postausgangs (eine .eml-Datei je Nachricht)
+OUTBOX_PATH = os.path.join(APPDATA_DIR, 'outbox')
+
+# Prüfabstände der Erinnerungen in Sekunden: offene Anträge und anstehende Ereignisse
+REMINDER_PENDING_INTERVAL_SECONDS = 15 * 60
+REMINDER_EVENT_INTERVAL_SECONDS = 6 * 60 * 60
+
+# Versandte Erinnerungen werden so lange aufbewahrt (Geburtstage und Jubiläen wiederholen sich jährlich)
+REMINDER_RETENTION_DAYS = 400
+
+# Postausgang, der Nachrichten nur protokolliert (Standard)
+class LogOutbox:
+    def send(self, recipient, subject, body):
+        logger.info(f"Erinnerung an {recipient}: {subject}\n{body}")
+
+# Postausgang als Verzeichnis: jede Nachricht als .eml-Datei (erst vollständig geschrieben, dann umbenannt)
+class FileOutbox:
+    def __init__(self, directory=OUTBOX_PATH, sender=None):
+        self.directory = directory
+        self.sender = sender
+
+    def send(self, recipient, subject, body):
+        os.makedirs(self.directory, exist_ok=True)
+        message = _message(self.sender, recipient, subject, body)
+        filepath = os.path.join(self.directory, f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.eml")
+        with open(f"{filepath}.tmp", "wb") as f:
+            f.write(message.as_bytes())
+        os.replace(f"{filepath}.tmp", filepath)
+
+# Versand über SMTP, z. B. an einen lokalen Test-Server ("python -m aiosmtpd -n -l localhost:1025")
+class SmtpOutbox:
+    def __init__(self, host="localhost", port=1025, sender=None):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send(self, recipient, subject, body):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            smtp.send_message(_message(self.sender, recipient, subject, body))
+
+def _message(sender, recipient, subject, body):
+    message = EmailMessage()
+    message["From"] = sender or f"{APP_NAME.lower()}@localhost"
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+# Postausgänge nach Namen (Konfiguration: reminder_outbox); weitere über register_outbox
+OUTBOXES = {
+    "log": lambda config: LogOutbox(),
+    "file": lambda config: FileOutbox(sender=config.get("company_email")),
+    "smtp": lambda config: SmtpOutbox(config.get("smtp_host", "localhost"), config.get("smtp_port", 1025),
+                                      config.get("company_email"))
+}
+
+def register_outbox(name, factory):
+    OUTBOXES[name] = factory
+
+def get_outbox(name=None, config=None):
+    config = config or load_config()
+    name = name or config.get("reminder_outbox", "log")
+    if name not in OUTBOXES:
+        raise ValueError(f"Unbekannter Postausgang: {name}")
+    return OUTBOXES[name](config)
+
+# Offene Urlaubsanträge, die seit days Tagen warten und in dieser Zeit keine Erinnerung hatten
+# (Teilindex idx_vacation_pending); Empfänger ist der Vorgesetzte, sonst die allgemeine Adresse
+def _due_pending(cursor, today, days):
+    cutoff = (today - datetime.timedelta(days=days)).isoformat()
+    cursor.execute("""
+        SELECT 'vacation_pending' AS kind, v.id AS ref_id, v.start_date, v.end_date, v.days, v.created_at,
+               e.first_name, e.last_name, m.email AS recipient
+        FROM vacation v INDEXED BY idx_vacation_pending
+        JOIN employees e ON e.id = v.employee_id
+        LEFT JOIN employees m ON m.id = e.manager_id
+        WHERE v.status = 'Beantragt' AND v.created_at < date(?, '+1 day')
+          AND NOT EXISTS (
+              SELECT 1 FROM reminders_sent r
+              WHERE r.kind = 'vacation_pending' AND r.ref_id = v.id AND r.due_date > ?
+          )
+    """, (cutoff, cutoff))
+    return cursor.fetchall()
+
+# Tage (MM-TT) der nächsten days Tage; ein 29. Februar fällt in Nicht-Schaltjahren auf den 28.
+def _event_days(today, days):
+    result = {}
+    for offset in range(days + 1):
+        day = today + datetime.timedelta(days=offset)
+        result[day.strftime("%m-%d")] = day
+        if day.month == 2 and day.day == 28 and (day + datetime.timedelta(days=1)).month == 3:
+            result["02-29"] = day
+    return result
+
+# Geburtstage und runde Jubiläen (alle 5 Jahre) aktiver Mitarbeiter in den nächsten days Tagen
+# (Ausdrucksindizes auf MM-TT); je Mitarbeiter und Termin nur eine Erinnerung
+def _due_events(cursor, today, days):
+    event_days = _event_days(today, days)
+    placeholders = ", ".join("?" * len(event_days))
+    due = []
+    for kind, column in (("birthday", "birth_date"), ("anniversary", "hire_date")):
+        cursor.execute(f"""
+            SELECT e.id, e.first_name, e.last_name, e.{column}
+            FROM employees e
+            WHERE e.status = 'Aktiv' AND substr(e.{column}, 6, 5) IN ({placeholders})
+        """, list(event_days))
+        for row in cursor.fetchall():
+            day = event_days[row[3][5:10]]
+            years = day.year - int(row[3][:4])
+            if kind == "anniversary" and (years <= 0 or years % 5):
+                continue
+            due.append({"kind": kind, "ref_id": row[0], "due_date": day.isoformat(), "first_name": row[1],
+                        "last_name": row[2], "years": years})
+
+    if due:
+        cursor.execute("""
+            SELECT kind, ref_id, due_date FROM reminders_sent
+            WHERE kind IN ('birthday', 'anniversary') AND due_date BETWEEN ? AND ?
+        """, (today.isoformat(), (today + datetime.timedelta(days=days)).isoformat()))
+        sent = {tuple(row) for row in cursor.fetchall()}
+        due = [item for item in due if (item["kind"], item["ref_id"], item["due_date"]) not in sent]
+    return due
+
+def _pending_message(items):
+    subject = (f"{len(items)} Urlaubsanträge warten auf Genehmigung" if len(items) > 1
+               else "Ein Urlaubsantrag wartet auf Genehmigung")
+    lines = [f"- {item['first_name']} {item['last_name']}: {format_date(item['start_date'])} bis "
+             f"{format_date(item['end_date'])} ({item['days']} Tage), beantragt am {format_date(item['created_at'][:10])}"
+             for item in items]
+    return subject, "Folgende Urlaubsanträge sind noch offen:\n\n" + "\n".join(lines)
+
+def _event_message(items):
+    lines = []
+    for item in sorted(items, key=lambda item: item["due_date"]):
+        day = datetime.date.fromisoformat(item["due_date"]).strftime("%d.%m.%Y")
+        if item["kind"] == "birthday":
+            lines.append(f"- {day}: Geburtstag von {item['first_name']} {item['last_name']}")
+        else:
+            lines.append(f"- {day}: {item['years']}-jähriges Jubiläum von {item['first_name']} {item['last_name']}")
+    return f"Anstehende Ereignisse ({len(items)})", "In den nächsten Tagen stehen an:\n\n" + "\n".join(lines)
+
+# Fällige Einträge in einer Schreibtransaktion als versandt vormerken, damit parallel laufende Planer
+# (mehrere Clients, CLI) nicht doppelt erinnern; schlägt der Versand fehl, wird die Vormerkung gelöscht
+@retry_on_busy
+def _claim(find, today, days, default_recipient):
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        items = [dict(item) for item in find(cursor, today, days)]
+        sent_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for item in items:
+            item["recipient"] = item.get("recipient") or default_recipient
+            item.setdefault("due_date", today.isoformat())
+        cursor.executemany("""
+            INSERT OR IGNORE INTO reminders_sent (kind, ref_id, due_date, recipient, sent_at)
+            VALUES (:kind, :ref_id, :due_date, :recipient, :sent_at)
+        """, [dict(item, sent_at=sent_at) for item in items])
+        cursor.execute("DELETE FROM reminders_sent WHERE sent_at < date(?, ?)",
+                       (today.isoformat(), f"-{REMINDER_RETENTION_DAYS} days"))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return items
+
+def _release(items):
+    conn = get_connection()
+    try:
+        conn.executemany("DELETE FROM reminders_sent WHERE kind = ? AND ref_id = ? AND due_date = ?",
+                         [(item["kind"], item["ref_id"], item["due_date"]) for item in items])
+        conn.commit()
+    finally:
+        conn.close()
+
+# Je Empfänger eine Sammelnachricht; gibt die Anzahl versandter Einträge zurück
+def _dispatch(items, build_message, outbox):
+    by_recipient = {}
+    for item in items:
+        by_recipient.setdefault(item["recipient"], []).append(item)
+
+    sent = 0
+    for recipient, recipient_items in by_recipient.items():
+        subject, body = build_message(recipient_items)
+        try:
+            outbox.send(recipient, subject, body)
+            sent += len(recipient_items)
+        except Exception as e:
+            logger.error(f"Erinnerung an {recipient} nicht versandt: {e}")
+            _release(recipient_items)
+    return sent
+
+def _recipient(config):
+    return config.get("reminder_recipient") or config.get("company_email") or "personal@localhost"
+
+def send_pending_reminders(outbox=None, today=None, config=None):
+    config = config or load_config()
+    outbox = outbox or get_outbox(config=config)
+    items = _claim(_due_pending, today or datetime.date.today(),
+                   config.get("reminder_pending_days", REMINDER_PENDING_DAYS), _recipient(config))
+    sent = _dispatch(items, _pending_message, outbox)
+    if items:
+        logger.info(f"Erinnerungen an offene Urlaubsanträge: {sent} von {len(items)} versandt")
+    return sent
+
+def send_event_reminders(outbox=None, today=None, config=None):
+    config = config or load_config()
+    outbox = outbox or get_outbox(config=config)
+    items = _claim(_due_events, today or datetime.date.today(),
+                   config.get("reminder_event_days", REMINDER_EVENT_DAYS), _recipient(config))
+    sent = _dispatch(items, _event_message, outbox)
+    if items:
+        logger.info(f"Erinnerungen an Geburtstage und Jubiläen: {sent} von {len(items)} versandt")
+    return sent
+
+# Planer mit beiden Erinnerungen; root=None für den Betrieb ohne Oberfläche
+def build_scheduler(root=None, outbox=None, config=None):
+    config = config or load_config()
+    outbox = outbox or get_outbox(config=config)
+    scheduler = Scheduler(root)
+    scheduler.every("reminders.pending", REMINDER_PENDING_INTERVAL_SECONDS,
+                    lambda: send_pending_reminders(outbox, config=config))
+    scheduler.every("reminders.events", REMINDER_EVENT_INTERVAL_SECONDS,
+                    lambda: send_event_reminders(outbox, config=config))
+    return scheduler
@@ -0,0 +1,259 @@
+import datetime
+import sqlite3
+import time
+from core import get_connection, retry_on_busy, logger
+import rbac
+
+# Kennzahlen der Berichtsansicht: Spalte der Faktentabelle -> Bezeichnung
+REPORT_METRICS = {
+    "sick_days": "Krankheitstage",
+    "vacation_days": "Urlaubstage",
+    "sick_rate": "Krankenquote (%)",
+    "headcount": "Mitarbeiter",
+    "hires": "Eintritte",
+    "exits": "Austritte"
+}
+
+# Anteil eines Abwesenheitszeitraums, der auf den Monat m entfällt (nach Kalendertagen)
+_LEAVE_DAYS = """
+    a.days * (julianday(MIN(a.end_date, m.last_day)) - julianday(MAX(a.start_date, m.first_day)) + 1)
+    / (julianday(a.end_date) - julianday(a.start_date) + 1)
+"""
+
+# Abwesenheitstabellen: Spalte der Faktentabelle, Tabelle, zusätzliche Bedingung
+_LEAVE_SOURCES = (
+    ("vacation_days", "vacation", " AND a.status = 'Genehmigt'"),
+    ("sick_days", "sick_leave", "")
+)
+
+# Tabellen, deren archivierte Zeilen über report_archived_leave in die Berichte eingehen
+ARCHIVED_LEAVE_TABLES = tuple(source[1] for source in _LEAVE_SOURCES)
+
+# Personalbestand, Eintritte und Austritte aller Monate aus der Mitarbeitertabelle: Eintritte und
+# Austritte je Monat gruppieren, Bestand als laufende Summe (Fensterfunktion) je Abteilung
+def _refresh_staffing(cursor):
+    cursor.execute("SELECT MIN(month) FROM report_months")
+    first_month = cursor.fetchone()[0]
+
+    cursor.execute("UPDATE report_facts SET headcount = 0, hires = 0, exits = 0")
+    cursor.execute("""
+        WITH hires AS (
+            SELECT MAX(COALESCE(substr(COALESCE(hire_date, created_at), 1, 7), :first), :first) AS month,
+                   COALESCE(department_id, 0) AS department_id, COUNT(*) AS n
+            FROM employees
+            GROUP BY 1, 2
+        ), exits AS (
+            SELECT MAX(COALESCE(substr(COALESCE(exit_date, updated_at), 1, 7), :first), :first) AS month,
+                   COALESCE(department_id, 0) AS department_id, COUNT(*) AS n
+            FROM employees
+            WHERE status != 'Aktiv'
+            GROUP BY 1, 2
+        ), used AS (
+            SELECT department_id FROM hires UNION SELECT department_id FROM exits
+        )
+        INSERT INTO report_facts (month, department_id, headcount, hires, exits)
+        SELECT m.month, u.department_id,
+               SUM(COALESCE(h.n, 0) - COALESCE(x.n, 0)) OVER (PARTITION BY u.department_id ORDER BY m.month),
+               COALESCE(h.n, 0), COALESCE(x.n, 0)
+        FROM report_months m
+        CROSS JOIN used u
+        LEFT JOIN hires h ON h.month = m.month AND h.department_id = u.department_id
+        LEFT JOIN exits x ON x.month = m.month AND x.department_id = u.department_id
+        WHERE 1
+        ON CONFLICT (month, department_id) DO UPDATE
+        SET headcount = excluded.headcount, hires = excluded.hires, exits = excluded.exits
+    """, {"first": first_month})
+
+# Anteil der Zeiträume eines Jahres (nach Ende) an den Monaten festhalten, bevor sie aus der Haupttabelle
+# archiviert oder gelöscht werden; _refresh_leave rechnet ihn bei jeder Aktualisierung wieder hinzu
+def record_archived_leave(cursor, table, year):
+    column, _, condition = next(source for source in _LEAVE_SOURCES if source[1] == table)
+    cursor.execute(f"""
+        INSERT INTO report_archived_leave (year, month, department_id, {column})
+        SELECT :year, m.month, COALESCE(e.department_id, 0), SUM({_LEAVE_DAYS})
+        FROM {table} a INDEXED BY idx_{table}_end_date
+        CROSS JOIN report_months m
+        JOIN employees e ON e.id = a.employee_id
+        WHERE a.end_date BETWEEN :first AND :last
+          AND m.month BETWEEN substr(a.start_date, 1, 7) AND substr(a.end_date, 1, 7)
+          AND a.end_date >= a.start_date{condition}
+        GROUP BY m.month, COALESCE(e.department_id, 0)
+        ON CONFLICT (year, month, department_id) DO UPDATE SET {column} = {column} + excluded.{column}
+    """, {"year": year, "first": f"{year}-01-01", "last": f"{year}-12-31"})
+
+# Beim Zurückholen eines Archivs zählen die Zeiträume wieder über die Haupttabelle
+def forget_archived_leave(cursor, table, year):
+    column = next(source[0] for source in _LEAVE_SOURCES if source[1] == table)
+    cursor.execute(f"UPDATE report_archived_leave SET {column} = 0 WHERE year = ?", (year,))
+
+# Urlaubs- und Krankheitstage der markierten (bzw. aller) Monate neu verteilen
+def _refresh_leave(cursor, full):
+    if full:
+        cursor.execute("UPDATE report_facts SET vacation_days = 0, sick_days = 0")
+    else:
+        cursor.execute("""
+            UPDATE report_facts SET vacation_days = 0, sick_days = 0
+            WHERE month IN (SELECT month FROM report_dirty WHERE kind = 'leave')
+        """)
+
+    for column, table, condition in _LEAVE_SOURCES:
+        if full:
+            # Jeden Zeitraum einmal lesen und über den Kalender auf seine Monate verteilen
+            source = f"""
+                FROM {table} a
+                CROSS JOIN report_months m
+                JOIN employees e ON e.id = a.employee_id
+                WHERE m.month BETWEEN substr(a.start_date, 1, 7) AND substr(a.end_date, 1, 7)"""
+        else:
+            # Je markiertem Monat nur die Zeiträume, die ihn berühren (Index auf end_date)
+            source = f"""
+                FROM report_dirty dm
+                CROSS JOIN report_months m
+                CROSS JOIN {table} a
+                JOIN employees e ON e.id = a.employee_id
+                WHERE dm.kind = 'leave' AND m.month = dm.month
+                  AND a.end_date >= m.first_day AND a.start_date <= m.last_day"""
+
+        cursor.execute(f"""
+            INSERT INTO report_facts (month, department_id, {column})
+            SELECT m.month, COALESCE(e.department_id, 0), SUM({_LEAVE_DAYS})
+            {source} AND a.end_date >= a.start_date{condition}
+            GROUP BY m.month, COALESCE(e.department_id, 0)
+            ON CONFLICT (month, department_id) DO UPDATE SET {column} = excluded.{column}
+        """)
+
+    # Archivierte und gelöschte Jahre aus ihren festgehaltenen Anteilen
+    months = "" if full else "WHERE month IN (SELECT month FROM report_dirty WHERE kind = 'leave')"
+    cursor.execute(f"""
+        INSERT INTO report_facts (month, department_id, vacation_days, sick_days)
+        SELECT month, department_id, SUM(vacation_days), SUM(sick_days)
+        FROM report_archived_leave
+        {months}
+        GROUP BY month, department_id
+        ON CONFLICT (month, department_id) DO UPDATE
+        SET vacation_days = vacation_days + excluded.vacation_days, sick_days = sick_days + excluded.sick_days
+    """)
+
+# Faktentabelle fortschreiben: nur markierte Monate, vollständig bei full=True oder leerer Tabelle
+@retry_on_busy
+def refresh_facts(full=False):
+    start = time.perf_counter()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Marken lesen und löschen in derselben Schreibtransaktion, damit keine Änderung verloren geht
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM report_facts)")
+        full = full or bool(cursor.fetchone()[0])
+        cursor.execute("SELECT kind, COUNT(*) FROM report_dirty GROUP BY kind")
+        dirty = dict(cursor.fetchall())
+
+        if not full and not dirty:
+            conn.rollback()
+            return False
+
+        staffing = full or "staff" in dirty
+        if staffing:
+            _refresh_staffing(cursor)
+        if full or "leave" in dirty:
+            _refresh_leave(cursor, full)
+
+        # Krankenquote: Krankheitstage je möglichem Anwesenheitstag (Bestand am Monatsende mal Kalendertage)
+        cursor.execute(f"""
+            UPDATE report_facts
+            SET sick_rate = CASE WHEN headcount > 0
+                THEN 100.0 * sick_days / (headcount * (SELECT days FROM report_months m WHERE m.month = report_facts.month))
+                ELSE 0 END
+            {"" if staffing else "WHERE month IN (SELECT month FROM report_dirty WHERE kind = 'leave')"}
+        """)
+
+        cursor.execute("DELETE FROM report_dirty")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    scope = "vollständig" if full else f"{dirty.get('leave', 0)} Monate" + (", Personalbestand" if staffing else "")
+    logger.info(f"Berichtsfakten aktualisiert ({scope}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return True
+
+# Kennzahlen je Monat über alle (bzw. die sichtbaren) Abteilungen
+def get_monthly_facts(first_month, last_month, access=None):
+    scope, params = rbac.department_scope(access, "f.department_id")
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT f.month, SUM(f.headcount) AS headcount, SUM(f.hires) AS hires, SUM(f.exits) AS exits,
+               SUM(f.vacation_days) AS vacation_days, SUM(f.sick_days) AS sick_days,
+               COALESCE(100.0 * SUM(f.sick_days) / NULLIF(SUM(f.headcount * m.days), 0), 0) AS sick_rate,
+               SUM(f.headcount * m.days) AS capacity_days
+        FROM report_facts f
+        JOIN report_months m ON m.month = f.month
+        WHERE f.month BETWEEN ? AND ?{scope}
+        GROUP BY f.month
+        ORDER BY f.month
+    """, [first_month, last_month] + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Monatswerte einer Kennzahl für ein Jahr und das Vorjahr (je 12 Werte)
+def get_year_over_year(year, metric, access=None):
+    values = {row['month']: row[metric] for row in get_monthly_facts(f"{year - 1}-01", f"{year}-12", access)}
+    current = [values.get(f"{year}-{month:02d}", 0) or 0 for month in range(1, 13)]
+    previous = [values.get(f"{year - 1}-{month:02d}", 0) or 0 for month in range(1, 13)]
+    return current, previous
+
+# Jahreswerte einer Kennzahl über mehrere Jahre; Bestand als Monatsdurchschnitt, Quote über alle Tage.
+# Im laufenden Jahr zählen nur vergangene Monate (geplanter Urlaub liegt sonst schon in der Summe)
+def get_yearly_trend(last_year, metric, years=5, access=None):
+    current_month = datetime.date.today().strftime("%Y-%m")
+    totals = {}
+    for row in get_monthly_facts(f"{last_year - years + 1}-01", f"{last_year}-12", access):
+        if row['month'] > current_month:
+            continue
+        year = int(row['month'][:4])
+        total = totals.setdefault(year, {"months": 0, "headcount": 0, "hires": 0, "exits": 0,
+                                         "vacation_days": 0, "sick_days": 0, "capacity_days": 0})
+        total["months"] += 1
+        for key in ("headcount", "hires", "exits", "vacation_days", "sick_days", "capacity_days"):
+            total[key] += row[key] or 0
+
+    result = []
+    for year in range(last_year - years + 1, last_year + 1):
+        total = totals.get(year)
+        if total is None:
+            result.append((year, 0))
+        elif metric == "headcount":
+            result.append((year, total["headcount"] / total["months"]))
+        elif metric == "sick_rate":
+            result.append((year, 100.0 * total["sick_days"] / total["capacity_days"] if total["capacity_days"] else 0))
+        else:
+            result.append((year, total[metric]))
+    return result
+
+# Kennzahlen eines Jahres je Abteilung
+def get_department_facts(year, access=None):
+    scope, params = rbac.department_scope(access, "f.department_id")
+    last_month = min(f"{year}-12", datetime.date.today().strftime("%Y-%m"))
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COALESCE(d.name, 'Ohne Abteilung') AS department,
+               AVG(f.headcount) AS headcount, SUM(f.hires) AS hires, SUM(f.exits) AS exits,
+               SUM(f.vacation_days) AS vacation_days, SUM(f.sick_days) AS sick_days,
+               COALESCE(100.0 * SUM(f.sick_days) / NULLIF(SUM(f.headcount * m.days), 0), 0) AS sick_rate
+        FROM report_facts f
+        JOIN report_months m ON m.month = f.month
+        LEFT JOIN departments d ON d.id = f.department_id
+        WHERE f.month BETWEEN ? AND ?{scope}
+        GROUP BY f.department_id
+        HAVING SUM(f.headcount) > 0 OR SUM(f.vacation_days) > 0 OR SUM(f.sick_days) > 0
+        ORDER BY department
+    """, [f"{year}-01", last_month] + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
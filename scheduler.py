@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import threading
+import time
+from core import logger
+
+# Längste Wartezeit am Stück in Sekunden (nach Ruhezustand o. Ä. wird spätestens dann neu geprüft)
+SCHEDULER_MAX_WAIT_SECONDS = 60
+
+# Wiederkehrende Aufgaben in einem Heap nach Fälligkeit. Mit Tk-Fenster wartet genau ein root.after auf die
+# nächste fällige Aufgabe und die Aufgaben laufen in Hintergrundthreads (höchstens einer je Aufgabe);
+# ohne Fenster (headless, z. B. "python -m cli reminders") laufen sie nacheinander in run_forever.
+class Scheduler:
+    def __init__(self, root=None):
+        self.root = root
+        self.heap = []
+        self.counter = itertools.count()
+        # Aufgabe -> (Intervall in Sekunden, Funktion, Kennung des gültigen Heap-Eintrags)
+        self.jobs = {}
+        self.threads = {}
+        self.timer = None
+        self.wakeup = threading.Event()
+        self.stopped = False
+
+    # Aufgabe alle interval Sekunden ausführen, erstmals nach delay Sekunden; ersetzt eine gleichnamige
+    def every(self, name, interval, func, delay=0):
+        token = next(self.counter)
+        self.jobs[name] = (interval, func, token)
+        heapq.heappush(self.heap, (time.monotonic() + delay, token, name))
+        self.arm()
+
+    # Veraltete Heap-Einträge werden erst beim Erreichen der Spitze verworfen
+    def cancel(self, name):
+        self.jobs.pop(name, None)
+
+    def next_due(self):
+        while self.heap:
+            due, token, name = self.heap[0]
+            job = self.jobs.get(name)
+            if job is not None and job[2] == token:
+                return due
+            heapq.heappop(self.heap)
+        return None
+
+    # Alle fälligen Aufgaben ausführen und neu einplanen (Abstand ab jetzt, verpasste Läufe holen nicht nach)
+    def run_pending(self):
+        now = time.monotonic()
+        while not self.stopped:
+            due = self.next_due()
+            if due is None or due > now:
+                break
+            _, _, name = heapq.heappop(self.heap)
+            interval, func, _ = self.jobs[name]
+            token = next(self.counter)
+            self.jobs[name] = (interval, func, token)
+            heapq.heappush(self.heap, (now + interval, token, name))
+            self.execute(name, func)
+        self.arm()
+
+    def execute(self, name, func):
+        if self.root is None:
+            self.run_job(name, func)
+            return
+        thread = self.threads.get(name)
+        if thread is not None and thread.is_alive():
+            logger.info(f"Aufgabe {name} läuft noch, Lauf übersprungen")
+            return
+        thread = threading.Thread(target=self.run_job, args=(name, func), daemon=True)
+        self.threads[name] = thread
+        thread.start()
+
+    def run_job(self, name, func):
+        try:
+            func()
+        except Exception as e:
+            logger.error(f"Fehler in geplanter Aufgabe {name}: {e}")
+
+    # Wecker auf die nächste Fälligkeit stellen: ein einziges root.after bzw. Aufwecken von run_forever
+    def arm(self):
+        if self.root is None:
+            self.wakeup.set()
+            return
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        due = self.next_due()
+        if due is None or self.stopped:
+            return
+        delay = min(max(due - time.monotonic(), 0), SCHEDULER_MAX_WAIT_SECONDS)
+        self.timer = self.root.after(int(delay * 1000), self.tick)
+
+    def tick(self):
+        self.timer = None
+        self.run_pending()
+
+    def run_forever(self):
+        while not self.stopped:
+            self.run_pending()
+            self.wakeup.clear()
+            due = self.next_due()
+            timeout = SCHEDULER_MAX_WAIT_SECONDS if due is None else due - time.monotonic()
+            self.wakeup.wait(min(max(timeout, 0), SCHEDULER_MAX_WAIT_SECONDS))
+
+    def stop(self):
+        self.stopped = True
+        if self.root is not None and self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+        self.wakeup.set()
@@ -0,0 +1,992 @@
+import sqlite3
+import datetime
+import csv
+import bcrypt
+from fpdf import FPDF
+from core import (
+    APP_NAME, BCRYPT_ROUNDS, LOGIN_MAX_FAILURES, LOGIN_LOCKOUT_MINUTES, LOGIN_ATTEMPT_RETENTION_DAYS,
+    get_connection, retry_on_busy, set_current_user, hash_password, hash_rounds, load_config, logger,
+    format_date, calculate_days
+)
+import rbac
+import archive
+import encryption
+
+# Spalten, die beim Anlegen/Bearbeiten eines Mitarbeiters übernommen werden
+EMPLOYEE_FIELDS = (
+    "employee_id", "first_name", "last_name", "birth_date", "address", "phone", "email",
+    "position", "department_id", "hire_date", "exit_date", "salary", "status", "vacation_days_per_year",
+    "profile_image", "notes"
+)
+
+# Spalten für Export und Import von Mitarbeiterdaten
+EXPORT_FIELDS = ("id",) + EMPLOYEE_FIELDS + ("sick_days_used", "created_at", "updated_at", "department")
+
+# Datensatz wurde seit dem Laden von einem anderen Benutzer geändert oder gelöscht
+class ConcurrentModificationError(Exception):
+    def __init__(self, table, row_id):
+        super().__init__(f"Datensatz {row_id} in {table} wurde zwischenzeitlich geändert")
+        self.table = table
+        self.row_id = row_id
+
+class LoginLockedError(Exception):
+    def __init__(self, username, seconds):
+        super().__init__(f"Zu viele Fehlversuche für {username}, gesperrt für {seconds} Sekunden")
+        self.username = username
+        self.seconds = seconds
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+# Abteilungsnamen ("department" aus Dialogen, CSV-Import und älteren Aufrufern) in department_id übersetzen;
+# unbekannte Abteilungen werden angelegt
+def _resolve_department(cursor, data):
+    if "department" not in data:
+        return data
+
+    name = data["department"]
+    data = {key: value for key, value in data.items() if key != "department"}
+    if not name:
+        data["department_id"] = None
+        return data
+
+    cursor.execute("SELECT id FROM departments WHERE name = ?", (name,))
+    department = cursor.fetchone()
+    if department is None:
+        current_time = _now()
+        cursor.execute("INSERT INTO departments (name, created_at, updated_at) VALUES (?, ?, ?)",
+                       (name, current_time, current_time))
+        data["department_id"] = cursor.lastrowid
+        logger.info(f"Abteilung angelegt: {name}")
+    else:
+        data["department_id"] = department[0]
+    return data
+
+# UPDATE mit Versionsprüfung: schlägt fehl, wenn die erwartete Version nicht mehr aktuell ist
+def _versioned_update(cursor, table, assignments, params, row_id, expected_version=None):
+    sql = f"UPDATE {table} SET {assignments}, version = version + 1 WHERE id = ?"
+    params = list(params) + [row_id]
+    if expected_version is not None:
+        sql += " AND version = ?"
+        params.append(expected_version)
+
+    cursor.execute(sql, params)
+    if cursor.rowcount == 0:
+        raise ConcurrentModificationError(table, row_id)
+
+# Abteilung des Mitarbeiters bzw. des Urlaubsantrags, auf den sich ein Schreibzugriff bezieht
+EMPLOYEE_DEPARTMENT_SQL = "SELECT department_id FROM employees WHERE id = ?"
+VACATION_DEPARTMENT_SQL = "SELECT e.department_id FROM vacation v JOIN employees e ON e.id = v.employee_id WHERE v.id = ?"
+
+# Abteilungsbeschränkung bei Schreibzugriffen: PermissionDeniedError, wenn die Abteilung nicht zum Benutzer gehört
+def _require_department(access, department_id, permission):
+    if access is not None and not access.covers(department_id):
+        raise rbac.PermissionDeniedError(permission)
+
+# Abteilung des betroffenen Mitarbeiters in der Schreibtransaktion lesen und prüfen; BEGIN IMMEDIATE,
+# damit ein gleichzeitiger Abteilungswechsel nicht zwischen Prüfung und Änderung fällt
+def _require_row_department(cursor, access, permission, sql, row_id):
+    if access is None or access.all_departments:
+        return
+    if not cursor.connection.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute(sql, (row_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        _require_department(access, row[0], permission)
+
+# --- Anmeldung ---
+
+# Verbleibende Sperrzeit in Sekunden nach zu vielen Fehlversuchen seit der letzten erfolgreichen Anmeldung
+def _login_lock_seconds(cursor, username, max_failures, lockout_minutes):
+    window_start = (datetime.datetime.now() - datetime.timedelta(minutes=lockout_minutes)).strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute("""
+        SELECT COUNT(*), MAX(attempted_at) FROM login_attempts
+        WHERE username = ? AND success = 0 AND attempted_at >= ?
+          AND id > COALESCE((SELECT MAX(id) FROM login_attempts WHERE username = ? AND success = 1), 0)
+    """, (username, window_start, username))
+    failures, last_failure = cursor.fetchone()
+
+    if failures < max_failures:
+        return 0
+    locked_until = datetime.datetime.strptime(last_failure, '%Y-%m-%d %H:%M:%S') + datetime.timedelta(minutes=lockout_minutes)
+    return max(1, int((locked_until - datetime.datetime.now()).total_seconds()))
+
+# Anmeldung prüfen; bcrypt ist absichtlich langsam, daher aus einem Hintergrund-Thread aufrufen.
+# session=False prüft nur die Zugangsdaten (API): kein Wechsel des angemeldeten Benutzers, kein Schlüssel.
+@retry_on_busy
+def authenticate(username, password, config=None, session=True):
+    config = config or load_config()
+    rounds = config.get("bcrypt_rounds", BCRYPT_ROUNDS)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        lock_seconds = _login_lock_seconds(
+            cursor, username,
+            config.get("login_max_failures", LOGIN_MAX_FAILURES),
+            config.get("login_lockout_minutes", LOGIN_LOCKOUT_MINUTES)
+        )
+        if lock_seconds:
+            logger.warning(f"Anmeldung für gesperrten Benutzer {username} abgewiesen",
+                           extra={"event": "auth.locked", "user": username})
+            raise LoginLockedError(username, lock_seconds)
+
+        cursor.execute("SELECT id, password_hash, role FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+        # Lesetransaktion nicht über die Hash-Berechnung offen halten
+        conn.commit()
+
+        # Benutzer ohne Passwort-Hash können sich nicht anmelden
+        success = bool(user) and bool(user[1]) and bcrypt.checkpw(password.encode('utf-8'), user[1].encode('utf-8'))
+        # Hash mit geändertem Kostenfaktor neu berechnen, solange das Klartextpasswort bekannt ist;
+        # vor dem INSERT, damit die Schreibsperre nicht über die Hash-Berechnung gehalten wird
+        new_hash = hash_password(password, rounds) if success and hash_rounds(user[1]) != rounds else None
+        current_time = _now()
+        cursor.execute("INSERT INTO login_attempts (username, attempted_at, success) VALUES (?, ?, ?)",
+                       (username, current_time, 1 if success else 0))
+
+        if not success:
+            conn.commit()
+            logger.warning(f"Fehlgeschlagener Anmeldeversuch für Benutzer {username}",
+                           extra={"event": "auth.failed", "user": username})
+            return None
+
+        # Für API-Anfragen weder letzte Anmeldung noch Aufräumen alter Versuche (bei jeder Prüfung zu teuer)
+        if session:
+            cursor.execute("UPDATE users SET last_login = ?, updated_at = ? WHERE id = ?",
+                           (current_time, current_time, user[0]))
+
+        if new_hash is not None:
+            # Nur ersetzen, wenn das Passwort nicht zwischenzeitlich geändert wurde
+            cursor.execute("UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?", (new_hash, user[0], user[1]))
+            logger.info(f"Passwort-Hash von {username} auf Kostenfaktor {rounds} umgestellt")
+
+        if session:
+            cursor.execute(
+                "DELETE FROM login_attempts WHERE attempted_at < strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime', ?)",
+                (f"-{LOGIN_ATTEMPT_RETENTION_DAYS} days",)
+            )
+        conn.commit()
+
+        if session:
+            # Folgende Änderungen im Audit-Log diesem Benutzer zuordnen
+            set_current_user(username)
+
+            # Schlüssel für verschlüsselte Backups und Exporte ist an die Anmeldung eines Administrators gebunden
+            if user[2] == "admin":
+                encryption.unlock_for_admin(username, password)
+
+            logger.info(f"Benutzer {username} hat sich erfolgreich angemeldet.", extra={"event": "auth.login", "user": username})
+        return {"id": user[0], "username": username, "role": user[2], "access": rbac.load_access(user[0], user[2])}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# --- Dashboard ---
+
+# Kennzahlen und Ereignisse des Dashboards; mit access auf die Abteilungen des Benutzers beschränkt
+
+def get_employee_count(access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM employees e WHERE e.status = 'Aktiv'{scope}", params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def get_current_vacation_count(access=None):
+    scope, params = rbac.department_scope(access)
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(DISTINCT v.employee_id) FROM vacation v
+        JOIN employees e ON e.id = v.employee_id
+        WHERE v.start_date <= ? AND v.end_date >= ? AND v.status = 'Genehmigt'{scope}
+    """, [today, today] + params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def get_current_sick_count(access=None):
+    if access is not None:
+        access.require("sick_leave.view")
+    scope, params = rbac.department_scope(access)
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(DISTINCT s.employee_id) FROM sick_leave s
+        JOIN employees e ON e.id = s.employee_id
+        WHERE s.start_date <= ? AND s.end_date >= ?{scope}
+    """, [today, today] + params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def get_birthdays_this_month(access=None):
+    scope, params = rbac.department_scope(access)
+    current_month = datetime.datetime.now().month
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM employees e
+        WHERE strftime('%m', e.birth_date) = ? AND e.status = 'Aktiv'{scope}
+    """, [f"{current_month:02d}"] + params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def get_employees_by_department(access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT d.name, COUNT(*)
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE e.status = 'Aktiv'{scope}
+        GROUP BY e.department_id
+    """, params)
+    data = cursor.fetchall()
+    conn.close()
+
+    departments = [dept[0] if dept[0] else "Andere" for dept in data]
+    counts = [dept[1] for dept in data]
+
+    return departments, counts
+
+def get_vacation_by_month(year=None, access=None):
+    scope, params = rbac.department_scope(access)
+    # Mitarbeiter nur für die Abteilungsbeschränkung dazunehmen
+    join = "JOIN employees e ON e.id = a.employee_id" if scope else ""
+    year = str(year or datetime.datetime.now().year)
+    conn = get_connection()
+    cursor = conn.cursor()
+    with archive.history(conn, "vacation", int(year), int(year)) as vacation:
+        cursor.execute(f"""
+            SELECT strftime('%m', a.start_date) as month, SUM(a.days)
+            FROM {vacation} a {join}
+            WHERE a.status = 'Genehmigt' AND strftime('%Y', a.start_date) = ?{scope}
+            GROUP BY month
+        """, [year] + params)
+        data = {int(month): count for month, count in cursor.fetchall()}
+    conn.close()
+
+    # Alle Monate abdecken
+    return [data.get(i, 0) for i in range(1, 13)]
+
+def get_sick_leave_by_month(year=None, access=None):
+    if access is not None:
+        access.require("sick_leave.view")
+    scope, params = rbac.department_scope(access)
+    join = "JOIN employees e ON e.id = a.employee_id" if scope else ""
+    year = str(year or datetime.datetime.now().year)
+    conn = get_connection()
+    cursor = conn.cursor()
+    with archive.history(conn, "sick_leave", int(year), int(year)) as sick_leave:
+        cursor.execute(f"""
+            SELECT strftime('%m', a.start_date) as month, SUM(a.days)
+            FROM {sick_leave} a {join}
+            WHERE strftime('%Y', a.start_date) = ?{scope}
+            GROUP BY month
+        """, [year] + params)
+        data = {int(month): count for month, count in cursor.fetchall()}
+    conn.close()
+
+    # Alle Monate abdecken
+    return [data.get(i, 0) for i in range(1, 13)]
+
+def get_upcoming_events(access=None):
+    scope, params = rbac.department_scope(access)
+    events = []
+    today = datetime.datetime.now().date()
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    # Geburtstage in den nächsten 30 Tagen
+    cursor.execute(f"""
+        SELECT e.first_name, e.last_name, e.birth_date
+        FROM employees e
+        WHERE e.status = 'Aktiv'{scope}
+        ORDER BY strftime('%m-%d', e.birth_date)
+    """, params)
+
+    employees = cursor.fetchall()
+    for emp in employees:
+        if emp[2]:  # Wenn Geburtsdatum vorhanden
+            try:
+                birth_date = datetime.datetime.strptime(emp[2], "%Y-%m-%d").date()
+
+                # Nächster Geburtstag in diesem Jahr
+                next_birthday = datetime.date(today.year, birth_date.month, birth_date.day)
+
+                # Falls der Geburtstag dieses Jahr schon vorbei ist, zum nächsten Jahr wechseln
+                if next_birthday < today:
+                    next_birthday = datetime.date(today.year + 1, birth_date.month, birth_date.day)
+
+                # Nur Ereignisse in den nächsten 30 Tagen anzeigen
+                delta = (next_birthday - today).days
+                if 0 <= delta <= 30:
+                    events.append({
+                        "icon": "🎂",
+                        "text": f"Geburtstag von {emp[0]} {emp[1]}",
+                        "date": next_birthday.strftime("%d.%m.%Y")
+                    })
+            except:
+                pass
+
+    # Jubiläen (Mitarbeiter, die X Jahre im Unternehmen sind)
+    cursor.execute(f"""
+        SELECT e.first_name, e.last_name, e.hire_date
+        FROM employees e
+        WHERE e.status = 'Aktiv'{scope}
+        ORDER BY e.hire_date
+    """, params)
+
+    employees = cursor.fetchall()
+    for emp in employees:
+        if emp[2]:  # Wenn Einstellungsdatum vorhanden
+            try:
+                hire_date = datetime.datetime.strptime(emp[2], "%Y-%m-%d").date()
+
+                # Jubiläumsdatum in diesem Jahr
+                years_employed = today.year - hire_date.year
+                anniversary_date = datetime.date(today.year, hire_date.month, hire_date.day)
+
+                # Falls das Jubiläum dieses Jahr schon vorbei ist, zum nächsten Jahr wechseln
+                if anniversary_date < today:
+                    anniversary_date = datetime.date(today.year + 1, hire_date.month, hire_date.day)
+                    years_employed += 1
+
+                # Nur Ereignisse in den nächsten 30 Tagen und bei rundem Jubiläum (5, 10, 15, etc. Jahre)
+                delta = (anniversary_date - today).days
+                if 0 <= delta <= 30 and years_employed > 0 and years_employed % 5 == 0:
+                    events.append({
+                        "icon": "🏆",
+                        "text": f"{years_employed}-jähriges Jubiläum von {emp[0]} {emp[1]}",
+                        "date": anniversary_date.strftime("%d.%m.%Y")
+                    })
+            except:
+                pass
+
+    # Kommender Urlaub
+    cursor.execute(f"""
+        SELECT e.first_name, e.last_name, v.start_date, v.end_date
+        FROM vacation v
+        JOIN employees e ON v.employee_id = e.id
+        WHERE v.status = 'Genehmigt' AND v.start_date >= ?{scope}
+        ORDER BY v.start_date
+        LIMIT 5
+    """, [today.strftime("%Y-%m-%d")] + params)
+
+    vacations = cursor.fetchall()
+    for vac in vacations:
+        try:
+            start_date = datetime.datetime.strptime(vac[2], "%Y-%m-%d").date()
+
+            # Nur Urlaub in den nächsten 14 Tagen anzeigen
+            delta = (start_date - today).days
+            if 0 <= delta <= 14:
+                events.append({
+                    "icon": "🏖️",
+                    "text": f"{vac[0]} {vac[1]} ist im Urlaub",
+                    "date": f"{format_date(vac[2])} - {format_date(vac[3])}"
+                })
+        except:
+            pass
+
+    conn.close()
+
+    # Nach Datum sortieren
+    events.sort(key=lambda x: datetime.datetime.strptime(x["date"].split(" - ")[0], "%d.%m.%Y"))
+
+    return events[:10]  # Maximal 10 Ereignisse anzeigen
+
+# --- Mitarbeiter ---
+
+def get_departments():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM departments ORDER BY name")
+    departments = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return departments
+
+# Abteilungen als {Name: ID} in alphabetischer Reihenfolge (Auswahlfelder, die nach department_id filtern)
+def get_department_ids():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, id FROM departments ORDER BY name")
+    departments = dict(cursor.fetchall())
+    conn.close()
+    return departments
+
+def list_employees(access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT e.id, e.employee_id, e.first_name, e.last_name, e.department_id, d.name AS department, e.position,
+               e.hire_date, e.status, e.profile_image, e.version
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE 1 = 1{scope}
+        ORDER BY e.last_name, e.first_name
+    """, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Mitarbeiterliste nach Suchbegriff, Abteilung und Status filtern (Filter der Mitarbeiteransicht)
+def filter_employee_rows(rows, search_term="", department_id=None, status="Alle"):
+    search_term = search_term.lower()
+    result = []
+
+    for row in rows:
+        if search_term:
+            name = f"{row['last_name']}, {row['first_name']}".lower()
+            if search_term not in name and search_term not in str(row['employee_id'] or "").lower():
+                continue
+        if department_id is not None and row['department_id'] != department_id:
+            continue
+        if status != "Alle" and row['status'] != status:
+            continue
+        result.append(row)
+
+    return result
+
+def get_employee_rows(employee_ids, access=None):
+    # Einzelne Zeilen für die Aktualisierung offener Ansichten nachladen
+    if not employee_ids:
+        return []
+
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT e.id, e.employee_id, e.first_name, e.last_name, e.department_id, d.name AS department, e.position,
+               e.hire_date, e.status, e.profile_image, e.version
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE e.id IN ({', '.join('?' for _ in employee_ids)}){scope}
+    """, list(employee_ids) + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_employee(employee_id, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT e.*, d.name AS department
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE e.id = ?{scope}
+    """, [employee_id] + params)
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+# Interne ID zu einer Personalnummer (None, wenn unbekannt)
+def get_employee_id_by_number(employee_number):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM employees WHERE employee_id = ?", (employee_number,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+@retry_on_busy
+def create_employee(data, access=None):
+    if access is not None:
+        access.require("employees.edit")
+    current_time = _now()
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        data = _resolve_department(cursor, data)
+        _require_department(access, data.get("department_id"), "employees.edit")
+        fields = [field for field in EMPLOYEE_FIELDS if field in data]
+        cursor.execute(f"""
+            INSERT INTO employees ({', '.join(fields)}, created_at, updated_at)
+            VALUES ({', '.join('?' for _ in fields)}, ?, ?)
+        """, [data[field] for field in fields] + [current_time, current_time])
+        conn.commit()
+
+        logger.info(f"Mitarbeiter angelegt: ID {cursor.lastrowid}",
+                    extra={"event": "employee.created", "employee_id": cursor.lastrowid})
+        return cursor.lastrowid
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@retry_on_busy
+def update_employee(employee_id, data, expected_version=None, access=None):
+    if access is not None:
+        access.require("employees.edit")
+    if not any(field in data for field in EMPLOYEE_FIELDS + ("department",)):
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        _require_row_department(cursor, access, "employees.edit", EMPLOYEE_DEPARTMENT_SQL, employee_id)
+        data = _resolve_department(cursor, data)
+        # Versetzen nur in eigene Abteilungen
+        if "department_id" in data:
+            _require_department(access, data["department_id"], "employees.edit")
+        fields = [field for field in EMPLOYEE_FIELDS if field in data]
+        _versioned_update(
+            cursor, "employees",
+            f"{', '.join(f'{field} = ?' for field in fields)}, updated_at = ?",
+            [data[field] for field in fields] + [_now()],
+            employee_id, expected_version
+        )
+        conn.commit()
+
+        logger.info(f"Mitarbeiter aktualisiert: ID {employee_id}",
+                    extra={"event": "employee.updated", "employee_id": employee_id})
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@retry_on_busy
+def set_employee_status(employee_id, new_status, expected_version=None, access=None):
+    if access is not None:
+        access.require("employees.edit")
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        _require_row_department(cursor, access, "employees.edit", EMPLOYEE_DEPARTMENT_SQL, employee_id)
+        _versioned_update(cursor, "employees", "status = ?, updated_at = ?", (new_status, _now()),
+                          employee_id, expected_version)
+        conn.commit()
+
+        logger.info(f"Mitarbeiterstatus geändert: ID {employee_id}, neuer Status: {new_status}",
+                    extra={"event": "employee.status", "employee_id": employee_id})
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# --- Urlaub ---
+
+def list_vacation(year, month, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    with archive.history(conn, "vacation", int(year), int(year)) as vacation:
+        cursor.execute(f"""
+            SELECT v.*, e.first_name, e.last_name, d.name AS department, u.username as approver_name
+            FROM {vacation} v
+            JOIN employees e ON v.employee_id = e.id
+            LEFT JOIN departments d ON d.id = e.department_id
+            LEFT JOIN users u ON v.approved_by = u.id
+            WHERE strftime('%Y', v.start_date) = ?
+            AND strftime('%m', v.start_date) = ?{scope}
+            ORDER BY v.start_date DESC
+        """, [str(year), f"{month:02d}"] + params)
+        rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_vacation_rows(vacation_ids, access=None):
+    if not vacation_ids:
+        return []
+
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT v.*, e.first_name, e.last_name, d.name AS department, u.username as approver_name
+        FROM vacation v
+        JOIN employees e ON v.employee_id = e.id
+        LEFT JOIN departments d ON d.id = e.department_id
+        LEFT JOIN users u ON v.approved_by = u.id
+        WHERE v.id IN ({', '.join('?' for _ in vacation_ids)}){scope}
+    """, list(vacation_ids) + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+@retry_on_busy
+def create_vacation_request(employee_id, start_date, end_date, notes=None, access=None):
+    if access is not None:
+        access.require("vacation.request")
+    days = calculate_days(start_date, end_date, include_weekends=False)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        _require_row_department(cursor, access, "vacation.request", EMPLOYEE_DEPARTMENT_SQL, employee_id)
+        cursor.execute("""
+            INSERT INTO vacation (employee_id, start_date, end_date, days, status, notes, created_at)
+            VALUES (?, ?, ?, ?, 'Beantragt', ?, ?)
+        """, (employee_id, start_date, end_date, days, notes, _now()))
+        conn.commit()
+
+        logger.info(f"Urlaubsantrag erstellt: Mitarbeiter {employee_id}, {start_date} bis {end_date}",
+                    extra={"event": "vacation.requested", "employee_id": employee_id, "vacation_id": cursor.lastrowid})
+        return cursor.lastrowid
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@retry_on_busy
+def set_vacation_status(vacation_id, new_status, approver_id, expected_version=None, access=None):
+    if access is not None:
+        access.require("vacation.approve")
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        _require_row_department(cursor, access, "vacation.approve", VACATION_DEPARTMENT_SQL, vacation_id)
+        _versioned_update(cursor, "vacation", "status = ?, approved_by = ?, approved_date = ?",
+                          (new_status, approver_id, _now()), vacation_id, expected_version)
+        conn.commit()
+
+        logger.info(f"Urlaubsantrag Status geändert: ID {vacation_id}, neuer Status: {new_status}",
+                    extra={"event": "vacation.status", "vacation_id": vacation_id})
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# --- Krankschreibungen ---
+
+def list_sick_leave(year, month, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    with archive.history(conn, "sick_leave", int(year), int(year)) as sick_leave:
+        cursor.execute(f"""
+            SELECT s.*, e.first_name, e.last_name, d.name AS department
+            FROM {sick_leave} s
+            JOIN employees e ON s.employee_id = e.id
+            LEFT JOIN departments d ON d.id = e.department_id
+            WHERE strftime('%Y', s.start_date) = ?
+            AND strftime('%m', s.start_date) = ?{scope}
+            ORDER BY s.start_date DESC
+        """, [str(year), f"{month:02d}"] + params)
+        rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+@retry_on_busy
+def create_sick_leave(employee_id, start_date, end_date, medical_certificate=False, notes=None, access=None):
+    if access is not None:
+        access.require("sick_leave.edit")
+    days = calculate_days(start_date, end_date)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        _require_row_department(cursor, access, "sick_leave.edit", EMPLOYEE_DEPARTMENT_SQL, employee_id)
+        cursor.execute("""
+            INSERT INTO sick_leave (employee_id, start_date, end_date, days, medical_certificate, notes, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (employee_id, start_date, end_date, days, bool(medical_certificate), notes, _now()))
+        conn.commit()
+
+        logger.info(f"Krankmeldung eingetragen: Mitarbeiter {employee_id}, {start_date} bis {end_date}",
+                    extra={"event": "sick_leave.created", "employee_id": employee_id, "sick_leave_id": cursor.lastrowid})
+        return cursor.lastrowid
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# --- Abwesenheitskalender ---
+
+# Mitarbeiter, die im Zeitraum beschäftigt sind (Zeilen des Kalenders), nach Abteilung und Name
+def get_calendar_employees(first_day, last_day, department_id=None, access=None):
+    scope, params = rbac.department_scope(access)
+    sql = f"""
+        SELECT e.id, e.last_name || ', ' || e.first_name AS label, d.name AS department
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE COALESCE(e.hire_date, ?) <= ?
+          AND (e.exit_date >= ? OR (e.exit_date IS NULL AND e.status = 'Aktiv')){scope}
+    """
+    params = [last_day, last_day, first_day] + params
+    if department_id is not None:
+        sql += " AND e.department_id = ?"
+        params.append(department_id)
+    sql += " ORDER BY d.name, e.last_name, e.first_name"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Urlaube (ohne abgelehnte) und Krankmeldungen, die den Zeitraum berühren, in einer Abfrage.
+# Bereichssuche über das Enddatum; die Abteilungsbeschränkung als Unterabfrage statt Join, damit der
+# Planer nicht über alle Mitarbeiter iteriert. Sortiert wird im Kalender
+# Ältere Zeiträume lesen über die Sichten auf die angehängten Jahresarchive
+def get_absences(first_day, last_day, include_sick=True, access=None):
+    scope, scope_params = rbac.department_scope(access)
+    employees = f" AND {{}}.employee_id IN (SELECT e.id FROM employees e WHERE 1 = 1{scope})" if scope else ""
+    first_year, last_year = int(first_day[:4]), int(last_day[:4])
+
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    with archive.history(conn, "vacation", first_year, last_year) as vacation, \
+            archive.history(conn, "sick_leave", first_year, last_year) as sick_leave:
+        sql = f"""
+            SELECT 'vacation' AS kind, v.id, v.employee_id, v.start_date, v.end_date, v.status
+            FROM {vacation} v
+            WHERE v.end_date >= ? AND v.start_date <= ? AND v.status != 'Abgelehnt'{employees.format("v")}
+        """
+        params = [first_day, last_day] + scope_params
+        if include_sick:
+            sql += f"""
+            UNION ALL
+            SELECT 'sick' AS kind, s.id, s.employee_id, s.start_date, s.end_date, NULL AS status
+            FROM {sick_leave} s
+            WHERE s.end_date >= ? AND s.start_date <= ?{employees.format("s")}
+            """
+            params += [first_day, last_day] + scope_params
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# --- Export und Import ---
+
+def get_employees_for_export(access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT e.*, d.name AS department
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE 1 = 1{scope}
+    """, params)
+    employees = cursor.fetchall()
+    conn.close()
+
+    # Gehälter nur mit entsprechender Berechtigung exportieren
+    if access is not None and not access.can("salary.view"):
+        employees = [{key: row[key] for key in row.keys() if key != "salary"} for row in employees]
+    return employees
+
+# Zieldatei eines Exports: bei encrypt_exports mit der Endung .enc
+def export_target(filepath, config=None):
+    config = config or load_config()
+    return filepath + encryption.ENCRYPTED_SUFFIX if config.get("encrypt_exports", False) else filepath
+
+def export_employees(filepath, access=None):
+    if access is not None:
+        access.require("export")
+    target = export_target(filepath)
+    # Schlüssel vor dem Export prüfen
+    recipient = encryption.public_key() if target != filepath else None
+    employees = get_employees_for_export(access)
+
+    if recipient is None:
+        if filepath.endswith(".pdf"):
+            export_to_pdf(filepath, employees)
+        else:
+            export_to_csv(filepath, employees)  # Standardmäßig als CSV
+    elif filepath.endswith(".pdf"):
+        # FPDF schreibt nur in Dateien: Klartext vorübergehend in einer temporären Datei
+        encryption.encrypt_generated(lambda path: export_to_pdf(path, employees), target, recipient)
+    else:
+        # CSV direkt verschlüsselt schreiben, ohne Klartext auf der Platte
+        with encryption.open_encrypted(target, recipient, text=True) as csvfile:
+            write_csv(csvfile, employees)
+    filepath = target
+
+    logger.info(f"Mitarbeiterdaten exportiert nach {filepath}", extra={"event": "employee.export"})
+    return len(employees)
+
+def export_to_csv(filepath, data):
+    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+        write_csv(csvfile, data)
+
+def write_csv(csvfile, data):
+    # Feldnamen aus den Daten extrahieren, auch ohne Datensätze eine Kopfzeile schreiben
+    fieldnames = [key for key in data[0].keys()] if data else list(EXPORT_FIELDS)
+
+    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    writer.writeheader()
+
+    for row in data:
+        writer.writerow({key: row[key] for key in fieldnames})
+
+def export_to_pdf(filepath, data):
+    pdf = FPDF()
+    pdf.add_page()
+
+    # Titel
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(190, 10, "Mitarbeiterliste", 0, 1, "C")
+    pdf.ln(10)
+
+    # Tabellenkopf
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(15, 10, "ID", 1, 0, "C")
+    pdf.cell(40, 10, "Name", 1, 0, "C")
+    pdf.cell(30, 10, "Personalnr.", 1, 0, "C")
+    pdf.cell(40, 10, "Abteilung", 1, 0, "C")
+    pdf.cell(40, 10, "Position", 1, 0, "C")
+    pdf.cell(25, 10, "Status", 1, 1, "C")
+
+    # Tabellendaten
+    pdf.set_font("Arial", "", 10)
+    for row in data:
+        pdf.cell(15, 10, str(row['id']), 1, 0, "C")
+        pdf.cell(40, 10, f"{row['first_name']} {row['last_name']}", 1, 0, "L")
+        pdf.cell(30, 10, str(row['employee_id']), 1, 0, "L")
+        pdf.cell(40, 10, str(row['department']), 1, 0, "L")
+        pdf.cell(40, 10, str(row['position']), 1, 0, "L")
+        pdf.cell(25, 10, str(row['status']), 1, 1, "C")
+
+    # Fußzeile
+    pdf.ln(10)
+    pdf.set_font("Arial", "I", 8)
+    pdf.cell(0, 10, f"Erstellt mit {APP_NAME} am {datetime.datetime.now().strftime('%d.%m.%Y %H:%M')}", 0, 0, "L")
+
+    pdf.output(filepath)
+
+@retry_on_busy
+def import_employees(filepath):
+    # Mitarbeiter aus CSV importieren; bestehende Personalnummern werden aktualisiert
+    created = 0
+    updated = 0
+
+    with open(filepath, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        rows = list(reader)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        current_time = _now()
+
+        for row in rows:
+            data = {
+                field: (row[field] if row[field] != "" else None)
+                for field in EMPLOYEE_FIELDS + ("department",) if field in row
+            }
+            if not data.get("first_name") or not data.get("last_name"):
+                continue
+
+            # Abteilungsname hat Vorrang vor der ID, die in einer anderen Datenbank vergeben wurde
+            data = _resolve_department(cursor, data)
+
+            existing = None
+            if data.get("employee_id"):
+                cursor.execute("SELECT id FROM employees WHERE employee_id = ?", (data["employee_id"],))
+                existing = cursor.fetchone()
+
+            fields = list(data.keys())
+            if existing:
+                cursor.execute(f"""
+                    UPDATE employees
+                    SET {', '.join(f'{field} = ?' for field in fields)}, updated_at = ?, version = version + 1
+                    WHERE id = ?
+                """, [data[field] for field in fields] + [current_time, existing[0]])
+                updated += 1
+            else:
+                cursor.execute(f"""
+                    INSERT INTO employees ({', '.join(fields)}, created_at, updated_at)
+                    VALUES ({', '.join('?' for _ in fields)}, ?, ?)
+                """, [data[field] for field in fields] + [current_time, current_time])
+                created += 1
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Mitarbeiterimport aus {filepath}: {created} angelegt, {updated} aktualisiert",
+                extra={"event": "employee.import"})
+    return created, updated
+
+# --- Änderungsbenachrichtigung ---
+
+# Erkennt Änderungen anderer Verbindungen (auch anderer Arbeitsplätze) über PRAGMA data_version
+# und liefert die geänderten Zeilen aus dem Änderungsprotokoll
+class ChangeWatcher:
+    def __init__(self):
+        self.conn = get_connection()
+        self.data_version = self._data_version()
+        self.last_change_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self):
+        # Ohne Commit einer anderen Verbindung bleibt data_version gleich: keine weitere Abfrage nötig
+        version = self._data_version()
+        if version == self.data_version:
+            return {}
+        self.data_version = version
+
+        cursor = self.conn.execute(
+            "SELECT id, table_name, row_id, operation FROM change_log WHERE id > ? ORDER BY id",
+            (self.last_change_id,)
+        )
+
+        changes = {}
+        for change_id, table_name, row_id, operation in cursor.fetchall():
+            self.last_change_id = change_id
+            rows = changes.setdefault(table_name, {})
+            # INSERT gefolgt von UPDATE bleibt ein INSERT, DELETE überschreibt alles
+            if rows.get(row_id) != "INSERT" or operation == "DELETE":
+                rows[row_id] = operation
+
+        return changes
+
+    def close(self):
+        self.conn.close()
+
+# --- Berichte ---
+
+# Mit access auf dessen Abteilungen beschränkt; Krankheitszahlen nur mit sick_leave.view (sonst None)
+def build_summary_report(year=None, access=None):
+    year = year or datetime.datetime.now().year
+    departments, counts = get_employees_by_department(access)
+    include_sick = access is None or access.can("sick_leave.view")
+
+    return {
+        "year": year,
+        "created_at": _now(),
+        "active_employees": get_employee_count(access),
+        "current_vacation": get_current_vacation_count(access),
+        "current_sick": get_current_sick_count(access) if include_sick else None,
+        "birthdays_this_month": get_birthdays_this_month(access),
+        "employees_by_department": dict(zip(departments, counts)),
+        "vacation_days_by_month": get_vacation_by_month(year, access),
+        "sick_days_by_month": get_sick_leave_by_month(year, access) if include_sick else None
+    }
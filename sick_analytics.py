@@ -0,0 +1,203 @@
+import datetime
+import sqlite3
+import time
+from core import get_connection, retry_on_busy, logger
+import rbac
+
+# Rollierender Betrachtungszeitraum für Bradford-Faktor, Muster und Atteste (bis einschließlich heute)
+ANALYSIS_WINDOW_DAYS = 365
+
+# Attestpflicht bei Arbeitsunfähigkeit von mehr als so vielen Kalendertagen (§ 5 EFZG)
+CERTIFICATE_REQUIRED_AFTER_DAYS = 3
+
+# Auffälliges Muster: mindestens so viele Fälle an Montagen/Freitagen und mindestens dieser Anteil aller Fälle
+PATTERN_MIN_SPELLS = 3
+PATTERN_MIN_SHARE = 0.5
+
+# Bradford-Faktor, ab dem die Ansicht einen Mitarbeiter hervorhebt
+BRADFORD_REVIEW_THRESHOLD = 200
+
+_ONE_DAY = datetime.timedelta(days=1)
+
+# Letzter Tag, an den eine Folgekrankmeldung anschließen kann: nächster Tag bzw. nach einem
+# Wochenende der Montag (Krankmeldung bis Freitag, Folgebescheinigung ab Montag)
+def _continuation_limit(end):
+    limit = end + _ONE_DAY
+    while limit.weekday() >= 5:
+        limit += _ONE_DAY
+    return limit
+
+def _overlap_days(start, end, first, last):
+    return max(0, (min(end, last) - max(start, first)).days + 1)
+
+# Auswertung eines Mitarbeiters aus seinen zusammengefassten Krankheitsfällen
+class _EmployeeAnalysis:
+    def __init__(self, employee_id, today):
+        self.employee_id = employee_id
+        self.today = today
+        self.window_start = today - datetime.timedelta(days=ANALYSIS_WINDOW_DAYS - 1)
+        self.year_start = datetime.date(today.year, 1, 1)
+        self.year_end = datetime.date(today.year, 12, 31)
+        self.spells = 0
+        self.sick_days = 0
+        self.monday_friday = 0
+        self.certificates_required = 0
+        self.certificates_missing = 0
+        self.year_days = 0
+        self.last_day = None
+        self.spell = None
+
+    # Krankmeldungen kommen nach Beginn sortiert; anschließende oder überlappende bilden einen Fall
+    def add(self, start, end, certificate):
+        self.year_days += _overlap_days(start, end, self.year_start, self.year_end)
+        spell = self.spell
+        if spell is not None and start <= _continuation_limit(spell[1]):
+            spell[1] = max(spell[1], end)
+            spell[2] = spell[2] or certificate
+        else:
+            self.close_spell()
+            self.spell = [start, end, certificate]
+
+    def close_spell(self):
+        if self.spell is None:
+            return
+        start, end, certificate = self.spell
+        self.spell = None
+        self.last_day = max(self.last_day or end, end)
+
+        days = _overlap_days(start, end, self.window_start, self.today)
+        if not days:
+            return
+        self.spells += 1
+        self.sick_days += days
+        # Beginn am Montag oder (abgeschlossenes) Ende am Freitag
+        if start.weekday() == 0 or (end <= self.today and end.weekday() == 4):
+            self.monday_friday += 1
+        if (end - start).days + 1 > CERTIFICATE_REQUIRED_AFTER_DAYS:
+            self.certificates_required += 1
+            if not certificate:
+                self.certificates_missing += 1
+
+    def result(self, computed_at):
+        self.close_spell()
+        return (
+            self.employee_id, self.spells, self.sick_days, self.spells * self.spells * self.sick_days,
+            self.monday_friday, self.certificates_required, self.certificates_missing,
+            self.last_day.isoformat() if self.last_day else None, self.year_days, computed_at
+        )
+
+# Ein Durchlauf über die nach Mitarbeiter und Beginn sortierten Krankmeldungen
+def analyse_rows(rows, today):
+    computed_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    current = None
+    for employee_id, start_date, end_date, certificate in rows:
+        try:
+            start = datetime.date.fromisoformat(start_date)
+            end = datetime.date.fromisoformat(end_date)
+        except (TypeError, ValueError):
+            continue
+        if end < start or start > today:
+            continue
+
+        if current is None or current.employee_id != employee_id:
+            if current is not None:
+                yield current.result(computed_at)
+            current = _EmployeeAnalysis(employee_id, today)
+        current.add(start, end, bool(certificate))
+
+    if current is not None:
+        yield current.result(computed_at)
+
+# Auswertung fortschreiben: vollständig einmal pro Tag (der Zeitraum verschiebt sich) oder auf Wunsch,
+# sonst nur für Mitarbeiter mit geänderten Krankmeldungen. Hält employees.sick_days_used aktuell.
+# Mit allow_full=False (Tk-Thread) wird ein fälliger vollständiger Lauf dem Hintergrundjob überlassen
+@retry_on_busy
+def run_analysis(full=False, today=None, allow_full=True):
+    today = today or datetime.date.today()
+    start = time.perf_counter()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT last_run FROM analytics_runs WHERE job = 'sick_leave'")
+        last_run = cursor.fetchone()
+        full = full or last_run is None or last_run[0] != today.isoformat()
+        if full and not allow_full:
+            conn.rollback()
+            return None
+
+        if not full:
+            cursor.execute("SELECT COUNT(*) FROM sick_leave_dirty")
+            if not cursor.fetchone()[0]:
+                conn.rollback()
+                return None
+
+        # Nur Krankmeldungen, die in den Zeitraum oder das laufende Jahr reichen
+        first_day = min(today - datetime.timedelta(days=ANALYSIS_WINDOW_DAYS - 1), datetime.date(today.year, 1, 1))
+        employees = "" if full else " AND employee_id IN (SELECT employee_id FROM sick_leave_dirty)"
+        rows = conn.execute(f"""
+            SELECT employee_id, start_date, end_date, medical_certificate
+            FROM sick_leave
+            WHERE end_date >= ?{employees}
+            ORDER BY employee_id, start_date
+        """, (first_day.isoformat(),))
+        results = list(analyse_rows(rows, today))
+
+        if full:
+            cursor.execute("DELETE FROM sick_leave_summary")
+        else:
+            cursor.execute("DELETE FROM sick_leave_summary WHERE employee_id IN (SELECT employee_id FROM sick_leave_dirty)")
+        cursor.executemany("""
+            INSERT INTO sick_leave_summary (employee_id, spells, sick_days, bradford, monday_friday_spells,
+                                            certificates_required, certificates_missing, last_sick_day, year_days, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, results)
+
+        # Krankheitstage im laufenden Jahr; nur tatsächlich geänderte Werte schreiben
+        cursor.executemany(
+            "UPDATE employees SET sick_days_used = ? WHERE id = ? AND sick_days_used IS NOT ?",
+            [(result[8], result[0], result[8]) for result in results]
+        )
+        cursor.execute(f"""
+            UPDATE employees SET sick_days_used = 0
+            WHERE sick_days_used != 0 AND id NOT IN (SELECT employee_id FROM sick_leave_summary)
+            {"" if full else "AND id IN (SELECT employee_id FROM sick_leave_dirty)"}
+        """)
+
+        cursor.execute("DELETE FROM sick_leave_dirty")
+        duration_ms = (time.perf_counter() - start) * 1000
+        cursor.execute("""
+            INSERT INTO analytics_runs (job, last_run, duration_ms, row_count) VALUES ('sick_leave', ?, ?, ?)
+            ON CONFLICT (job) DO UPDATE SET last_run = excluded.last_run, duration_ms = excluded.duration_ms,
+                                            row_count = excluded.row_count
+        """, (today.isoformat(), duration_ms, len(results)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Krankmeldungen ausgewertet ({'vollständig' if full else 'geänderte'}): "
+                f"{len(results)} Mitarbeiter in {duration_ms:.0f} ms")
+    return len(results)
+
+# Ausgewertete Mitarbeiter, höchster Bradford-Faktor zuerst
+def get_summary(access=None, limit=200):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT s.*, e.first_name, e.last_name, d.name AS department,
+               s.monday_friday_spells >= ? AND s.monday_friday_spells >= ? * s.spells AS pattern
+        FROM sick_leave_summary s
+        JOIN employees e ON e.id = s.employee_id
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE s.spells > 0{scope}
+        ORDER BY s.bradford DESC, s.sick_days DESC
+        LIMIT ?
+    """, [PATTERN_MIN_SPELLS, PATTERN_MIN_SHARE] + params + [limit])
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
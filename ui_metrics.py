@@ -0,0 +1,112 @@
+import datetime
+import functools
+import json
+import logging
+import logging.handlers
+import time
+from core import APP_NAME, METRICS_PATH, logger, query_stats
+
+# Intervall des Watchdogs und Verzögerung, ab der die Hauptschleife als blockiert gilt
+WATCHDOG_INTERVAL_MS = 100
+STALL_THRESHOLD_MS = 250
+
+# Größe der Metrikdatei vor dem Rotieren und Anzahl aufbewahrter Dateien
+METRICS_MAX_BYTES = 1024 * 1024
+METRICS_BACKUP_COUNT = 5
+
+# Misst Ansichtswechsel und Blockaden der Tk-Hauptschleife; Ergebnisse gehen als
+# JSON-Zeilen in eine rotierende Metrikdatei
+class UiMetrics:
+    def __init__(self, root, path=METRICS_PATH, on_view_timed=None):
+        self.root = root
+        self.on_view_timed = on_view_timed
+        self.current_view = None
+        self.last_view = None
+        self.stall_count = 0
+        self.annotations = {}
+        self._expected = None
+
+        # Eigener Logger ohne Weitergabe, damit Metriken nicht im Anwendungslog landen
+        self.writer = logging.getLogger(f"{APP_NAME}.metrics")
+        self.writer.propagate = False
+        self.writer.setLevel(logging.INFO)
+        if not self.writer.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=METRICS_MAX_BYTES, backupCount=METRICS_BACKUP_COUNT, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.writer.addHandler(handler)
+
+    def write(self, record):
+        record["time"] = datetime.datetime.now().isoformat(timespec="milliseconds")
+        try:
+            self.writer.info(json.dumps(record, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"Metrik konnte nicht geschrieben werden: {e}")
+
+    # Zusatzangabe für die laufende Messung (z. B. ob die Ansicht aus dem Zwischenspeicher kam)
+    def annotate(self, key, value):
+        self.annotations[key] = value
+
+    # Ansicht messen: Datenabruf (Abfragezeit im UI-Thread), Widgetaufbau und Zeit bis zum ersten Leerlauf
+    def time_view(self, name, build):
+        self.current_view = name
+        self.annotations = {}
+        start = time.perf_counter()
+        query_start = query_stats.thread_time_ms()
+
+        result = build()
+
+        built = time.perf_counter()
+        fetch_ms = query_stats.thread_time_ms() - query_start
+        build_ms = (built - start) * 1000
+        annotations = self.annotations
+
+        def first_idle():
+            timing = {
+                "type": "view",
+                "view": name,
+                "fetch_ms": round(fetch_ms, 2),
+                "build_ms": round(build_ms - fetch_ms, 2),
+                "idle_ms": round((time.perf_counter() - built) * 1000, 2),
+                "total_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+            timing.update(annotations)
+            self.last_view = timing
+            self.write(timing)
+            if self.on_view_timed:
+                self.on_view_timed(timing)
+
+        # after_idle läuft erst, nachdem die bereits eingeplanten Layout- und Zeichenaufgaben erledigt sind
+        self.root.after_idle(first_idle)
+        return result
+
+    def start_watchdog(self):
+        self._expected = time.perf_counter() + WATCHDOG_INTERVAL_MS / 1000
+        self.root.after(WATCHDOG_INTERVAL_MS, self._watchdog_tick)
+
+    # Verspätung des after()-Aufrufs = Zeit, in der die Hauptschleife keine Ereignisse verarbeitet hat
+    def _watchdog_tick(self):
+        now = time.perf_counter()
+        drift_ms = (now - self._expected) * 1000
+
+        if drift_ms >= STALL_THRESHOLD_MS:
+            self.stall_count += 1
+            self.write({"type": "stall", "view": self.current_view, "drift_ms": round(drift_ms, 1)})
+            if drift_ms >= 1000:
+                logger.warning(f"Oberfläche {drift_ms:.0f} ms blockiert (Ansicht: {self.current_view})")
+
+        self._expected = now + WATCHDOG_INTERVAL_MS / 1000
+        self.root.after(WATCHDOG_INTERVAL_MS, self._watchdog_tick)
+
+# Dekorator für die show_*-Methoden der Hauptanwendung
+def timed_view(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, "ui_metrics", None)
+            if metrics is None:
+                return func(self, *args, **kwargs)
+            return metrics.time_view(name, lambda: func(self, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,310 @@
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import time
+from fpdf import FPDF
+from core import (
+    APP_NAME, EXPORT_PATH, VACATION_CARRYOVER_MAX_DAYS, VACATION_CARRYOVER_EXPIRY,
+    get_connection, retry_on_busy, load_config, logger
+)
+import encryption
+import rbac
+import services
+
+# Spalten der Zusammenfassung je Mitarbeiter (CSV)
+BALANCE_FIELDS = (
+    "employee_id", "last_name", "first_name", "department", "entitlement", "carried_in", "expired",
+    "taken", "remaining", "carried_out", "forfeited"
+)
+
+# Genommene Urlaubstage eines Antrags zwischen :first und dem angegebenen Tag (anteilig nach Kalendertagen,
+# nur bei Anträgen über den Jahreswechsel bzw. den Stichtag relevant)
+def _taken_until(last):
+    return f"""
+        v.days * (julianday(MIN(v.end_date, {last})) - julianday(MAX(v.start_date, :first)) + 1)
+        / (julianday(v.end_date) - julianday(v.start_date) + 1)"""
+
+# Salden eines Jahres in einer Abfrage neu berechnen:
+#   Anspruch       Jahresurlaub, bei Ein-/Austritt im Jahr ein Zwölftel je vollem Monat (§ 5 BUrlG, gerundet)
+#   Übertrag       übertragene Tage des Vorjahres; was bis zum Stichtag nicht genommen wurde, verfällt
+#   Rest           Anspruch + Übertrag - Verfall - genommene Tage (genehmigte Anträge)
+#   Übertrag neu   Rest bis zur Obergrenze; darüber hinaus verfällt er. Bei Austritt im Jahr kein Übertrag
+#                  (der Rest ist abzugelten)
+def _close_balances(cursor, year, max_days, expiry, default_days, closed_at):
+    params = {
+        "year": year,
+        "previous": year - 1,
+        "first": f"{year}-01-01",
+        "last": f"{year}-12-31",
+        "expiry": f"{year}-{expiry}",
+        "cap": max_days,
+        "default_days": default_days,
+        "closed_at": closed_at
+    }
+
+    cursor.execute("DELETE FROM vacation_balances WHERE year = :year", params)
+    cursor.execute(f"""
+        WITH staff AS (
+            SELECT e.id, COALESCE(e.vacation_days_per_year, :default_days) AS per_year,
+                   MAX(COALESCE(e.hire_date, :first), :first) AS from_day,
+                   MIN(COALESCE(e.exit_date, :last), :last) AS to_day
+            FROM employees e
+            WHERE COALESCE(e.hire_date, :first) <= :last
+              AND (e.exit_date >= :first OR (e.exit_date IS NULL AND e.status = 'Aktiv'))
+        ), months AS (
+            SELECT id, per_year, to_day,
+                   MAX(0, CAST(substr(to_day, 6, 2) AS INTEGER) - CAST(substr(from_day, 6, 2) AS INTEGER) + 1
+                          - (substr(from_day, 9, 2) != '01')
+                          - (to_day != date(to_day, 'start of month', '+1 month', '-1 day'))) AS full_months
+            FROM staff
+        ), taken AS (
+            SELECT v.employee_id,
+                   SUM({_taken_until(":last")}) AS taken,
+                   SUM(CASE WHEN v.start_date <= :expiry THEN {_taken_until(":expiry")} ELSE 0 END) AS until_expiry
+            -- Bereichssuche über das Enddatum statt Vollscan in Mitarbeiterreihenfolge
+            FROM vacation v INDEXED BY idx_vacation_end_date
+            WHERE v.status = 'Genehmigt' AND v.end_date >= :first AND v.start_date <= :last
+              AND v.end_date >= v.start_date
+            GROUP BY v.employee_id
+        ), balances AS (
+            SELECT m.id, m.to_day,
+                   CASE WHEN m.full_months = 12 THEN m.per_year
+                        ELSE CAST(m.per_year * m.full_months / 12.0 + 0.5 AS INTEGER) END AS entitlement,
+                   COALESCE(p.carried_out, 0) AS carried_in,
+                   MAX(COALESCE(p.carried_out, 0) - COALESCE(t.until_expiry, 0), 0) AS expired,
+                   COALESCE(t.taken, 0) AS taken
+            FROM months m
+            LEFT JOIN taken t ON t.employee_id = m.id
+            LEFT JOIN vacation_balances p ON p.year = :previous AND p.employee_id = m.id
+        ), result AS (
+            SELECT id, to_day, entitlement, carried_in, expired, taken,
+                   ROUND(entitlement + carried_in - expired - taken, 2) AS remaining
+            FROM balances
+        ), carry AS (
+            SELECT *,
+                   CASE WHEN to_day < :last OR remaining <= 0 THEN 0
+                        ELSE MIN(remaining, COALESCE(:cap, remaining)) END AS carried_out
+            FROM result
+        )
+        INSERT INTO vacation_balances (employee_id, year, entitlement, carried_in, expired, taken, remaining,
+                                       carried_out, forfeited, closed_at)
+        SELECT id, :year, entitlement, carried_in, ROUND(expired, 2), ROUND(taken, 2), remaining, carried_out,
+               CASE WHEN to_day < :last THEN 0 ELSE ROUND(MAX(remaining, 0) - carried_out, 2) END,
+               :closed_at
+        FROM carry
+    """, params)
+
+    cursor.execute("""
+        SELECT COUNT(*), COALESCE(SUM(carried_out), 0), COALESCE(SUM(expired), 0), COALESCE(SUM(forfeited), 0)
+        FROM vacation_balances WHERE year = ?
+    """, (year,))
+    return cursor.fetchone()
+
+# Urlaubsjahr abschließen. Alle Salden des Jahres entstehen in einer Transaktion; ein abgebrochener Lauf
+# hinterlässt nichts und wird einfach wiederholt. Ein bereits abgeschlossenes Jahr wird nur mit force neu
+# berechnet (dann auch alle später abgeschlossenen Jahre, deren Übertrag davon abhängt); fehlt nur die
+# Zusammenfassung, wird sie nachgeholt.
+@retry_on_busy
+def close_year(year, force=False, formats=("csv", "pdf"), output_dir=EXPORT_PATH, today=None):
+    today = today or datetime.date.today()
+    if year >= today.year:
+        raise ValueError(f"Das Urlaubsjahr {year} ist noch nicht beendet")
+
+    config = load_config()
+    max_days = config.get("vacation_carryover_max_days", VACATION_CARRYOVER_MAX_DAYS)
+    expiry = config.get("vacation_carryover_expiry", VACATION_CARRYOVER_EXPIRY)
+    try:
+        datetime.date.fromisoformat(f"{year}-{expiry}")
+    except (TypeError, ValueError):
+        raise ValueError(f"Ungültiger Stichtag für übertragenen Urlaub: {expiry}")
+    default_days = config.get("vacation_days_default", 30)
+
+    start = time.perf_counter()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT status FROM year_close_runs WHERE year = ?", (year,))
+        run = cursor.fetchone()
+
+        if run is None or force:
+            cursor.execute("SELECT year FROM year_close_runs WHERE year > ? ORDER BY year", (year,))
+            years = [year] + [row[0] for row in cursor.fetchall()]
+            # Archivierte Jahre lassen sich nicht neu berechnen, ihre Anträge liegen nicht mehr in vacation
+            cursor.execute("SELECT MIN(year) FROM archives WHERE status = 'archived' AND year >= ?", (year,))
+            archived = cursor.fetchone()[0]
+            if archived is not None:
+                raise ValueError(f"Das Urlaubsjahr {archived} ist archiviert und kann nicht neu berechnet werden")
+            closed_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+            for closing_year in years:
+                employees, carried_out, expired, forfeited = _close_balances(
+                    cursor, closing_year, max_days, expiry, default_days, closed_at
+                )
+                # Spätere Jahre erhalten den Status 'closed', damit ihre Zusammenfassung neu geschrieben wird
+                cursor.execute("""
+                    INSERT INTO year_close_runs (year, status, carryover_max_days, carryover_expiry, employees,
+                                                 carried_out, expired, forfeited, duration_ms, closed_at, closed_by)
+                    VALUES (?, 'closed', ?, ?, ?, ?, ?, ?, ?, ?, current_app_user())
+                    ON CONFLICT (year) DO UPDATE SET
+                        status = excluded.status, carryover_max_days = excluded.carryover_max_days,
+                        carryover_expiry = excluded.carryover_expiry, employees = excluded.employees,
+                        carried_out = excluded.carried_out, expired = excluded.expired,
+                        forfeited = excluded.forfeited, duration_ms = excluded.duration_ms,
+                        closed_at = excluded.closed_at, closed_by = excluded.closed_by, summary_files = NULL
+                """, (closing_year, max_days, expiry, employees, carried_out, expired, forfeited,
+                      (time.perf_counter() - start) * 1000, closed_at))
+                logger.info(f"Urlaubsjahr {closing_year} abgeschlossen: {employees} Mitarbeiter, "
+                            f"{carried_out:g} Tage übertragen, {expired:g} verfallen (Stichtag), {forfeited:g} über Obergrenze",
+                            extra={"event": "year_close.closed", "year": closing_year})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    run = get_run(year)
+    files = json.loads(run['summary_files'] or "[]")
+    if run['status'] != 'done' or not files or not all(os.path.exists(path) for path in files):
+        files = write_summary(year, formats, output_dir)
+        _mark_done(year, files)
+        run = get_run(year)
+    return run
+
+@retry_on_busy
+def _mark_done(year, files):
+    conn = get_connection()
+    try:
+        conn.execute("UPDATE year_close_runs SET status = 'done', summary_files = ? WHERE year = ?",
+                     (json.dumps(files), year))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_run(year):
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM year_close_runs WHERE year = ?", (year,))
+    run = cursor.fetchone()
+    conn.close()
+    return run
+
+# Salden eines abgeschlossenen Jahres je Mitarbeiter
+def get_balances(year, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT e.employee_id, e.last_name, e.first_name, d.name AS department, b.entitlement, b.carried_in,
+               b.expired, b.taken, b.remaining, b.carried_out, b.forfeited
+        FROM vacation_balances b
+        JOIN employees e ON e.id = b.employee_id
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE b.year = ?{scope}
+        ORDER BY department, e.last_name, e.first_name
+    """, [year] + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Summen eines abgeschlossenen Jahres je Abteilung
+def get_department_totals(year, access=None):
+    scope, params = rbac.department_scope(access)
+    conn = get_connection(sqlite3.Row)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COALESCE(d.name, 'Ohne Abteilung') AS department, COUNT(*) AS employees,
+               SUM(b.entitlement) AS entitlement, SUM(b.carried_in) AS carried_in, SUM(b.expired) AS expired,
+               SUM(b.taken) AS taken, SUM(b.remaining) AS remaining, SUM(b.carried_out) AS carried_out,
+               SUM(b.forfeited) AS forfeited
+        FROM vacation_balances b
+        JOIN employees e ON e.id = b.employee_id
+        LEFT JOIN departments d ON d.id = e.department_id
+        WHERE b.year = ?{scope}
+        GROUP BY e.department_id
+        ORDER BY department
+    """, [year] + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# Zusammenfassung schreiben: CSV je Mitarbeiter, PDF mit Summen je Abteilung
+# (mit encrypt_exports verschlüsselt wie die übrigen Exporte)
+def write_summary(year, formats=("csv", "pdf"), output_dir=EXPORT_PATH):
+    os.makedirs(output_dir, exist_ok=True)
+    config = load_config()
+    recipient = encryption.public_key() if config.get("encrypt_exports", False) else None
+    files = []
+    if "csv" in formats:
+        path = services.export_target(os.path.join(output_dir, f"urlaub_jahresabschluss_{year}.csv"), config)
+        balances = get_balances(year)
+        if recipient is None:
+            with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+                write_balances(csvfile, balances)
+        else:
+            with encryption.open_encrypted(path, recipient, text=True) as csvfile:
+                write_balances(csvfile, balances)
+        files.append(path)
+    if "pdf" in formats:
+        path = services.export_target(os.path.join(output_dir, f"urlaub_jahresabschluss_{year}.pdf"), config)
+        run, totals = get_run(year), get_department_totals(year)
+        if recipient is None:
+            export_summary_pdf(path, year, run, totals)
+        else:
+            encryption.encrypt_generated(lambda pdf_path: export_summary_pdf(pdf_path, year, run, totals), path, recipient)
+        files.append(path)
+
+    logger.info(f"Zusammenfassung Urlaubsjahr {year} geschrieben: {', '.join(files)}")
+    return files
+
+def write_balances(csvfile, balances):
+    writer = csv.writer(csvfile)
+    writer.writerow(BALANCE_FIELDS)
+    writer.writerows(balances)
+
+def export_summary_pdf(filepath, year, run, totals):
+    pdf = FPDF()
+    pdf.add_page()
+
+    # Titel
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(190, 10, f"Urlaub - Jahresabschluss {year}", 0, 1, "C")
+    pdf.ln(5)
+
+    pdf.set_font("Arial", "", 10)
+    max_days = run['carryover_max_days']
+    pdf.cell(190, 6, f"Mitarbeiter: {run['employees']}", 0, 1, "L")
+    pdf.cell(190, 6, f"Übertrag höchstens: {'unbegrenzt' if max_days is None else f'{max_days:g} Tage'}, "
+                     f"Verfall des Vorjahresübertrags am {run['carryover_expiry']}", 0, 1, "L")
+    pdf.cell(190, 6, f"Übertragen: {run['carried_out']:g} Tage, verfallen: {run['expired']:g} Tage, "
+                     f"über Obergrenze: {run['forfeited']:g} Tage", 0, 1, "L")
+    pdf.ln(5)
+
+    # Tabellenkopf
+    columns = (("Abteilung", 46), ("MA", 12), ("Anspruch", 19), ("Übertrag", 19), ("Verfall", 19),
+               ("Genommen", 19), ("Rest", 19), ("Neu", 19), ("Verloren", 18))
+    pdf.set_font("Arial", "B", 9)
+    for index, (title, width) in enumerate(columns):
+        pdf.cell(width, 8, title, 1, 1 if index == len(columns) - 1 else 0, "C")
+
+    # Tabellendaten
+    pdf.set_font("Arial", "", 9)
+    keys = ("employees", "entitlement", "carried_in", "expired", "taken", "remaining", "carried_out", "forfeited")
+    for row in totals:
+        pdf.cell(columns[0][1], 8, str(row['department']), 1, 0, "L")
+        for index, key in enumerate(keys, start=1):
+            pdf.cell(columns[index][1], 8, f"{row[key] or 0:g}", 1, 1 if index == len(keys) else 0, "R")
+
+    # Fußzeile
+    pdf.ln(10)
+    pdf.set_font("Arial", "I", 8)
+    pdf.cell(0, 10, f"Abgeschlossen am {run['closed_at']} von {run['closed_by'] or '-'} - erstellt mit {APP_NAME}", 0, 0, "L")
+
+    pdf.output(filepath)